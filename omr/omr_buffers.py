@@ -0,0 +1,114 @@
+"""Reusable scratch buffers and memory accounting for pipeline workers.
+
+A full-page sheet otherwise allocates a fresh 2480x3508 array at every
+stage (resize, blur, threshold, two morphology passes, background
+normalization) plus ~720 bubble patches and their stacked batch. A
+`BufferPool` keeps one array per named stage and hands the same memory
+back for every sheet; OpenCV writes into it through `dst=`. One pool
+belongs to one worker and sheets are processed one at a time, so an
+array returned from the pool is only valid until the next sheet.
+
+`peak_rss_mb` / `current_rss_mb` report the worker's memory and
+`MemoryBudget` enforces a per-worker cap between sheets. On Windows,
+where the `resource` module does not exist, they use `psutil` if it is
+installed and otherwise report None (and the cap is not enforced).
+"""
+
+import gc
+import os
+import sys
+from typing import Dict, Tuple
+
+import numpy as np
+
+
+class BufferPool:
+    def __init__(self) -> None:
+        self._arrays: Dict[str, np.ndarray] = {}
+        self.cache: Dict[str, object] = {}
+
+    def get(self, name: str, shape: Tuple[int, ...], dtype: object = np.uint8) -> np.ndarray:
+        """Return the buffer `name`, (re)allocating only if shape or dtype changed."""
+
+        arr = self._arrays.get(name)
+        if arr is None or arr.shape != tuple(shape) or arr.dtype != np.dtype(dtype):
+            arr = np.empty(shape, dtype=dtype)
+            self._arrays[name] = arr
+        return arr
+
+    @property
+    def nbytes(self) -> int:
+        return int(sum(a.nbytes for a in self._arrays.values()))
+
+    def release(self) -> None:
+        self._arrays.clear()
+        self.cache.clear()
+
+
+def _psutil_memory() -> object | None:
+    try:
+        import psutil  # type: ignore
+    except ImportError:
+        return None
+    return psutil.Process().memory_info()
+
+
+def peak_rss_mb() -> float | None:
+    """Peak resident set size of this process in MiB, or None if unknown."""
+
+    if sys.platform == "win32":
+        info = _psutil_memory()
+        peak = getattr(info, "peak_wset", None)
+        return peak / (1024.0 * 1024.0) if peak is not None else None
+
+    # `resource` is Unix-only.
+    import resource
+
+    peak = float(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+    # Linux reports KiB, macOS bytes.
+    return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+
+
+def current_rss_mb() -> float | None:
+    """Current resident set size in MiB (falls back to the peak off Linux)."""
+
+    if sys.platform == "win32":
+        info = _psutil_memory()
+        return info.rss / (1024.0 * 1024.0) if info is not None else None
+    try:
+        with open("/proc/self/statm", "r", encoding="ascii") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024.0 * 1024.0)
+    except (OSError, ValueError, IndexError):
+        return peak_rss_mb()
+
+
+class MemoryBudgetExceeded(MemoryError):
+    pass
+
+
+class MemoryBudget:
+    """Per-worker RSS cap checked between sheets.
+
+    When the cap is crossed the pool is released and garbage collected
+    once; if RSS is still above the cap, MemoryBudgetExceeded is raised so
+    the caller can stop (or recycle the worker) before the OS kills it.
+    """
+
+    def __init__(self, max_rss_mb: float | None) -> None:
+        self.max_rss_mb = float(max_rss_mb) if max_rss_mb else None
+
+    def check(self, pool: BufferPool | None = None) -> None:
+        if self.max_rss_mb is None:
+            return
+        rss = current_rss_mb()
+        if rss is None or rss <= self.max_rss_mb:
+            return
+        if pool is not None:
+            pool.release()
+        gc.collect()
+        rss = current_rss_mb()
+        if rss is not None and rss > self.max_rss_mb:
+            raise MemoryBudgetExceeded(
+                f"worker RSS {rss:.0f} MiB exceeds the {self.max_rss_mb:.0f} MiB cap"
+            )
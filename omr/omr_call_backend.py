@@ -15,14 +15,49 @@ This will call:
     POST {api-base}/exam/evaluate/{submissionId}
 with body:
     {"answerKey": [...], "studentAnswers": [...]}.
+
+Bulk mode re-posts many submissions over one pooled connection set, e.g.
+after an answer-key correction:
+
+    python omr_call_backend.py \
+        --bulk submissions.jsonl \
+        --answer-key-json answer_key.json \
+        --concurrency 8
+
+Each JSONL line is `{"submissionId": "...", "studentAnswers": [...]}`
+(`answers` is accepted as an alias); a line may carry its own `answerKey`
+to override the shared one. One result line is printed per record, in
+input order, followed by a latency summary on stderr.
+
+`--async` drives the same requests from an asyncio event loop (bounded by
+a semaphore) so hundreds of evaluations stay pipelined over the pooled
+connections. With `--checkpoint results.jsonl` every outcome is appended
+as it completes; a rerun with the same checkpoint skips submissions that
+were already posted successfully with the same answer key and answers,
+and retries only the failures. A corrected answer key (or re-read answers)
+changes the record's `payloadHash`, so those submissions are posted again.
 """
 
 import argparse
+import asyncio
+import hashlib
 import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Set, Tuple
 
-import requests
+from omr_client import (
+    DEFAULT_API_BASE,
+    DEFAULT_BACKOFF,
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_READ_TIMEOUT,
+    DEFAULT_RETRIES,
+    EvaluateClient,
+    call_backend_evaluate,  # noqa: F401  (re-exported for existing importers)
+)
 
 
 def load_json(path: str | Path) -> Any:
@@ -31,47 +66,303 @@ def load_json(path: str | Path) -> Any:
         return json.load(f)
 
 
-def call_backend_evaluate(
-    submission_id: str,
-    answer_key: List[Dict],
-    student_answers: List[Dict],
-    api_base: str,
-    token: str | None = None,
-) -> Dict:
-    url = f"{api_base}/exam/evaluate/{submission_id}"
-    headers = {"Content-Type": "application/json"}
-    if token:
-        headers["Authorization"] = f"Bearer {token}"
-    payload = {"answerKey": answer_key, "studentAnswers": student_answers}
-    resp = requests.post(url, headers=headers, data=json.dumps(payload))
-    resp.raise_for_status()
-    return resp.json()
+def load_bulk_records(path: str | Path, answer_key: List[Dict] | None = None) -> List[Dict]:
+    """Read submission records from a JSONL file.
+
+    Returns dicts with `submissionId`, `answerKey` and `studentAnswers`.
+    """
+
+    records: List[Dict] = []
+    p = Path(path)
+    with p.open("r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            raw = json.loads(line)
+            if not isinstance(raw, dict) or not raw.get("submissionId"):
+                raise ValueError(f"{p}:{line_no}: record must have a submissionId")
+            student_answers = raw.get("studentAnswers", raw.get("answers"))
+            if not isinstance(student_answers, list):
+                raise ValueError(f"{p}:{line_no}: record must have a studentAnswers list")
+            key = raw.get("answerKey", answer_key)
+            if not isinstance(key, list):
+                raise ValueError(
+                    f"{p}:{line_no}: no answerKey in record and no --answer-key-json given"
+                )
+            records.append(
+                {
+                    "submissionId": str(raw["submissionId"]),
+                    "answerKey": key,
+                    "studentAnswers": student_answers,
+                }
+            )
+    return records
+
+
+def payload_hash(record: Dict) -> str:
+    """SHA-256 of the evaluated payload (answer key and student answers)."""
+
+    body = json.dumps(
+        {"answerKey": record["answerKey"], "studentAnswers": record["studentAnswers"]},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+class BulkCheckpoint:
+    """Append-only JSONL log of bulk outcomes, used to resume a run.
+
+    Outcomes are keyed by submission and `payloadHash`, so a submission is
+    only skipped if it was posted with the same answer key and answers.
+    The last line recorded for a key wins, so a failure followed by a
+    successful retry counts as posted.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._posted: Set[Tuple[str, str]] = set()
+        if self.path.exists():
+            with self.path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except Exception:
+                        # A crash can leave a truncated last line.
+                        continue
+                    key = (str(entry.get("submissionId")), str(entry.get("payloadHash")))
+                    if entry.get("ok"):
+                        self._posted.add(key)
+                    else:
+                        self._posted.discard(key)
+
+    def is_posted(self, submission_id: str, digest: str) -> bool:
+        return (submission_id, digest) in self._posted
+
+    def record(self, outcome: Dict) -> None:
+        line = json.dumps(outcome)
+        key = (outcome["submissionId"], outcome["payloadHash"])
+        with self._lock:
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            if outcome.get("ok"):
+                self._posted.add(key)
+            else:
+                self._posted.discard(key)
+
+
+def _post_one(client: EvaluateClient, record: Dict) -> Dict:
+    start = time.perf_counter()
+    try:
+        result = client.evaluate(
+            record["submissionId"], record["answerKey"], record["studentAnswers"]
+        )
+        outcome = {"submissionId": record["submissionId"], "ok": True, "result": result}
+    except Exception as e:
+        outcome = {"submissionId": record["submissionId"], "ok": False, "error": str(e)}
+    outcome["payloadHash"] = payload_hash(record)
+    outcome["latencyMs"] = round((time.perf_counter() - start) * 1000.0, 3)
+    return outcome
+
+
+def _pending(records: List[Dict], checkpoint: BulkCheckpoint | None) -> List[Dict]:
+    if checkpoint is None:
+        return records
+    return [r for r in records if not checkpoint.is_posted(r["submissionId"], payload_hash(r))]
+
+
+def post_bulk(
+    client: EvaluateClient,
+    records: List[Dict],
+    concurrency: int = 8,
+    checkpoint: BulkCheckpoint | None = None,
+) -> List[Dict]:
+    """Post all records with at most `concurrency` requests in flight.
+
+    Failures are reported per record instead of aborting the run. Records
+    already posted according to `checkpoint` are skipped.
+    """
+
+    records = _pending(records, checkpoint)
+    if not records:
+        return []
+
+    def run(record: Dict) -> Dict:
+        outcome = _post_one(client, record)
+        if checkpoint is not None:
+            checkpoint.record(outcome)
+        return outcome
+
+    workers = max(1, min(int(concurrency), len(records)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(run, records))
+
+
+async def post_bulk_async(
+    client: EvaluateClient,
+    records: List[Dict],
+    concurrency: int = 8,
+    checkpoint: BulkCheckpoint | None = None,
+) -> List[Dict]:
+    """asyncio variant of `post_bulk`.
+
+    All records are scheduled up front and a semaphore keeps at most
+    `concurrency` requests in flight; the blocking session calls run on a
+    matching executor so they reuse the client's keep-alive pool.
+    """
+
+    records = _pending(records, checkpoint)
+    if not records:
+        return []
+
+    limit = max(1, min(int(concurrency), len(records)))
+    sem = asyncio.Semaphore(limit)
+    loop = asyncio.get_running_loop()
+
+    with ThreadPoolExecutor(max_workers=limit) as pool:
+
+        async def run(record: Dict) -> Dict:
+            async with sem:
+                outcome = await loop.run_in_executor(pool, _post_one, client, record)
+            if checkpoint is not None:
+                checkpoint.record(outcome)
+            return outcome
+
+        return list(await asyncio.gather(*(run(r) for r in records)))
+
+
+def summarize_latencies(outcomes: List[Dict], wall_seconds: float, skipped: int = 0) -> Dict:
+    """Aggregate per-request latencies of a bulk run (nearest-rank percentiles)."""
+
+    latencies = sorted(float(o["latencyMs"]) for o in outcomes)
+
+    def pct(p: float) -> float | None:
+        if not latencies:
+            return None
+        idx = min(len(latencies) - 1, int(round(p / 100.0 * (len(latencies) - 1))))
+        return latencies[idx]
+
+    ok = sum(1 for o in outcomes if o["ok"])
+    return {
+        "posted": len(outcomes),
+        "ok": ok,
+        "failed": len(outcomes) - ok,
+        "skipped": skipped,
+        "wallSeconds": round(wall_seconds, 3),
+        "throughputPerSecond": (
+            round(len(outcomes) / wall_seconds, 2) if wall_seconds > 0 else None
+        ),
+        "latencyMs": {
+            "mean": round(sum(latencies) / len(latencies), 3) if latencies else None,
+            "p50": pct(50),
+            "p95": pct(95),
+            "p99": pct(99),
+            "max": latencies[-1] if latencies else None,
+        },
+    }
+
+
+def _client_from_args(args: argparse.Namespace) -> EvaluateClient:
+    return EvaluateClient(
+        api_base=args.api_base,
+        token=args.token,
+        connect_timeout=args.connect_timeout,
+        read_timeout=args.read_timeout,
+        retries=args.retries,
+        backoff=args.backoff,
+        pool_size=args.concurrency,
+    )
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Call NEET OMR backend evaluation API")
-    parser.add_argument("--submission-id", required=True, help="ExamSubmission _id")
-    parser.add_argument("--answer-key-json", required=True, help="Path to answerKey JSON file")
-    parser.add_argument("--student-json", required=True, help="Path to studentAnswers JSON file")
+    parser.add_argument("--submission-id", help="ExamSubmission _id")
+    parser.add_argument("--answer-key-json", help="Path to answerKey JSON file")
+    parser.add_argument("--student-json", help="Path to studentAnswers JSON file")
+    parser.add_argument(
+        "--bulk",
+        help="JSONL file of {submissionId, studentAnswers[, answerKey]} records",
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=8, help="Max in-flight requests in bulk mode"
+    )
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Drive bulk requests from an asyncio event loop",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        help="Bulk checkpoint JSONL; submissions already posted in it with the same "
+        "answer key and answers are skipped",
+    )
     parser.add_argument(
         "--api-base",
-        default="http://localhost:8080/api/v1/examiner",
+        default=DEFAULT_API_BASE,
         help="Base URL for backend examiner API",
     )
     parser.add_argument("--token", help="Optional bearer token for Authorization header")
+    parser.add_argument(
+        "--connect-timeout", type=float, default=DEFAULT_CONNECT_TIMEOUT
+    )
+    parser.add_argument("--read-timeout", type=float, default=DEFAULT_READ_TIMEOUT)
+    parser.add_argument(
+        "--retries", type=int, default=DEFAULT_RETRIES, help="Retries per request"
+    )
+    parser.add_argument(
+        "--backoff", type=float, default=DEFAULT_BACKOFF, help="Retry backoff factor (s)"
+    )
 
     args = parser.parse_args()
 
+    if args.bulk:
+        answer_key = load_json(args.answer_key_json) if args.answer_key_json else None
+        try:
+            records = load_bulk_records(args.bulk, answer_key=answer_key)
+        except ValueError as e:
+            raise SystemExit(str(e))
+
+        checkpoint = BulkCheckpoint(args.checkpoint) if args.checkpoint else None
+        skipped = len(records) - len(_pending(records, checkpoint))
+
+        start = time.perf_counter()
+        with _client_from_args(args) as client:
+            if args.use_async:
+                results = asyncio.run(
+                    post_bulk_async(
+                        client, records, concurrency=args.concurrency, checkpoint=checkpoint
+                    )
+                )
+            else:
+                results = post_bulk(
+                    client, records, concurrency=args.concurrency, checkpoint=checkpoint
+                )
+        wall = time.perf_counter() - start
+
+        for r in results:
+            print(json.dumps(r))
+        print(json.dumps(summarize_latencies(results, wall, skipped=skipped)), file=sys.stderr)
+        failed = [r for r in results if not r["ok"]]
+        if failed:
+            raise SystemExit(f"{len(failed)} of {len(results)} evaluations failed")
+        return
+
+    if not (args.submission_id and args.answer_key_json and args.student_json):
+        parser.error(
+            "--submission-id, --answer-key-json and --student-json are required without --bulk"
+        )
+
     answer_key = load_json(args.answer_key_json)
     student_answers = load_json(args.student_json)
 
-    result = call_backend_evaluate(
-        submission_id=args.submission_id,
-        answer_key=answer_key,
-        student_answers=student_answers,
-        api_base=args.api_base,
-        token=args.token,
-    )
+    with _client_from_args(args) as client:
+        result = client.evaluate(args.submission_id, answer_key, student_answers)
 
     print(json.dumps(result, indent=2))
 
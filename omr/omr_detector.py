@@ -0,0 +1,347 @@
+"""Answer-column detector served without PyTorch.
+
+`AI/OmrPredict` runs `rectangleOmrOri_yolo_model.pt` through ultralytics,
+which imports PyTorch (seconds of startup) and runs fp32 on the CPU. This
+module exports that model once to a fixed-size ONNX or OpenVINO graph,
+optionally INT8-quantized, and serves it with onnxruntime / OpenVINO only:
+
+    python omr/omr_detector.py --mode export --model rectangleOmrOri_yolo_model.pt --format onnx --int8
+    python omr/omr_detector.py --mode check --model rectangleOmrOri_yolo_model.pt \\
+        --runtime-model rectangleOmrOri_yolo_model_int8.onnx
+
+`check` runs both detectors on the bundled sample images and matches
+their class-0 boxes by IoU; it exits non-zero if the runtime model misses
+or adds columns. `ColumnDetector` returns the same `(N, 5)` array
+(`class cx cy w h`, normalized) that `omr_engine.YoloColumnLocator` reads,
+and the locator uses it for `.onnx` / `.xml` model paths.
+
+The graph is exported with a fixed square input (`imgsz`, 640 by default)
+and decoded as an ultralytics detection head: `(1, 4 + classes, anchors)`,
+boxes as center/size in input pixels, no objectness term. Pre-processing
+matches ultralytics: letterbox to `imgsz` with grey (114) padding, RGB,
+scaled to [0, 1].
+
+Dependencies are optional and imported on first use: ultralytics for
+export and the PyTorch reference, onnxruntime for `.onnx`, openvino for
+`.xml`.
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+DEFAULT_IMGSZ = 640
+DEFAULT_CONF = 0.6
+DEFAULT_IOU = 0.7
+LETTERBOX_FILL = 114
+MIN_MATCH_IOU = 0.9
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_IMAGE_DIRS = [
+    REPO_ROOT / "AI" / "OmrPredict" / "ForStudent" / "images" / "omr",
+    REPO_ROOT / "AI" / "omr for dataset",
+]
+
+
+def letterbox(bgr: np.ndarray, imgsz: int = DEFAULT_IMGSZ) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+    """NCHW float32 input plus the scale and (left, top) padding used."""
+
+    h, w = bgr.shape[:2]
+    scale = min(imgsz / float(h), imgsz / float(w))
+    nw, nh = int(round(w * scale)), int(round(h * scale))
+    left, top = (imgsz - nw) // 2, (imgsz - nh) // 2
+    canvas = np.full((imgsz, imgsz, 3), LETTERBOX_FILL, dtype=np.uint8)
+    canvas[top : top + nh, left : left + nw] = cv2.resize(bgr, (nw, nh), interpolation=cv2.INTER_LINEAR)
+    blob = cv2.dnn.blobFromImage(canvas, scalefactor=1.0 / 255.0, swapRB=True)
+    return blob, scale, (left, top)
+
+
+def decode_detections(
+    output: np.ndarray,
+    scale: float,
+    pad: Tuple[int, int],
+    image_size: Tuple[int, int],
+    conf: float = DEFAULT_CONF,
+    iou: float = DEFAULT_IOU,
+) -> np.ndarray:
+    """Raw head output `(1, 4 + C, A)` to `(N, 5)` `class cx cy w h`, normalized to the image."""
+
+    pred = np.asarray(output, dtype=np.float32).reshape(output.shape[-2], output.shape[-1]).T  # (A, 4 + C)
+    scores = pred[:, 4:]
+    cls = scores.argmax(axis=1)
+    best = scores[np.arange(scores.shape[0]), cls]
+    keep = best >= conf
+    if not np.any(keep):
+        return np.zeros((0, 5), dtype=np.float64)
+    boxes, cls, best = pred[keep, :4], cls[keep], best[keep]
+
+    # Per-class NMS, like ultralytics' default (offset boxes by class).
+    xywh = np.column_stack([boxes[:, 0] - boxes[:, 2] / 2.0, boxes[:, 1] - boxes[:, 3] / 2.0, boxes[:, 2], boxes[:, 3]])
+    shifted = xywh.copy()
+    shifted[:, :2] += cls[:, None].astype(np.float32) * 4096.0
+    kept = cv2.dnn.NMSBoxes(shifted.tolist(), best.tolist(), conf, iou)
+    kept = np.asarray(kept, dtype=np.int64).reshape(-1)
+
+    w, h = image_size
+    left, top = pad
+    cx = (boxes[kept, 0] - left) / scale / w
+    cy = (boxes[kept, 1] - top) / scale / h
+    bw = boxes[kept, 2] / scale / w
+    bh = boxes[kept, 3] / scale / h
+    out = np.column_stack([cls[kept], cx, cy, bw, bh]).astype(np.float64)
+    return out[np.argsort(out[:, 1], kind="stable")]
+
+
+class ColumnDetector:
+    """YOLO column detector on onnxruntime (`.onnx`) or OpenVINO (`.xml`)."""
+
+    def __init__(
+        self,
+        model_path: str,
+        imgsz: int = DEFAULT_IMGSZ,
+        conf: float = DEFAULT_CONF,
+        iou: float = DEFAULT_IOU,
+        threads: int | None = None,
+    ) -> None:
+        self.model_path = str(model_path)
+        self.imgsz = imgsz
+        self.conf = conf
+        self.iou = iou
+        suffix = Path(self.model_path).suffix.lower()
+        if suffix == ".onnx":
+            self._run = self._onnx_runner(threads)
+        elif suffix == ".xml":
+            self._run = self._openvino_runner(threads)
+        else:
+            raise ValueError(f"Unsupported detector format: {self.model_path} (.onnx or .xml)")
+
+    def _onnx_runner(self, threads: int | None):
+        try:
+            import onnxruntime as ort  # type: ignore
+        except ImportError:
+            raise ValueError("ONNX detector requires onnxruntime (pip install onnxruntime)") from None
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = int(threads)
+        session = ort.InferenceSession(self.model_path, options, providers=["CPUExecutionProvider"])
+        name = session.get_inputs()[0].name
+        return lambda blob: session.run(None, {name: blob})[0]
+
+    def _openvino_runner(self, threads: int | None):
+        try:
+            import openvino as ov  # type: ignore
+        except ImportError:
+            raise ValueError("OpenVINO detector requires openvino (pip install openvino)") from None
+        config = {"INFERENCE_NUM_THREADS": int(threads)} if threads else {}
+        compiled = ov.Core().compile_model(self.model_path, "CPU", config)
+        output = compiled.output(0)
+        return lambda blob: compiled(blob)[output]
+
+    def detect(self, bgr: np.ndarray) -> np.ndarray:
+        if bgr.ndim == 2:
+            bgr = cv2.cvtColor(bgr, cv2.COLOR_GRAY2BGR)
+        blob, scale, pad = letterbox(bgr, self.imgsz)
+        h, w = bgr.shape[:2]
+        return decode_detections(self._run(blob), scale, pad, (w, h), self.conf, self.iou)
+
+
+def torch_detect(model: object, bgr: np.ndarray, conf: float = DEFAULT_CONF, imgsz: int = DEFAULT_IMGSZ) -> np.ndarray:
+    """Reference boxes from an ultralytics model, in the same `(N, 5)` layout."""
+
+    result = model.predict(bgr, conf=conf, imgsz=imgsz, verbose=False)[0]  # type: ignore[attr-defined]
+    cls = result.boxes.cls.cpu().numpy().reshape(-1, 1)
+    xywhn = result.boxes.xywhn.cpu().numpy().reshape(-1, 4)
+    out = np.hstack([cls, xywhn]).astype(np.float64)
+    return out[np.argsort(out[:, 1], kind="stable")]
+
+
+def box_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU of normalized `cx cy w h` boxes, (len(a), len(b))."""
+
+    a1, a2 = a[:, None, :2] - a[:, None, 2:] / 2.0, a[:, None, :2] + a[:, None, 2:] / 2.0
+    b1, b2 = b[None, :, :2] - b[None, :, 2:] / 2.0, b[None, :, :2] + b[None, :, 2:] / 2.0
+    inter = np.clip(np.minimum(a2, b2) - np.maximum(a1, b1), 0.0, None).prod(axis=2)
+    union = a[:, None, 2:].prod(axis=2) + b[None, :, 2:].prod(axis=2) - inter
+    return inter / np.maximum(union, 1e-12)
+
+
+def compare_boxes(reference: np.ndarray, candidate: np.ndarray, min_iou: float = MIN_MATCH_IOU) -> Dict:
+    """Greedy IoU matching of class-0 (column) boxes."""
+
+    ref = reference[reference[:, 0] == 0][:, 1:]
+    cand = candidate[candidate[:, 0] == 0][:, 1:]
+    if ref.shape[0] == 0 or cand.shape[0] == 0:
+        return {"reference": int(ref.shape[0]), "candidate": int(cand.shape[0]), "matched": 0, "meanIou": None}
+    ious = box_iou(ref, cand)
+    matched: List[float] = []
+    used_ref, used_cand = set(), set()
+    for flat in np.argsort(-ious, axis=None):
+        i, j = divmod(int(flat), ious.shape[1])
+        if ious[i, j] < min_iou:
+            break
+        if i in used_ref or j in used_cand:
+            continue
+        used_ref.add(i)
+        used_cand.add(j)
+        matched.append(float(ious[i, j]))
+    return {
+        "reference": int(ref.shape[0]),
+        "candidate": int(cand.shape[0]),
+        "matched": len(matched),
+        "meanIou": round(float(np.mean(matched)), 4) if matched else None,
+    }
+
+
+def export_detector(
+    model_path: str,
+    fmt: str = "onnx",
+    imgsz: int = DEFAULT_IMGSZ,
+    int8: bool = False,
+    calibration_data: str | None = None,
+) -> str:
+    """Export a `.pt` detector; returns the path the runtime model was written to.
+
+    OpenVINO INT8 uses ultralytics' post-training quantization and needs a
+    dataset YAML (`calibration_data`). ONNX INT8 quantizes the weights of
+    the exported fp32 graph with onnxruntime (`*_int8.onnx`).
+    """
+
+    try:
+        from ultralytics import YOLO  # type: ignore
+    except ImportError:
+        raise ValueError("Export requires ultralytics (pip install ultralytics)") from None
+
+    model = YOLO(model_path)
+    if fmt == "openvino":
+        if int8 and not calibration_data:
+            raise ValueError("OpenVINO INT8 export needs --calibration-data (dataset YAML)")
+        out_dir = model.export(
+            format="openvino", imgsz=imgsz, dynamic=False, int8=int8, data=calibration_data
+        )
+        return str(next(Path(out_dir).glob("*.xml")))
+    if fmt != "onnx":
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    onnx_path = str(model.export(format="onnx", imgsz=imgsz, dynamic=False, simplify=True))
+    if not int8:
+        return onnx_path
+    try:
+        from onnxruntime.quantization import QuantType, quantize_dynamic  # type: ignore
+    except ImportError:
+        raise ValueError("ONNX INT8 export requires onnxruntime (pip install onnxruntime)") from None
+    int8_path = str(Path(onnx_path).with_name(Path(onnx_path).stem + "_int8.onnx"))
+    quantize_dynamic(onnx_path, int8_path, weight_type=QuantType.QInt8)
+    return int8_path
+
+
+def check_accuracy(
+    torch_model_path: str,
+    runtime_model_path: str,
+    images: List[Path],
+    conf: float = DEFAULT_CONF,
+    imgsz: int = DEFAULT_IMGSZ,
+    min_iou: float = MIN_MATCH_IOU,
+) -> Dict:
+    """Compare runtime boxes with PyTorch boxes on `images`; includes mean latencies."""
+
+    try:
+        from ultralytics import YOLO  # type: ignore
+    except ImportError:
+        raise ValueError("Accuracy check requires ultralytics for the PyTorch reference") from None
+
+    reference_model = YOLO(torch_model_path)
+    detector = ColumnDetector(runtime_model_path, imgsz=imgsz, conf=conf)
+    per_image: List[Dict] = []
+    torch_ms: List[float] = []
+    runtime_ms: List[float] = []
+    for path in images:
+        bgr = cv2.imread(str(path), cv2.IMREAD_COLOR)
+        if bgr is None:
+            raise ValueError(f"Cannot read image: {path}")
+        start = time.perf_counter()
+        reference = torch_detect(reference_model, bgr, conf=conf, imgsz=imgsz)
+        torch_ms.append((time.perf_counter() - start) * 1000.0)
+        start = time.perf_counter()
+        candidate = detector.detect(bgr)
+        runtime_ms.append((time.perf_counter() - start) * 1000.0)
+        entry = {"image": path.name}
+        entry.update(compare_boxes(reference, candidate, min_iou))
+        per_image.append(entry)
+
+    # Skip the first (warm-up) call of each backend in the latency means.
+    def mean_ms(values: List[float]) -> float:
+        tail = values[1:] or values
+        return round(float(np.mean(tail)), 2)
+
+    mismatched = [
+        e["image"] for e in per_image if e["matched"] != e["reference"] or e["matched"] != e["candidate"]
+    ]
+    return {
+        "images": len(per_image),
+        "mismatched": mismatched,
+        "torchMs": mean_ms(torch_ms),
+        "runtimeMs": mean_ms(runtime_ms),
+        "perImage": per_image,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export and serve the YOLO column detector without PyTorch")
+    parser.add_argument("--mode", choices=["export", "check", "predict"], required=True)
+    parser.add_argument("--model", help="Ultralytics .pt model (export / check reference)")
+    parser.add_argument("--runtime-model", help="Exported .onnx or OpenVINO .xml model")
+    parser.add_argument("--format", choices=["onnx", "openvino"], default="onnx")
+    parser.add_argument("--int8", action="store_true", help="Quantize the exported model to INT8")
+    parser.add_argument("--calibration-data", help="Dataset YAML for OpenVINO INT8 calibration")
+    parser.add_argument("--imgsz", type=int, default=DEFAULT_IMGSZ)
+    parser.add_argument("--conf", type=float, default=DEFAULT_CONF)
+    parser.add_argument("--image", nargs="+", help="Images (check: default bundled samples)")
+    args = parser.parse_args()
+
+    try:
+        if args.mode == "export":
+            if not args.model:
+                raise ValueError("--mode export requires --model")
+            path = export_detector(args.model, args.format, args.imgsz, args.int8, args.calibration_data)
+            print(json.dumps({"runtimeModel": path}))
+            return
+
+        if not args.runtime_model:
+            raise ValueError(f"--mode {args.mode} requires --runtime-model")
+
+        if args.mode == "predict":
+            if not args.image:
+                raise ValueError("--mode predict requires --image")
+            detector = ColumnDetector(args.runtime_model, imgsz=args.imgsz, conf=args.conf)
+            results = []
+            for path in args.image:
+                bgr = cv2.imread(path, cv2.IMREAD_COLOR)
+                if bgr is None:
+                    raise ValueError(f"Cannot read image: {path}")
+                results.append({"image": path, "boxes": detector.detect(bgr).round(6).tolist()})
+            print(json.dumps(results, indent=2))
+            return
+
+        if not args.model:
+            raise ValueError("--mode check requires --model for the PyTorch reference")
+        if args.image:
+            images = [Path(p) for p in args.image]
+        else:
+            images = sorted(
+                p for d in DEFAULT_IMAGE_DIRS for p in d.iterdir() if p.suffix.lower() in {".jpg", ".jpeg", ".png"}
+            )
+        report = check_accuracy(args.model, args.runtime_model, images, args.conf, args.imgsz)
+        print(json.dumps(report, indent=2))
+        if report["mismatched"]:
+            raise SystemExit(1)
+    except ValueError as e:
+        raise SystemExit(str(e))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
@@ -0,0 +1,528 @@
+"""One grading engine with pluggable bubble locators.
+
+`omr_pipeline` grades sheets from template centers. Here the only part
+that differs between ways of finding bubbles is the locator, which turns
+an aligned page into bubble centers. Everything after it is the shared
+vectorized stage in `omr_pipeline.grade_aligned`: crop, classify,
+calibrate the per-sheet cutoff, shape `studentAnswers`, and optionally
+persist confidences in the `ConfidenceStore`.
+
+`AI/OmrPredict/*/predict.py` reads sheets through this engine
+(`omr_predict`) with a `YoloColumnLocator`. YOLO only boxes the answer
+columns; inside each box the printed bubbles are found, grouped into
+option columns and rows, and a line is fitted through each, so the
+centers follow the print even where the box or the photo is skewed.
+
+Locators:
+- `TemplateLocator`: fixed centers from a bubble map (`exam.omrTemplate`).
+- `LearnedGridLocator`: layout-index lookup, else a contour-learned grid.
+- `YoloColumnLocator`: YOLO answer-column boxes, with the 50 rows and
+  options A-D located inside each box (`locate_column`).
+
+    engine = OmrEngine(YoloColumnLocator(model_path="rectangleOmrOri_yolo_model.pt"))
+    result = engine.grade_path("sheet.jpg")  # {"studentAnswers": [...]}
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+from omr_buffers import BufferPool
+from omr_detector import ColumnDetector
+from omr_layouts import LayoutIndex
+from omr_pipeline import (
+    TEMPLATE_HEIGHT,
+    TEMPLATE_WIDTH,
+    BubbleClassifier,
+    _normalize_bubble_centers,
+    _contour_candidates,
+    _normalize_fields,
+    align_gray,
+    grade_aligned,
+    locate_centers,
+    read_gray,
+)
+from omr_quality import QUALITY_SCALE, SheetQualityError, assess_quality, template_match
+from omr_refine import DEFAULT_RADIUS
+from omr_store import ConfidenceStore, file_sha256
+
+BubbleCenters = Dict[int, Dict[str, Tuple[int, int]]]
+
+# Each YOLO answer-column box holds 50 rows of options A-D. The printed
+# bubble is about a tenth of the box width.
+COLUMN_ROWS = 50
+COLUMN_OPTIONS = "ABCD"
+BUBBLE_WIDTH_FRACTION = 0.1
+# An option column must be found in at least this share of the rows.
+MIN_COLUMN_HITS = 0.3
+# predict.py's old geometry (95x750 resize, 5 px trimmed at the top, 12 at
+# the bottom, equal rows), used only to decide which row a partly found
+# grid starts at.
+COLUMN_SIZE = (95, 750)
+COLUMN_TRIM = (5, 12)
+YOLO_CONFIDENCE = 0.6
+
+# Cached column boxes are reused for a sheet of the same layout: the page
+# must phase-correlate with the page they were detected on (peak response
+# at least REGISTRATION_RESPONSE; scans of one design reach ~0.15-0.35,
+# differently framed photos stay under ~0.08), and the bubble grid found in
+# the shifted boxes must line up: its `template_match` score may drop at
+# most REGISTRATION_TOLERANCE below the score at detection, never below
+# the floor.
+REGISTRATION_RESPONSE = 0.12
+REGISTRATION_TOLERANCE = 0.05
+REGISTRATION_FLOOR = 0.6
+MAX_CACHED_LAYOUTS = 8
+
+Box = Tuple[int, int, int, int]
+
+class TemplateLocator:
+    name = "template"
+
+    def __init__(self, bubble_centers: BubbleCenters) -> None:
+        self.bubble_centers = bubble_centers
+
+    def locate(self, aligned: np.ndarray, pool: BufferPool | None = None) -> BubbleCenters:
+        return self.bubble_centers
+
+
+class LearnedGridLocator:
+    name = "learned"
+    bubble_centers = None
+
+    def __init__(self, layouts: LayoutIndex | None = None) -> None:
+        self.layouts = layouts
+
+    def locate(self, aligned: np.ndarray, pool: BufferPool | None = None) -> BubbleCenters:
+        return locate_centers(aligned, layouts=self.layouts, pool=pool)
+
+
+def parse_yolo_labels(text: str) -> np.ndarray:
+    """YOLO label text (`class cx cy w h` per line, normalized) as an (N, 5) array."""
+
+    rows = [line.split() for line in text.strip().splitlines() if line.strip()]
+    return np.array(rows, dtype=np.float64).reshape(-1, 5)
+
+
+def column_boxes(boxes: np.ndarray, page_size: Tuple[int, int]) -> List[Box]:
+    """Pixel `(x1, y1, x2, y2)` of every class-0 box, left to right, clipped to the page."""
+
+    cols = boxes[boxes[:, 0] == 0]
+    cols = cols[np.argsort(cols[:, 1], kind="stable")]
+    w, h = page_size
+    return [
+        (
+            max(0, int((cx - bw / 2.0) * w)),
+            max(0, int((cy - bh / 2.0) * h)),
+            min(w, int((cx + bw / 2.0) * w)),
+            min(h, int((cy + bh / 2.0) * h)),
+        )
+        for _, cx, cy, bw, bh in cols
+    ]
+
+
+def _strip_lines(binary: np.ndarray, length: int) -> np.ndarray:
+    """Remove straight strokes at least `length` px long (the column frame)."""
+
+    length = max(3, int(length))
+    vertical = cv2.getStructuringElement(cv2.MORPH_RECT, (1, length))
+    horizontal = cv2.getStructuringElement(cv2.MORPH_RECT, (length, 1))
+    lines = cv2.morphologyEx(binary, cv2.MORPH_OPEN, vertical)
+    lines |= cv2.morphologyEx(binary, cv2.MORPH_OPEN, horizontal)
+    return cv2.subtract(binary, lines)
+
+
+def _groups(values: List[float], tol: float) -> List[List[int]]:
+    """Indices of `values` grouped like `_cluster_sorted_1d`, in ascending order."""
+
+    order = sorted(range(len(values)), key=lambda i: values[i])
+    groups: List[List[int]] = []
+    mean = 0.0
+    for i in order:
+        if groups and abs(values[i] - mean) <= tol:
+            groups[-1].append(i)
+            mean = float(np.mean([values[j] for j in groups[-1]]))
+        else:
+            groups.append([i])
+            mean = values[i]
+    return groups
+
+
+def locate_column(
+    aligned: np.ndarray,
+    box: Box,
+    rows: int = COLUMN_ROWS,
+    options: str = COLUMN_OPTIONS,
+) -> Dict[int, Dict[str, Tuple[int, int]]] | None:
+    """Bubble centers of one answer column by 0-based row, or None if its grid is not found.
+
+    The printed bubbles inside `box` are found as round contours. Their x
+    positions give the option columns: the run of `len(options)`
+    neighbouring clusters that holds the most bubbles, which skips the
+    question numbers. Each option's x is fitted as a line in y, so a
+    slightly rotated page still lines up. Row centers are fitted as an
+    evenly spaced lattice through the rows that were found, so a blank or
+    missed row neither shifts the rows below it nor ends up between two
+    rows.
+    """
+
+    x1, y1, x2, y2 = box
+    crop = aligned[y1:y2, x1:x2]
+    if crop.shape[0] < rows or crop.shape[1] < len(options):
+        return None
+    size = (x2 - x1) * BUBBLE_WIDTH_FRACTION
+    blur = cv2.GaussianBlur(crop, (5, 5), 0)
+    _, binary = cv2.threshold(blur, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    contours, _ = cv2.findContours(
+        _strip_lines(binary, 4 * size), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+    )
+    bubbles = [
+        (cx, cy)
+        for cx, cy, _, w, h in _contour_candidates(contours)
+        if 0.6 * size <= max(w, h) <= 1.6 * size
+    ]
+    if not bubbles:
+        return None
+
+    xs = [b[0] for b in bubbles]
+    columns = _groups(xs, size / 2.0)
+    n = len(options)
+    if len(columns) < n:
+        return None
+    start = max(range(len(columns) - n + 1), key=lambda s: sum(len(c) for c in columns[s : s + n]))
+    columns = columns[start : start + n]
+    if min(len(c) for c in columns) < MIN_COLUMN_HITS * rows:
+        return None
+
+    members = [i for c in columns for i in c]
+    ys = [bubbles[i][1] for i in members]
+    row_y = np.array([np.mean([ys[i] for i in g]) for g in _groups(ys, size / 2.0)])
+    if row_y.shape[0] < MIN_COLUMN_HITS * rows:
+        return None
+    # Number the rows found by their spacing, allowing for skipped rows.
+    pitch = float(np.median(np.diff(row_y)))
+    index = np.concatenate([[0], np.cumsum(np.maximum(1, np.rint(np.diff(row_y) / pitch)))])
+    if index[-1] >= rows:
+        # More rows than the column holds: keep the densest window of `rows`.
+        first = max(range(int(index[-1]) - rows + 2), key=lambda s: np.sum((index >= s) & (index < s + rows)))
+        keep = (index >= first) & (index < first + rows)
+        row_y, index = row_y[keep], index[keep] - first
+    slope, intercept = np.polyfit(index, row_y, 1)
+
+    # Rows missing at either end: line the grid up with the box geometry.
+    cw, ch = COLUMN_SIZE
+    top, bottom = COLUMN_TRIM
+    scale = crop.shape[0] / float(ch)
+    expected = (top + (np.arange(rows) + 0.5) * (ch - top - bottom) / float(rows)) * scale
+    fitted = intercept + slope * index
+    offset = min(
+        range(rows - int(index[-1])),
+        key=lambda o: float(np.abs(fitted - expected[(index + o).astype(int)]).sum()),
+    )
+
+    lines = []
+    for c in columns:
+        cx = np.array([bubbles[i][0] for i in c])
+        cy = np.array([bubbles[i][1] for i in c])
+        lines.append(np.polyfit(cy, cx, 1) if np.ptp(cy) > 0 else np.array([0.0, cx.mean()]))
+
+    centers: Dict[int, Dict[str, Tuple[int, int]]] = {}
+    for r in range(rows):
+        y = intercept + slope * (r - offset)
+        centers[r] = {
+            opt: (int(round(np.polyval(lines[i], y))) + x1, int(round(y)) + y1)
+            for i, opt in enumerate(options)
+        }
+    return centers
+
+
+def column_centers(
+    aligned: np.ndarray,
+    boxes: np.ndarray,
+    rows: int = COLUMN_ROWS,
+    options: str = COLUMN_OPTIONS,
+) -> BubbleCenters:
+    """Bubble centers of every answer column, numbered column by column left to right.
+
+    `boxes` is (N, 5) `class cx cy w h` normalized; only class 0 is used.
+    Raises ValueError if a column's bubble grid cannot be found.
+    """
+
+    page = (aligned.shape[1], aligned.shape[0])
+    centers: BubbleCenters = {}
+    for c, box in enumerate(column_boxes(boxes, page)):
+        found = locate_column(aligned, box, rows, options)
+        if found is None:
+            raise ValueError(f"No bubble grid found in answer column {c + 1}")
+        for r, opts in found.items():
+            centers[c * rows + r + 1] = opts
+    return centers
+
+
+class YoloColumnLocator:
+    """Answer columns from a YOLO detector (or from saved YOLO label text).
+
+    `.onnx` / `.xml` models exported by `omr_detector` run on onnxruntime /
+    OpenVINO; `.pt` models need `ultralytics`, imported only when a model
+    actually has to run.
+    """
+
+    name = "yolo"
+    bubble_centers = None
+
+    def __init__(
+        self,
+        model_path: str | None = None,
+        labels: str | None = None,
+        conf: float = YOLO_CONFIDENCE,
+        reuse_boxes: bool = True,
+        max_layouts: int = MAX_CACHED_LAYOUTS,
+    ) -> None:
+        if model_path is None and labels is None:
+            raise ValueError("YoloColumnLocator needs a model path or label text")
+        self.model_path = model_path
+        self.labels = labels
+        self.conf = conf
+        self.reuse_boxes = reuse_boxes
+        self.max_layouts = max_layouts
+        self._model = None
+        # Most recently used first: {"boxes", "baseline", "page"}.
+        self._layouts: List[Dict] = []
+        # Column boxes (normalized `class cx cy w h`) of the last located sheet.
+        self.boxes: np.ndarray | None = None
+        self.detections = 0
+        self.reused = 0
+
+    def _detect(self, aligned: np.ndarray) -> np.ndarray:
+        if self.labels is not None:
+            return parse_yolo_labels(self.labels)
+        bgr = cv2.cvtColor(aligned, cv2.COLOR_GRAY2BGR)
+        if self._model is None:
+            if str(self.model_path).lower().endswith((".onnx", ".xml")):
+                # Exported detector (omr_detector): no PyTorch import.
+                self._model = ColumnDetector(str(self.model_path), conf=self.conf)
+            else:
+                try:
+                    from ultralytics import YOLO  # type: ignore
+                except ImportError:
+                    raise ValueError("YOLO locator requires ultralytics (pip install ultralytics)") from None
+                self._model = YOLO(self.model_path)
+        if isinstance(self._model, ColumnDetector):
+            return self._model.detect(bgr)
+        result = self._model.predict(bgr, conf=self.conf, verbose=False)[0]
+        cls = result.boxes.cls.cpu().numpy().reshape(-1, 1)
+        xywhn = result.boxes.xywhn.cpu().numpy().reshape(-1, 4)
+        return np.hstack([cls, xywhn])
+
+    def _registered(self, aligned: np.ndarray, small: np.ndarray) -> BubbleCenters | None:
+        """Centers inside the first cached layout's boxes, moved onto this sheet, if they line up."""
+
+        page = small.astype(np.float32)
+        window = cv2.createHanningWindow((page.shape[1], page.shape[0]), cv2.CV_32F)
+        for i, layout in enumerate(self._layouts):
+            if layout["page"].shape != page.shape:
+                continue
+            (dx, dy), response = cv2.phaseCorrelate(layout["page"], page, window)
+            if response < REGISTRATION_RESPONSE:
+                continue
+            boxes = layout["boxes"].copy()
+            boxes[:, 1] += dx / page.shape[1]
+            boxes[:, 2] += dy / page.shape[0]
+            try:
+                centers = column_centers(aligned, boxes)
+            except ValueError:
+                continue
+            score = template_match(small, centers, float(QUALITY_SCALE))
+            if score >= max(REGISTRATION_FLOOR, layout["baseline"] - REGISTRATION_TOLERANCE):
+                self._layouts.insert(0, self._layouts.pop(i))
+                self.boxes = boxes
+                return centers
+        return None
+
+    def locate(self, aligned: np.ndarray, pool: BufferPool | None = None) -> BubbleCenters:
+        """Bubble centers found inside cached column boxes if they register, else inside fresh ones.
+
+        Boxes are kept normalized to the page, so one detection serves every
+        sheet of the same layout: they are shifted by the offset between the
+        two pages (phase correlation) and the rows and options are still
+        located on each sheet inside them (`locate_column`). Only a failed
+        registration check runs the detector again.
+        """
+
+        small = None
+        if self.reuse_boxes:
+            shape = aligned.shape[:2]
+            small = cv2.resize(
+                aligned,
+                (shape[1] // QUALITY_SCALE, shape[0] // QUALITY_SCALE),
+                interpolation=cv2.INTER_AREA,
+            )
+            centers = self._registered(aligned, small)
+            if centers is not None:
+                self.reused += 1
+                return centers
+
+        boxes = self._detect(aligned)
+        self.detections += 1
+        if not np.any(boxes[:, 0] == 0):
+            raise ValueError("YOLO found no answer columns on the sheet")
+        centers = column_centers(aligned, boxes)
+        self.boxes = boxes
+        if small is not None:
+            baseline = template_match(small, centers, float(QUALITY_SCALE))
+            self._layouts.insert(
+                0, {"boxes": boxes, "baseline": baseline, "page": small.astype(np.float32)}
+            )
+            del self._layouts[self.max_layouts :]
+        return centers
+
+
+class OmrEngine:
+    def __init__(
+        self,
+        locator: TemplateLocator | LearnedGridLocator | YoloColumnLocator,
+        model_path: str | None = None,
+        store: ConfidenceStore | None = None,
+        selection_threshold: float | None = None,
+        normalize_lighting: bool = True,
+        quality_gate: bool = True,
+        fields: Dict[str, List[Dict[str, Tuple[int, int]]]] | None = None,
+        pool: BufferPool | None = None,
+        refine: int = 0,
+        refine_radius: int = DEFAULT_RADIUS,
+    ) -> None:
+        self.locator = locator
+        self.classifier = BubbleClassifier(model_path=model_path)
+        self.store = store
+        self.selection_threshold = selection_threshold
+        self.normalize_lighting = normalize_lighting
+        self.quality_gate = quality_gate
+        self.fields = fields
+        self.pool = BufferPool() if pool is None else pool
+        self.refine = refine
+        self.refine_radius = refine_radius
+
+    def grade(self, gray: np.ndarray, image_hash: str | None = None) -> Dict:
+        """Grade one decoded grayscale page; raises SheetQualityError on unusable photos."""
+
+        if self.quality_gate:
+            report = assess_quality(
+                gray, self.locator.bubble_centers, template_size=(TEMPLATE_WIDTH, TEMPLATE_HEIGHT)
+            )
+            if not report["ok"]:
+                raise SheetQualityError(report["reason"], report["metrics"])
+        aligned = align_gray(gray, pool=self.pool)
+        centers = self.locator.locate(aligned, pool=self.pool)
+        return grade_aligned(
+            aligned,
+            self.classifier,
+            centers,
+            store=self.store,
+            image_hash=image_hash,
+            selection_threshold=self.selection_threshold,
+            normalize_lighting=self.normalize_lighting,
+            pool=self.pool,
+            fields=self.fields,
+            refine=self.refine,
+            refine_radius=self.refine_radius,
+        )
+
+    def grade_path(self, image_path: str) -> Dict:
+        image_hash = file_sha256(image_path) if self.store is not None else None
+        return self.grade(read_gray(image_path), image_hash=image_hash)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Grade OMR sheets with a chosen bubble locator")
+    parser.add_argument("--locator", choices=["template", "learned", "yolo"], required=True)
+    parser.add_argument("--image", required=True, nargs="+")
+    parser.add_argument("--bubble-map", help="Bubble-map JSON (template locator)")
+    parser.add_argument("--layout-index", help="Known layouts directory (learned locator)")
+    parser.add_argument("--yolo-model", help="YOLO column model .pt, or exported .onnx/.xml (yolo locator)")
+    parser.add_argument("--yolo-labels", help="Saved YOLO label .txt instead of running the model")
+    parser.add_argument("--model", help="Optional Keras bubble classifier .h5 path", default=None)
+    parser.add_argument("--store", help="Directory of stored bubble confidences")
+    parser.add_argument("--threshold", type=float, default=None)
+    parser.add_argument("--no-quality-gate", action="store_true")
+    parser.add_argument("--no-normalize", action="store_true")
+    parser.add_argument(
+        "--refine-centers",
+        type=int,
+        default=0,
+        metavar="PX",
+        help="Snap located bubble centers to the printed bubble within PX pixels (0 = off)",
+    )
+    parser.add_argument(
+        "--refine-radius",
+        type=int,
+        default=DEFAULT_RADIUS,
+        metavar="PX",
+        help=f"Printed bubble radius on the template for --refine-centers (default {DEFAULT_RADIUS})",
+    )
+    parser.add_argument(
+        "--no-box-cache",
+        action="store_true",
+        help="Run YOLO on every sheet instead of reusing registered column boxes",
+    )
+    args = parser.parse_args()
+
+    try:
+        fields = None
+        if args.locator == "template":
+            if not args.bubble_map:
+                raise ValueError("--locator template requires --bubble-map")
+            with open(args.bubble_map, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+            if isinstance(raw, dict) and "bubbleCenters" in raw:
+                fields = _normalize_fields(raw.get("fields")) or None
+                raw = raw["bubbleCenters"]
+            locator: TemplateLocator | LearnedGridLocator | YoloColumnLocator = TemplateLocator(
+                _normalize_bubble_centers(raw)
+            )
+        elif args.locator == "learned":
+            locator = LearnedGridLocator(LayoutIndex(args.layout_index) if args.layout_index else None)
+        else:
+            labels = None
+            if args.yolo_labels:
+                with open(args.yolo_labels, "r", encoding="utf-8") as f:
+                    labels = f.read()
+            locator = YoloColumnLocator(
+                model_path=args.yolo_model, labels=labels, reuse_boxes=not args.no_box_cache
+            )
+
+        engine = OmrEngine(
+            locator,
+            model_path=args.model,
+            store=ConfidenceStore(args.store) if args.store else None,
+            selection_threshold=args.threshold,
+            normalize_lighting=not args.no_normalize,
+            quality_gate=not args.no_quality_gate,
+            fields=fields,
+            refine=args.refine_centers,
+            refine_radius=args.refine_radius,
+        )
+
+        results = []
+        for path in args.image:
+            try:
+                entry: Dict = {"source": path}
+                entry.update(engine.grade_path(path))
+            except SheetQualityError as e:
+                entry.update(e.to_json())
+            except ValueError as e:
+                entry["error"] = str(e)
+            results.append(entry)
+        print(json.dumps(results, indent=2))
+        if isinstance(locator, YoloColumnLocator):
+            stats = {"detections": locator.detections, "reusedBoxes": locator.reused}
+            print(json.dumps(stats), file=sys.stderr)
+    except Exception as e:
+        raise SystemExit(str(e))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
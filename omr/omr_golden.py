@@ -0,0 +1,416 @@
+"""Golden-output regression check with a throughput gate.
+
+Optimizing `learn_bubble_centers_from_image`, the bubble scoring or the
+YOLO column geometry is only safe if the graded output stays the same.
+This module grades every bundled sample sheet through `omr_engine` and
+compares the result with a recorded snapshot:
+
+    python omr/omr_golden.py --record        # after an intended output change
+    python omr/omr_golden.py                 # exit 1 on any drift
+
+Per sheet and locator the snapshot keeps, in question order, the selected
+option, the bubble center and the confidence of every question (or the
+error message). Question numbers, selections and centers must match
+exactly; confidences must match bit for bit unless `--tolerance` allows an
+absolute difference.
+
+Every sheet is graded without a quality gate by:
+- `learned`: the learned-grid locator.
+- `template`: a `TemplateLocator` with the sheet's bubble map from
+  `golden/bubble_maps.json`. The dataset photos are copies of eight
+  distinct photos of one 200-question design; each map was located once
+  and checked by eye against its photo.
+- `yolo`: the YOLO column locator, seeded with the saved labels of one
+  sheet per directory (`AI/predict/results/labels/<stem>.txt`, as written
+  by `predict.py`). The other sheets of that directory are read through
+  the locator's box cache, as `omr_predict.read_answers` reads a batch;
+  a sheet that does not register against those boxes is an error entry.
+
+Beyond the snapshot, two checks compare against known answers:
+- `omr_predict.final_answers` on the sheets in `golden/answers.json`
+  (omr_10's 200 answers, read off the photo by eye) must return exactly
+  those answers.
+- Synthetic sheets from `omr_synth` (mild noise, blur, lighting and
+  perspective) are graded with their bubble map and must match
+  `truth.jsonl` exactly.
+
+The throughput gate is machine-local: sheets/second depend on the
+hardware, so no baseline is committed. `--record-baseline` times grading
+every sheet (decode included, best of `--repeat` runs) and writes
+`golden/throughput.local.json` (git-ignored) with a description of the
+machine. Whenever that file exists, every run also fails if sheets/second
+fall more than `--max-slowdown` below it (`--no-throughput` skips the
+gate), and refuses to compare against a baseline recorded on a different
+machine.
+
+    python omr/omr_golden.py --record-baseline   # once, on the unchanged tree
+    python omr/omr_golden.py                     # after an optimization
+
+With `--yolo-model` (the ultralytics `.pt`) and `--runtime-model` (its
+`omr_detector` export) the check also runs both detectors on the bundled
+images and fails unless every column box matches at IoU >= 0.9; the
+per-image result is included in the report.
+
+    python omr/omr_golden.py --yolo-model rectangleOmrOri_yolo_model.pt \\
+        --runtime-model rectangleOmrOri_yolo_model_int8.onnx
+"""
+
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from omr_detector import check_accuracy
+from omr_engine import LearnedGridLocator, OmrEngine, TemplateLocator, YoloColumnLocator
+from omr_pipeline import _normalize_bubble_centers, read_gray
+from omr_predict import final_answers
+from omr_synth import generate, verify
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_IMAGE_DIRS = [
+    REPO_ROOT / "AI" / "omr for dataset",
+    REPO_ROOT / "AI" / "OmrPredict" / "ForStudent" / "images" / "omr",
+]
+DEFAULT_LABEL_DIR = REPO_ROOT / "AI" / "predict" / "results" / "labels"
+DEFAULT_SNAPSHOT = Path(__file__).resolve().parent / "golden" / "snapshot.json"
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "golden" / "throughput.local.json"
+DEFAULT_MAPS = Path(__file__).resolve().parent / "golden" / "bubble_maps.json"
+DEFAULT_ANSWERS = Path(__file__).resolve().parent / "golden" / "answers.json"
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".tif", ".tiff"}
+MAX_SLOWDOWN = 0.2
+SNAPSHOT_VERSION = 1
+SYNTH_SHEETS = 6
+SYNTH_SEED = 7
+SYNTH_DISTORTION = {"noise": 6.0, "blur": 1.5, "warp": 0.004, "gradient": 0.3}
+
+
+def find_images(dirs: List[Path]) -> List[Path]:
+    images: List[Path] = []
+    for d in dirs:
+        images.extend(p for p in d.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+    return sorted(images)
+
+
+def _key(path: Path) -> str:
+    try:
+        return path.resolve().relative_to(REPO_ROOT).as_posix()
+    except ValueError:
+        return path.as_posix()
+
+
+def load_bubble_maps(path: Path) -> Dict[str, TemplateLocator]:
+    """Template locator per image key, from `{name: {"images", "bubbleCenters"}}`."""
+
+    with open(path, "r", encoding="utf-8") as f:
+        maps = json.load(f)
+    locators: Dict[str, TemplateLocator] = {}
+    for entry in maps.values():
+        locator = TemplateLocator(_normalize_bubble_centers(entry["bubbleCenters"]))
+        for key in entry["images"]:
+            locators[key] = locator
+    return locators
+
+
+def _snapshot_result(result: Dict) -> Dict:
+    answers = result["studentAnswers"]
+    return {
+        "questions": [a["questionNumber"] for a in answers],
+        "selected": [a["selectedOption"] for a in answers],
+        "centers": [[int(a["centerX"]), int(a["centerY"])] for a in answers],
+        "confidence": [a["confidence"] for a in answers],
+    }
+
+
+def _grade(engine: OmrEngine, gray: np.ndarray) -> Dict:
+    try:
+        return _snapshot_result(engine.grade(gray))
+    except ValueError as e:
+        return {"error": str(e)}
+
+
+def _yolo_engines(images: List[Path], label_dir: Path) -> Dict[Path, Tuple[Path, OmrEngine]]:
+    """Per image directory: its sheet with saved YOLO labels and an engine holding those boxes."""
+
+    engines: Dict[Path, Tuple[Path, OmrEngine]] = {}
+    for path in images:
+        labels = label_dir / f"{path.stem}.txt"
+        if labels.exists() and path.parent not in engines:
+            locator = YoloColumnLocator(labels=labels.read_text(encoding="utf-8"))
+            engines[path.parent] = (path, OmrEngine(locator, quality_gate=False))
+    return engines
+
+
+def grade_samples(
+    images: List[Path], label_dir: Path, maps: Dict[str, TemplateLocator]
+) -> Dict[str, Dict[str, Dict]]:
+    templates = {key: OmrEngine(locator, quality_gate=False) for key, locator in maps.items()}
+    yolo = _yolo_engines(images, label_dir)
+    # The labeled sheet goes first so the others can register against its boxes.
+    seeded = {labeled: _grade(engine, read_gray(str(labeled))) for labeled, engine in yolo.values()}
+
+    outputs: Dict[str, Dict[str, Dict]] = {}
+    for path in images:
+        gray = read_gray(str(path))
+        key = _key(path)
+        learned = OmrEngine(LearnedGridLocator(), quality_gate=False)
+        per_locator: Dict[str, Dict] = {"learned": _grade(learned, gray)}
+        if key in templates:
+            per_locator["template"] = _grade(templates[key], gray)
+        if path.parent in yolo:
+            labeled, engine = yolo[path.parent]
+            if path == labeled:
+                per_locator["yolo"] = seeded[path]
+            else:
+                detections = engine.locator.detections
+                result = _grade(engine, gray)
+                if engine.locator.detections != detections:
+                    result = {"error": f"did not register against the column boxes of {labeled.name}"}
+                per_locator["yolo"] = result
+        outputs[key] = per_locator
+    return outputs
+
+
+def check_answers(answers_path: Path, label_dir: Path) -> List[str]:
+    """`final_answers` against answers read off the sheets by eye."""
+
+    with open(answers_path, "r", encoding="utf-8") as f:
+        expected = json.load(f)
+    failures: List[str] = []
+    for key, answers in sorted(expected.items()):
+        path = REPO_ROOT / key
+        labels = (label_dir / f"{path.stem}.txt").read_text(encoding="utf-8")
+        try:
+            got = "".join(final_answers(str(path), labels))
+        except ValueError as e:
+            failures.append(f"{key} [final_answers]: {e}")
+            continue
+        wrong = [q + 1 for q, (a, b) in enumerate(zip(answers, got)) if a != b]
+        if len(got) != len(answers) or wrong:
+            failures.append(
+                f"{key} [final_answers]: {len(got)} answers, "
+                f"wrong at questions {wrong[:10]}{'...' if len(wrong) > 10 else ''}"
+            )
+    return failures
+
+
+def check_synthetic(count: int = SYNTH_SHEETS, seed: int = SYNTH_SEED) -> Tuple[Dict, List[str]]:
+    """Grade freshly rendered sheets against their ground truth."""
+
+    with tempfile.TemporaryDirectory() as out:
+        for _ in generate(out, count, seed=seed, distortion=SYNTH_DISTORTION):
+            pass
+        report = verify(out)
+    if report["errors"] or report["answerAccuracy"] != 1.0 or report["fieldAccuracy"] != 1.0:
+        return report, [
+            f"synthetic: {report['errors']} errors, answer accuracy {report['answerAccuracy']}, "
+            f"field accuracy {report['fieldAccuracy']}"
+        ]
+    return report, []
+
+
+def measure_throughput(images: List[Path], repeat: int = 3) -> float:
+    """Best sheets/second over `repeat` passes of learned-grid grading, decode included."""
+
+    engine = OmrEngine(LearnedGridLocator(), quality_gate=False)
+    engine.grade(read_gray(str(images[0])))  # warm up caches and lazy imports
+    best = float("inf")
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        for path in images:
+            # Sample sheets come from different designs, so no learned grid
+            # region carries over; the buffers themselves are still reused.
+            engine.pool.cache.clear()
+            try:
+                engine.grade(read_gray(str(path)))
+            except ValueError:
+                pass
+        best = min(best, time.perf_counter() - start)
+    return len(images) / best
+
+
+def machine() -> Dict:
+    """What a throughput baseline is only valid for."""
+
+    return {
+        "node": platform.node(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpus": os.cpu_count(),
+        "python": platform.python_version(),
+    }
+
+
+def check_throughput(baseline: Dict, rate: float, max_slowdown: float = MAX_SLOWDOWN) -> List[str]:
+    if baseline.get("machine") != machine():
+        raise ValueError(
+            "Throughput baseline was recorded on a different machine; "
+            "rerun with --record-baseline on this one"
+        )
+    expected = float(baseline["sheetsPerSecond"])
+    if rate < expected * (1.0 - max_slowdown):
+        return [
+            f"throughput {rate:.2f} sheets/s is below baseline {expected:.2f} "
+            f"minus {max_slowdown:.0%}"
+        ]
+    return []
+
+
+def compare_result(expected: Dict, actual: Dict, tolerance: float = 0.0) -> str | None:
+    """First difference between two snapshot entries, or None if they agree."""
+
+    if "error" in expected or "error" in actual:
+        if expected.get("error") != actual.get("error"):
+            return f"error {expected.get('error')!r} -> {actual.get('error')!r}"
+        return None
+    for field in ("questions", "selected", "centers"):
+        if expected[field] != actual[field]:
+            diff = next(
+                (i for i, (a, b) in enumerate(zip(expected[field], actual[field])) if a != b),
+                min(len(expected[field]), len(actual[field])),
+            )
+            return f"{field} differ from position {diff} ({len(expected[field])} vs {len(actual[field])} questions)"
+    worst = max(
+        (abs(a - b) for a, b in zip(expected["confidence"], actual["confidence"])), default=0.0
+    )
+    if worst > tolerance:
+        return f"confidence differs by up to {worst:.3g} (tolerance {tolerance:g})"
+    return None
+
+
+def check(
+    snapshot: Dict,
+    outputs: Dict[str, Dict[str, Dict]],
+    tolerance: float = 0.0,
+) -> List[str]:
+    failures: List[str] = []
+    expected_images = snapshot.get("images", {})
+    for key in sorted(set(expected_images) | set(outputs)):
+        if key not in outputs:
+            failures.append(f"{key}: in snapshot but not found")
+            continue
+        if key not in expected_images:
+            failures.append(f"{key}: not in snapshot (run with --record)")
+            continue
+        for locator in sorted(set(expected_images[key]) | set(outputs[key])):
+            if locator not in outputs[key] or locator not in expected_images[key]:
+                failures.append(f"{key} [{locator}]: locator added or removed")
+                continue
+            diff = compare_result(expected_images[key][locator], outputs[key][locator], tolerance)
+            if diff:
+                failures.append(f"{key} [{locator}]: {diff}")
+    return failures
+
+
+def _write_snapshot(path: Path, snapshot: Dict) -> None:
+    # One line per sheet and locator keeps diffs of re-recorded snapshots readable.
+    lines = ["{", f'  "version": {SNAPSHOT_VERSION},', '  "images": {']
+    keys = sorted(snapshot["images"])
+    for i, key in enumerate(keys):
+        lines.append(f"    {json.dumps(key)}: {{")
+        per_locator = snapshot["images"][key]
+        names = sorted(per_locator)
+        for j, name in enumerate(names):
+            sep = "," if j < len(names) - 1 else ""
+            lines.append(f"      {json.dumps(name)}: {json.dumps(per_locator[name])}{sep}")
+        lines.append("    }" + ("," if i < len(keys) - 1 else ""))
+    lines += ["  }", "}"]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Golden-output regression and throughput check")
+    parser.add_argument("--record", action="store_true", help="Rewrite the snapshot")
+    parser.add_argument("--snapshot", default=str(DEFAULT_SNAPSHOT))
+    parser.add_argument(
+        "--record-baseline",
+        action="store_true",
+        help="Measure throughput on this machine and write the local baseline",
+    )
+    parser.add_argument(
+        "--throughput",
+        action="store_true",
+        help="Require the throughput gate (fail if no local baseline exists)",
+    )
+    parser.add_argument("--no-throughput", action="store_true", help="Skip the throughput gate")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE), help="Local throughput baseline")
+    parser.add_argument("--images", nargs="+", help="Image directories (default: bundled samples)")
+    parser.add_argument("--labels", default=str(DEFAULT_LABEL_DIR), help="Saved YOLO label directory")
+    parser.add_argument("--maps", default=str(DEFAULT_MAPS), help="Bubble maps of the sample sheets")
+    parser.add_argument("--answers", default=str(DEFAULT_ANSWERS), help="Answers checked by eye")
+    parser.add_argument("--tolerance", type=float, default=0.0, help="Allowed absolute confidence drift")
+    parser.add_argument("--max-slowdown", type=float, default=MAX_SLOWDOWN)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--yolo-model", help="Ultralytics .pt column model (detector check reference)")
+    parser.add_argument("--runtime-model", help="Its exported .onnx / .xml model (detector check)")
+    args = parser.parse_args()
+
+    try:
+        dirs = [Path(d) for d in args.images] if args.images else DEFAULT_IMAGE_DIRS
+        images = find_images(dirs)
+        if not images:
+            raise ValueError("No sample images found")
+        baseline_path = Path(args.baseline)
+        if args.record_baseline:
+            rate = measure_throughput(images, args.repeat)
+            baseline = {"sheetsPerSecond": round(rate, 2), "sheets": len(images), "machine": machine()}
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps(baseline, indent=2) + "\n", encoding="utf-8")
+            print(json.dumps({"baseline": baseline}))
+            if not args.record:
+                return
+
+        outputs = grade_samples(images, Path(args.labels), load_bubble_maps(Path(args.maps)))
+        snapshot_path = Path(args.snapshot)
+
+        if args.record:
+            _write_snapshot(snapshot_path, {"images": outputs})
+            print(json.dumps({"recorded": len(outputs)}))
+            return
+
+        if not snapshot_path.exists():
+            raise ValueError(f"No snapshot at {snapshot_path}; run with --record first")
+        with open(snapshot_path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+
+        failures = check(snapshot, outputs, args.tolerance)
+        failures.extend(check_answers(Path(args.answers), Path(args.labels)))
+        synthetic, synthetic_failures = check_synthetic()
+        failures.extend(synthetic_failures)
+        report: Dict = {"sheets": len(outputs), "synthetic": synthetic, "failures": failures}
+        if args.throughput and args.no_throughput:
+            raise ValueError("--throughput and --no-throughput exclude each other")
+        if args.throughput or (baseline_path.exists() and not args.no_throughput):
+            if not baseline_path.exists():
+                raise ValueError(
+                    f"No throughput baseline at {baseline_path}; "
+                    "run with --record-baseline on the unchanged tree first"
+                )
+            with open(baseline_path, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+            rate = measure_throughput(images, args.repeat)
+            report["sheetsPerSecond"] = round(rate, 2)
+            report["baselineSheetsPerSecond"] = baseline["sheetsPerSecond"]
+            failures.extend(check_throughput(baseline, rate, args.max_slowdown))
+        if args.yolo_model or args.runtime_model:
+            if not (args.yolo_model and args.runtime_model):
+                raise ValueError("The detector check needs both --yolo-model and --runtime-model")
+            detector = check_accuracy(args.yolo_model, args.runtime_model, images)
+            report["detector"] = detector
+            failures.extend(f"detector: column boxes differ on {name}" for name in detector["mismatched"])
+        print(json.dumps(report, indent=2))
+        if failures:
+            raise SystemExit(1)
+    except ValueError as e:
+        raise SystemExit(str(e))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
@@ -0,0 +1,217 @@
+"""SQLite journal of batch grading progress.
+
+`omr_pipeline.py --mode batch --journal hall_3.db` records every graded
+page as it finishes: its source and page, input hash
+(`omr_store.page_hash`), a hash of the grading options, status, the
+emitted JSON entry, the number of attempts and the grading latency. Rows
+are keyed by all four, so identical copies of a sheet under different
+names are tracked apart, and changing the bubble map, classifier or
+thresholds grades the pages again instead of re-emitting stale output.
+With a layout index, a row also stores the id of the layout its page
+matched; the row is stale only once that layout leaves the index, so
+adding layouts keeps the finished pages. Each row is committed on its own, so a crash or deploy
+loses at most the pages in flight. Rerunning the same command then
+re-emits finished pages from the journal, and retries failed pages until
+they have used `max_attempts`. Files that cannot be opened at all have
+no pages to record and are retried on every run.
+
+The journal is plain SQLite and can be queried directly, e.g.
+
+    sqlite3 hall_3.db "SELECT source, page, latency_ms FROM pages ORDER BY latency_ms DESC LIMIT 10"
+
+or summarized with `python omr/omr_journal.py hall_3.db`.
+"""
+
+import argparse
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Collection, Dict, List, Tuple
+
+DEFAULT_MAX_ATTEMPTS = 3
+
+# Journals from before the options were part of the key used a `sheets`
+# table keyed by input hash alone; it is left in place and not read.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    source TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    input_hash TEXT NOT NULL,
+    options TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    output TEXT NOT NULL,
+    latency_ms REAL,
+    updated_at REAL NOT NULL,
+    layout TEXT,
+    PRIMARY KEY (source, page, input_hash, options)
+)
+"""
+
+# (source, page, input hash, options hash) of one journaled page.
+PageKey = Tuple[str, int, str, str]
+
+
+class BatchJournal:
+    """Per-page progress of batch runs; `status` is `done` or `failed`.
+
+    Safe to share between threads: the multiprocessing pool looks pages up
+    from its task thread while the caller records them.
+    """
+
+    def __init__(self, path: str | Path, max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> None:
+        self.path = Path(path)
+        self.max_attempts = max(1, int(max_attempts))
+        self.resumed = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(_SCHEMA)
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(pages)")]
+        if "layout" not in columns:
+            self._db.execute("ALTER TABLE pages ADD COLUMN layout TEXT")
+        self._db.commit()
+
+    def resolved(self, key: PageKey, layouts: Collection[str] | None = None) -> Dict | None:
+        """The stored entry if the page needs no more work, else None.
+
+        Finished pages and pages that failed `max_attempts` times count as
+        resolved. With `layouts` (ids in the layout index), a page that
+        matched a layout no longer among them is not.
+        """
+
+        with self._lock:
+            row = self._db.execute(
+                "SELECT status, attempts, output, layout FROM pages "
+                "WHERE source = ? AND page = ? AND input_hash = ? AND options = ?",
+                tuple(key),
+            ).fetchone()
+        if row is None:
+            return None
+        status, attempts, output, layout = row
+        if status == "failed" and attempts < self.max_attempts:
+            return None
+        if layouts is not None and layout is not None and layout not in layouts:
+            return None
+        self.resumed += 1
+        return json.loads(output)
+
+    def record(
+        self,
+        key: PageKey,
+        entry: Dict,
+        latency_ms: float | None = None,
+        layout: str | None = None,
+    ) -> None:
+        # Underscore fields are per-run bookkeeping, not part of the output.
+        output = {k: v for k, v in entry.items() if not k.startswith("_")}
+        status = "failed" if "error" in output else "done"
+        with self._lock:
+            self._db.execute(
+                """
+                INSERT INTO pages
+                    (source, page, input_hash, options, status, attempts, output, latency_ms,
+                     updated_at, layout)
+                VALUES (?, ?, ?, ?, ?, 1, ?, ?, ?, ?)
+                ON CONFLICT(source, page, input_hash, options) DO UPDATE SET
+                    status = excluded.status,
+                    attempts = pages.attempts + 1,
+                    output = excluded.output,
+                    latency_ms = excluded.latency_ms,
+                    updated_at = excluded.updated_at,
+                    layout = excluded.layout
+                """,
+                (
+                    key[0],
+                    int(key[1]),
+                    key[2],
+                    key[3],
+                    status,
+                    json.dumps(output),
+                    latency_ms,
+                    time.time(),
+                    layout,
+                ),
+            )
+            self._db.commit()
+
+    def summary(self, slowest: int = 5) -> Dict:
+        counts = dict(self._db.execute("SELECT status, COUNT(*) FROM pages GROUP BY status"))
+        latencies = [
+            r[0]
+            for r in self._db.execute(
+                "SELECT latency_ms FROM pages WHERE latency_ms IS NOT NULL ORDER BY latency_ms"
+            )
+        ]
+        report: Dict = {
+            "done": counts.get("done", 0),
+            "failed": counts.get("failed", 0),
+            "retryable": self._db.execute(
+                "SELECT COUNT(*) FROM pages WHERE status = 'failed' AND attempts < ?",
+                (self.max_attempts,),
+            ).fetchone()[0],
+        }
+        if latencies:
+            report["latencyMs"] = {
+                "p50": round(_percentile(latencies, 0.50), 1),
+                "p95": round(_percentile(latencies, 0.95), 1),
+                "max": round(latencies[-1], 1),
+                "mean": round(sum(latencies) / len(latencies), 1),
+            }
+        report["slowest"] = [
+            {"source": s, "page": p, "latencyMs": round(ms, 1)}
+            for s, p, ms in self._db.execute(
+                "SELECT source, page, latency_ms FROM pages WHERE latency_ms IS NOT NULL "
+                "ORDER BY latency_ms DESC LIMIT ?",
+                (int(slowest),),
+            )
+        ]
+        return report
+
+    def failures(self) -> List[Tuple[str, int, int, str]]:
+        """`(source, page, attempts, error)` of every failed page."""
+
+        return [
+            (s, p, a, json.loads(o).get("error", ""))
+            for s, p, a, o in self._db.execute(
+                "SELECT source, page, attempts, output FROM pages WHERE status = 'failed' "
+                "ORDER BY source, page"
+            )
+        ]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    idx = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return float(sorted_values[idx])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Summarize a batch grading journal")
+    parser.add_argument("journal", help="SQLite journal written by omr_pipeline.py --journal")
+    parser.add_argument("--slowest", type=int, default=5, help="Slowest pages to list")
+    parser.add_argument("--failures", action="store_true", help="List failed pages instead")
+    parser.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS)
+    args = parser.parse_args()
+
+    if not Path(args.journal).exists():
+        raise SystemExit(f"No journal at {args.journal}")
+    journal = BatchJournal(args.journal, args.max_attempts)
+    try:
+        if args.failures:
+            for source, page, attempts, error in journal.failures():
+                print(json.dumps({"source": source, "page": page, "attempts": attempts, "error": error}))
+        else:
+            print(json.dumps(journal.summary(args.slowest), indent=2))
+    finally:
+        journal.close()
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
@@ -0,0 +1,259 @@
+"""On-disk index of known OMR sheet layouts.
+
+Most exams reuse a handful of sheet designs. `LayoutIndex` keeps every
+learned bubble map with a compact fingerprint, so a new upload can reuse
+cached centers instead of running
+`omr_pipeline.learn_bubble_centers_from_image` again:
+
+- rows / columns / options: shape of the answer grid;
+- optionPitch / rowPitch: median bubble spacing as a fraction of the
+  template width / height;
+- roi: padded bounding box of the answer grid (`grid_roi`);
+- phash: 64-bit DCT perceptual hash of the aligned page.
+
+A sheet's grid is unknown until it has been learned, so lookup compares
+phashes only and confirms the nearest candidates with
+`omr_quality.template_match`: different designs printed on the same paper
+can hash a few bits apart, but their bubbles do not line up. A match
+returns the layout's stored ROI with its centers; when nothing matches,
+`roi_hint` still offers the ROI of the closest-hashed layout so learning
+can start in the right region.
+
+Layout: `{root}/index.json` holds the fingerprints and
+`{root}/{layout_id}.json` the centers as `{"bubbleCenters": ...}`, the same
+shape `--bubble-map` accepts.
+"""
+
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+from omr_quality import QUALITY_SCALE, template_match
+from omr_store import template_hash
+
+PHASH_SIZE = 32
+PHASH_BITS = 8  # low-frequency block is PHASH_BITS x PHASH_BITS
+
+MAX_PHASH_DISTANCE = 12
+MIN_LAYOUT_MATCH = 0.9
+
+# Margin around the outermost bubble centers, as a fraction of the template width.
+ROI_PADDING = 0.03
+
+BubbleCenters = Dict[int, Dict[str, Tuple[int, int]]]
+Roi = Tuple[int, int, int, int]
+
+
+def _downscale(aligned_gray: np.ndarray, template_size: Tuple[int, int]) -> np.ndarray:
+    tw, th = template_size
+    return cv2.resize(
+        aligned_gray, (tw // QUALITY_SCALE, th // QUALITY_SCALE), interpolation=cv2.INTER_AREA
+    )
+
+
+def perceptual_hash(small_gray: np.ndarray) -> str:
+    """64-bit pHash of a (downscaled) page as 16 hex digits."""
+
+    small = cv2.resize(
+        small_gray, (PHASH_SIZE, PHASH_SIZE), interpolation=cv2.INTER_AREA
+    ).astype(np.float32)
+    low = cv2.dct(small)[:PHASH_BITS, :PHASH_BITS].reshape(-1)
+    bits = low > np.median(low[1:])  # the DC term would dominate the median
+    return f"{int(''.join('1' if b else '0' for b in bits), 2):016x}"
+
+
+def hamming(a: str, b: str) -> int:
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+
+def page_phash(aligned_gray: np.ndarray, template_size: Tuple[int, int] = (2480, 3508)) -> str:
+    """`perceptual_hash` of an aligned full-size page."""
+
+    return perceptual_hash(_downscale(aligned_gray, template_size))
+
+
+def nearest_roi(
+    entries: List[Dict],
+    phash: str,
+    max_distance: int = MAX_PHASH_DISTANCE,
+) -> Roi | None:
+    """`roi` of the entry (`{"phash", "roi"}`) closest to `phash`, if within `max_distance`."""
+
+    best = min(
+        ((hamming(phash, e["phash"]), i) for i, e in enumerate(entries) if e.get("roi")),
+        default=None,
+    )
+    if best is None or best[0] > max_distance:
+        return None
+    x0, y0, x1, y1 = entries[best[1]]["roi"]
+    return int(x0), int(y0), int(x1), int(y1)
+
+
+def grid_shape(
+    bubble_centers: BubbleCenters,
+    template_size: Tuple[int, int] = (2480, 3508),
+) -> Dict:
+    tw, th = template_size
+    option_counts = [len(opts) for opts in bubble_centers.values() if opts]
+    if not option_counts:
+        return {"rows": 0, "columns": 0, "options": 0, "optionPitch": 0.0, "rowPitch": 0.0}
+    options = int(np.bincount(option_counts).argmax())
+
+    # Leftmost x and mean y of every question.
+    lefts = np.array([min(pt[0] for pt in o.values()) for o in bubble_centers.values() if o])
+    rows_y = np.array([np.mean([pt[1] for pt in o.values()]) for o in bubble_centers.values() if o])
+    option_steps = [
+        np.diff(sorted(pt[0] for pt in o.values())) for o in bubble_centers.values() if len(o) > 1
+    ]
+    option_pitch = float(np.median(np.concatenate(option_steps))) if option_steps else 0.0
+
+    # Questions more than two option pitches apart horizontally sit in different columns.
+    xs = np.sort(lefts)
+    columns = 1 + int(np.count_nonzero(np.diff(xs) > max(2.0 * option_pitch, 1.0)))
+    rows = int(np.ceil(len(lefts) / float(columns)))
+    ys = np.unique(np.round(rows_y))
+    steps = np.diff(ys)
+    row_pitch = float(np.median(steps[steps > 0])) if np.any(steps > 0) else 0.0
+
+    return {
+        "rows": rows,
+        "columns": columns,
+        "options": options,
+        "optionPitch": round(option_pitch / float(tw), 5),
+        "rowPitch": round(row_pitch / float(th), 5),
+    }
+
+
+def grid_roi(
+    bubble_centers: BubbleCenters,
+    template_size: Tuple[int, int] = (2480, 3508),
+    padding: float = ROI_PADDING,
+) -> Roi | None:
+    """Padded bounding box `(x0, y0, x1, y1)` of the answer grid, or None if empty."""
+
+    points = [pt for opts in bubble_centers.values() for pt in opts.values()]
+    if not points:
+        return None
+    tw, th = template_size
+    pad = int(round(float(tw) * padding))
+    xy = np.asarray(points, dtype=np.int64)
+    x0, y0 = np.maximum(xy.min(axis=0) - pad, 0)
+    x1 = min(int(xy[:, 0].max()) + pad + 1, tw)
+    y1 = min(int(xy[:, 1].max()) + pad + 1, th)
+    return int(x0), int(y0), int(x1), int(y1)
+
+
+def layout_fingerprint(
+    aligned_gray: np.ndarray,
+    bubble_centers: BubbleCenters,
+    template_size: Tuple[int, int] = (2480, 3508),
+) -> Dict:
+    fingerprint = grid_shape(bubble_centers, template_size)
+    roi = grid_roi(bubble_centers, template_size)
+    fingerprint["roi"] = list(roi) if roi is not None else None
+    fingerprint["phash"] = page_phash(aligned_gray, template_size)
+    return fingerprint
+
+
+def _write_json(path: Path, payload: object) -> None:
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2)
+        os.replace(tmp, path)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class LayoutIndex:
+    def __init__(
+        self,
+        root: str | Path,
+        max_distance: int = MAX_PHASH_DISTANCE,
+        min_match: float = MIN_LAYOUT_MATCH,
+        template_size: Tuple[int, int] = (2480, 3508),
+    ) -> None:
+        self.root = Path(root)
+        self.max_distance = int(max_distance)
+        self.min_match = float(min_match)
+        self.template_size = template_size
+        self._entries: List[Dict] | None = None
+        self._centers: Dict[str, BubbleCenters] = {}
+
+    @property
+    def entries(self) -> List[Dict]:
+        if self._entries is None:
+            path = self.root / "index.json"
+            if path.exists():
+                with open(path, "r", encoding="utf-8") as f:
+                    self._entries = list(json.load(f).get("layouts") or [])
+            else:
+                self._entries = []
+        return self._entries
+
+    def centers(self, layout_id: str) -> BubbleCenters:
+        cached = self._centers.get(layout_id)
+        if cached is None:
+            with open(self.root / f"{layout_id}.json", "r", encoding="utf-8") as f:
+                raw = json.load(f)["bubbleCenters"]
+            cached = {
+                int(q): {str(opt): (int(pt[0]), int(pt[1])) for opt, pt in opts.items()}
+                for q, opts in raw.items()
+            }
+            self._centers[layout_id] = cached
+        return cached
+
+    def add(self, aligned_gray: np.ndarray, bubble_centers: BubbleCenters, name: str = "") -> str:
+        """Remember a learned layout and return its id (a hash of the centers)."""
+
+        layout_id = template_hash(bubble_centers)
+        self.root.mkdir(parents=True, exist_ok=True)
+        serializable = {
+            str(q): {opt: [int(pt[0]), int(pt[1])] for opt, pt in opts.items()}
+            for q, opts in bubble_centers.items()
+        }
+        _write_json(self.root / f"{layout_id}.json", {"bubbleCenters": serializable})
+
+        entry = {"id": layout_id, "name": name or layout_id}
+        entry.update(layout_fingerprint(aligned_gray, bubble_centers, self.template_size))
+        entries = [e for e in self.entries if e.get("id") != layout_id] + [entry]
+        _write_json(self.root / "index.json", {"layouts": entries})
+        self._entries = entries
+        self._centers[layout_id] = bubble_centers
+        return layout_id
+
+    def match(self, aligned_gray: np.ndarray) -> Tuple[str, BubbleCenters, Roi | None] | None:
+        """Closest known layout for an aligned sheet as `(id, centers, roi)`, or None."""
+
+        if not self.entries:
+            return None
+        # One 1/4-scale copy serves both the hash and the bubble check.
+        small = _downscale(aligned_gray, self.template_size)
+        phash = perceptual_hash(small)
+        distances = ((hamming(phash, e["phash"]), i) for i, e in enumerate(self.entries))
+        candidates = sorted(d for d in distances if d[0] <= self.max_distance)
+        for _, i in candidates:
+            entry = self.entries[i]
+            centers = self.centers(entry["id"])
+            if template_match(small, centers, float(QUALITY_SCALE)) >= self.min_match:
+                roi = entry.get("roi")
+                if roi is None:
+                    roi = grid_roi(centers, self.template_size)
+                return entry["id"], centers, tuple(int(v) for v in roi) if roi else None
+        return None
+
+    def roi_hint(self, aligned_gray: np.ndarray, phash: str | None = None) -> Roi | None:
+        """Stored ROI of the closest-hashed layout, for learning a sheet `match` rejected."""
+
+        if not self.entries:
+            return None
+        if phash is None:
+            phash = page_phash(aligned_gray, self.template_size)
+        return nearest_roi(self.entries, phash, self.max_distance)
@@ -0,0 +1,202 @@
+"""Local stand-in for the Node.js examiner evaluation endpoint.
+
+Serves `POST {prefix}/exam/evaluate/{submissionId}` on localhost so the
+HTTP client and bulk mode can be exercised without MongoDB or auth:
+
+    with MockBackend() as backend:
+        client = EvaluateClient(api_base=backend.api_base)
+        client.evaluate("s1", answer_key, student_answers)
+        assert backend.connection_count == 1
+
+Scoring mirrors the default NEET marking (+4 / -1 / 0). `fail_first`
+answers the first N requests for each submission with 503 so retries can
+be observed, and `latency` adds a fixed delay per request.
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Set, Tuple
+
+DEFAULT_PREFIX = "/api/v1/examiner"
+
+
+def _score(answer_key: List[Dict], student_answers: List[Dict]) -> Dict:
+    key = {}
+    for item in answer_key or []:
+        try:
+            q = int(item.get("questionNumber"))
+        except Exception:
+            continue
+        if item.get("correctOption"):
+            key[q] = str(item["correctOption"]).upper()
+
+    selected = {}
+    for item in student_answers or []:
+        try:
+            q = int(item.get("questionNumber"))
+        except Exception:
+            continue
+        opt = item.get("selectedOption")
+        selected[q] = str(opt).upper() if opt else None
+
+    correct = incorrect = unattempted = 0
+    for q, opt in key.items():
+        chosen = selected.get(q)
+        if not chosen:
+            unattempted += 1
+        elif chosen == opt:
+            correct += 1
+        else:
+            incorrect += 1
+
+    return {
+        "totalMarks": correct * 4 - incorrect,
+        "correctCount": correct,
+        "incorrectCount": incorrect,
+        "unattemptedCount": unattempted,
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "MockBackend"
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        return
+
+    def _send_json(self, status: int, body: Dict) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self) -> None:  # noqa: N802
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+
+        marker = f"{self.server.prefix}/exam/evaluate/"
+        if not self.path.startswith(marker):
+            self._send_json(404, {"message": "Not found"})
+            return
+        submission_id = self.path[len(marker):]
+
+        self.server.record(self.client_address, submission_id)
+        if self.server.latency > 0:
+            time.sleep(self.server.latency)
+        if self.server.should_fail(submission_id):
+            self._send_json(503, {"message": "Service unavailable"})
+            return
+
+        try:
+            payload = json.loads(raw.decode("utf-8") or "{}")
+        except Exception:
+            self._send_json(400, {"message": "Invalid JSON"})
+            return
+
+        evaluation = _score(payload.get("answerKey"), payload.get("studentAnswers"))
+        self._send_json(
+            200,
+            {
+                "message": "OMR evaluated successfully",
+                "submissionId": submission_id,
+                "evaluation": evaluation,
+            },
+        )
+
+
+class MockBackend(ThreadingHTTPServer):
+    """Threaded mock server; use as a context manager to run it in the background."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        prefix: str = DEFAULT_PREFIX,
+        fail_first: int = 0,
+        latency: float = 0.0,
+    ) -> None:
+        super().__init__((host, port), _Handler)
+        self.prefix = prefix.rstrip("/")
+        self.fail_first = int(fail_first)
+        self.latency = float(latency)
+        self.request_count = 0
+        self.requests_by_submission: Dict[str, int] = {}
+        self._connections: Set[Tuple[str, int]] = set()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def api_base(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{self.prefix}"
+
+    @property
+    def connection_count(self) -> int:
+        with self._lock:
+            return len(self._connections)
+
+    def record(self, client_address: Tuple[str, int], submission_id: str) -> None:
+        with self._lock:
+            self.request_count += 1
+            self.requests_by_submission[submission_id] = (
+                self.requests_by_submission.get(submission_id, 0) + 1
+            )
+            self._connections.add((client_address[0], client_address[1]))
+
+    def should_fail(self, submission_id: str) -> bool:
+        with self._lock:
+            return self.requests_by_submission.get(submission_id, 0) <= self.fail_first
+
+    def start(self) -> "MockBackend":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "MockBackend":
+        return self.start()
+
+    def __exit__(self, *exc: object) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Mock NEET OMR evaluation backend")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--prefix", default=DEFAULT_PREFIX)
+    parser.add_argument("--fail-first", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = MockBackend(
+        host=args.host,
+        port=args.port,
+        prefix=args.prefix,
+        fail_first=args.fail_first,
+        latency=args.latency,
+    )
+    print(f"Mock backend listening on {server.api_base}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
@@ -0,0 +1,126 @@
+"""Streaming page source for scanner output.
+
+Hall scanners produce multi-page TIFF and PDF files. `iter_pages` yields
+one decoded grayscale page at a time, in page order, so a 500-page scan
+never has to sit in memory as a whole stack:
+
+    for page_index, gray in iter_pages("hall_3.pdf"):
+        ...
+
+Single-page images (JPEG/PNG/...) yield exactly one page. TIFF pages are
+decoded with OpenCV one index at a time. PDF pages are rendered by PyMuPDF,
+which is optional and only imported when a PDF is actually opened.
+"""
+
+import os
+from typing import Iterator, Tuple
+
+import cv2
+import numpy as np
+
+PDF_RENDER_DPI = 300
+
+TIFF_EXTENSIONS = {".tif", ".tiff"}
+PDF_EXTENSIONS = {".pdf"}
+
+
+def _to_gray(img: np.ndarray) -> np.ndarray:
+    if img.ndim == 2:
+        return img
+    if img.shape[2] == 4:
+        return cv2.cvtColor(img, cv2.COLOR_BGRA2GRAY)
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+
+def _iter_image(path: str) -> Iterator[Tuple[int, np.ndarray]]:
+    img = cv2.imread(path, cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError(f"Cannot read image: {path}")
+    yield 0, _to_gray(img)
+
+
+def _iter_tiff(path: str) -> Iterator[Tuple[int, np.ndarray]]:
+    count = int(cv2.imcount(path))
+    if count <= 0:
+        raise ValueError(f"Cannot read TIFF: {path}")
+    for index in range(count):
+        ok, mats = cv2.imreadmulti(path, index, 1, flags=cv2.IMREAD_COLOR)
+        if not ok or not mats:
+            raise ValueError(f"Cannot decode page {index + 1} of {path}")
+        yield index, _to_gray(mats[0])
+
+
+def _open_pdf(path: str) -> Tuple[object, object]:
+    try:
+        import pymupdf  # type: ignore
+    except ImportError:
+        try:
+            import fitz as pymupdf  # type: ignore  # older PyMuPDF releases
+        except ImportError:
+            raise ValueError("PDF input requires PyMuPDF (pip install pymupdf)") from None
+    return pymupdf, pymupdf.open(path)
+
+
+def _render_pdf_page(pymupdf: object, page: object, dpi: int) -> np.ndarray:
+    pix = page.get_pixmap(dpi=dpi, colorspace=pymupdf.csGRAY, alpha=False)  # type: ignore[attr-defined]
+    rows = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)
+    # Copy so the page owns its pixels and the pixmap can be freed.
+    return rows[:, : pix.width].copy()
+
+
+def _iter_pdf(path: str, dpi: int) -> Iterator[Tuple[int, np.ndarray]]:
+    pymupdf, doc = _open_pdf(path)
+    try:
+        for index, page in enumerate(doc):
+            yield index, _render_pdf_page(pymupdf, page, dpi)
+    finally:
+        doc.close()
+
+
+def count_pages(path: str) -> int:
+    ext = os.path.splitext(path)[1].lower()
+    if ext in PDF_EXTENSIONS:
+        _, doc = _open_pdf(path)
+        try:
+            return int(doc.page_count)
+        finally:
+            doc.close()
+    if ext in TIFF_EXTENSIONS:
+        count = int(cv2.imcount(path))
+        if count <= 0:
+            raise ValueError(f"Cannot read TIFF: {path}")
+        return count
+    if not os.path.exists(path):
+        raise ValueError(f"Cannot read image: {path}")
+    return 1
+
+
+def read_page(path: str, page_index: int, dpi: int = PDF_RENDER_DPI) -> np.ndarray:
+    """Decode a single page; used by pool workers that each read their own pages."""
+
+    ext = os.path.splitext(path)[1].lower()
+    if ext in PDF_EXTENSIONS:
+        pymupdf, doc = _open_pdf(path)
+        try:
+            return _render_pdf_page(pymupdf, doc[page_index], dpi)
+        finally:
+            doc.close()
+    if ext in TIFF_EXTENSIONS:
+        ok, mats = cv2.imreadmulti(path, page_index, 1, flags=cv2.IMREAD_COLOR)
+        if not ok or not mats:
+            raise ValueError(f"Cannot decode page {page_index + 1} of {path}")
+        return _to_gray(mats[0])
+    if page_index != 0:
+        raise ValueError(f"{path} has a single page")
+    return next(_iter_image(path))[1]
+
+
+def iter_pages(path: str, dpi: int = PDF_RENDER_DPI) -> Iterator[Tuple[int, np.ndarray]]:
+    """Yield `(page_index, gray)` for every page of `path`, in order."""
+
+    ext = os.path.splitext(path)[1].lower()
+    if ext in PDF_EXTENSIONS:
+        return _iter_pdf(path, dpi)
+    if ext in TIFF_EXTENSIONS:
+        return _iter_tiff(path)
+    return _iter_image(path)
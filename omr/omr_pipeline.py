@@ -2,11 +2,47 @@
 
 Responsibilities:
 - Load a scanned OMR image (answer key or student sheet).
+- Reject unusable student photos early (`omr_quality`): blur, exposure,
+  page coverage and template match are checked on a 1/4-scale copy
+  before the full-resolution work starts.
 - Preprocess and roughly align it to a fixed template size.
 - For each bubble position defined in `bubble_map.BUBBLE_CENTERS`, crop a
   small patch and classify it as filled/empty.
 - Build `answerKey` / `studentAnswers` JSON compatible with the
   Node.js backend `/exam/evaluate/:submissionId` endpoint.
+- Calibrate the filled/empty cutoff per sheet from the confidences of all
+  its bubbles, after flattening uneven lighting.
+- Grade whole scan batches (`--mode batch`), streaming pages of multi-page
+  TIFF/PDF files one at a time (`omr_pages`) and emitting one JSON line
+  per page in input order. Each batch worker reuses one `BufferPool` for
+  all per-sheet arrays and reports (and optionally caps) its peak RSS.
+  With `--workers N` pages are spread over N processes that share the
+  loaded classifier and the compiled bubble map instead of copying them.
+- Decode roll-number / booklet-code blocks declared under `fields` in the
+  bubble map, scored in the same batch as the answers, so batch output
+  can be routed to submissions without a separate pass.
+- Answer repeated uploads of the same image (re-uploads, retries,
+  forwarded copies) from a bounded store of finished results
+  (`--result-cache`, `omr_store.ResultStore`), keyed by the image bytes,
+  template, classifier and grading options.
+- Reuse bubble maps of known sheet designs (`--layout-index`, see
+  `omr_layouts`) instead of relearning them from every template image.
+  When a template must be learned, `--learn-bands` can split the full-page
+  contour search over parallel horizontal bands with the same result
+  (off by default: on photos printed frames cross the band edges and the
+  page is searched again).
+- Optionally persist each sheet's raw bubble confidences (`--store`) so a
+  corrected answer key can be re-applied with `--mode regrade` without
+  touching the images again.
+- Score sheets per subject section (`omr_sections`) from the exam's
+  `scoringConfig`, defaulting to `neet_scoring.json` shared with Node; in
+  batch mode `--answer-key-json` adds an `evaluation` to every page.
+- Optionally snap fixed bubble-map centers to the printed bubbles within
+  a few pixels before scoring (`--refine-centers`, see `omr_refine`), for
+  pages that are slightly shifted or warped.
+- Resume interrupted batches (`--journal`, see `omr_journal`): finished
+  pages are re-emitted from a SQLite journal and failed ones retried up
+  to `--max-attempts`.
 
 The classifier supports two modes:
 - Simple intensity heuristic (no ML dependencies, default).
@@ -16,25 +52,70 @@ The classifier supports two modes:
 
 import argparse
 import collections
+import importlib.util
 import json
 import os
-from typing import Dict, List, Tuple
+import sys
+import time
+from typing import Dict, Iterator, List, Set, Tuple
 
 import cv2
 import numpy as np
-import requests
-
-try:
-    # Optional dependency – only used if a model path is provided
-    from tensorflow.keras.models import load_model  # type: ignore
-except Exception:  # tensorflow not installed
-    load_model = None  # type: ignore
 
 from bubble_map import BUBBLE_CENTERS
+from omr_buffers import BufferPool, MemoryBudget, MemoryBudgetExceeded, peak_rss_mb
+from omr_client import DEFAULT_API_BASE, call_backend_evaluate  # noqa: F401
+from omr_journal import DEFAULT_MAX_ATTEMPTS, BatchJournal
+from omr_layouts import LayoutIndex, grid_roi, nearest_roi, page_phash
+from omr_pages import count_pages, iter_pages, read_page
+from omr_quality import SheetQualityError, assess_quality
+from omr_refine import DEFAULT_RADIUS, refine_centers
+from omr_sections import evaluate_omr, load_scoring_config
+from omr_shared import SharedArrays
+from omr_store import (
+    DEFAULT_MAX_RESULTS,
+    BubbleMeta,
+    ConfidenceStore,
+    ResultStore,
+    file_sha256,
+    page_hash,
+    template_hash,
+)
+
+# (field name, column index, symbol) per field bubble, e.g. ("rollNumber", 0, "7").
+FieldMeta = List[Tuple[str, int, str]]
 
 TEMPLATE_WIDTH = 2480   # example A4 @ 300dpi
 TEMPLATE_HEIGHT = 3508
 
+# Cutoff used when a sheet's confidences do not split into two clear groups
+# (e.g. a blank sheet, or every question answered with the same darkness).
+DEFAULT_SELECTION_THRESHOLD = 0.25
+MIN_CLASS_SEPARATION = 0.15
+
+
+def _tensorflow_available() -> bool:
+    # TensorFlow takes seconds to import, so only look for it here; it is
+    # imported when a CNN model is actually loaded.
+    return importlib.util.find_spec("tensorflow") is not None
+
+
+def load_model(model_path: str) -> object:
+    from tensorflow.keras.models import load_model as keras_load_model  # type: ignore
+
+    return keras_load_model(model_path)
+
+
+def classifier_version(model_path: str) -> str:
+    """Label of a CNN loaded from `model_path`, used to key stored results.
+
+    Only meaningful once the model actually loaded; use
+    `BubbleClassifier.version`, which falls back to "heuristic" otherwise.
+    """
+
+    st = os.stat(model_path)
+    return f"cnn:{os.path.basename(model_path)}:{st.st_size}:{int(st.st_mtime)}"
+
 
 class BubbleClassifier:
     """Classifies bubble patches as filled or empty.
@@ -48,7 +129,7 @@ class BubbleClassifier:
         self.model = None
         self.use_cnn = False
 
-        if model_path and load_model is not None and os.path.exists(model_path):
+        if model_path and os.path.exists(model_path) and _tensorflow_available():
             try:
                 self.model = load_model(model_path)
                 self.use_cnn = True
@@ -57,6 +138,8 @@ class BubbleClassifier:
                 self.model = None
                 self.use_cnn = False
 
+        self.version = classifier_version(model_path) if self.use_cnn else "heuristic"
+
     def predict_probs(self, patches: np.ndarray) -> np.ndarray:
         """Return probability of being filled for each patch.
 
@@ -75,15 +158,90 @@ class BubbleClassifier:
         return probs
 
 
-def load_and_align(path: str) -> np.ndarray:
+_classifiers: Dict[str | None, BubbleClassifier] = {}
+
+
+def load_classifier(
+    model_path: str | None = None, results: ResultStore | None = None
+) -> BubbleClassifier:
+    """`BubbleClassifier` for `model_path`, loaded once per process.
+
+    Its `version` says which classifier really scores the bubbles (a model
+    that fails to load falls back to the heuristic), so store and cache
+    keys are derived from it rather than from the path. With `results`,
+    whether the model loaded is recorded there for `classifier_stamp`.
+    """
+
+    classifier = _classifiers.get(model_path)
+    if classifier is None:
+        classifier = _classifiers[model_path] = BubbleClassifier(model_path=model_path)
+    if results is not None and model_path and os.path.exists(model_path):
+        results.record_classifier(classifier_version(model_path), classifier.use_cnn)
+    return classifier
+
+
+def classifier_stamp(model_path: str | None, results: ResultStore | None = None) -> str:
+    """`load_classifier(model_path).version`, without loading the model when it can be avoided.
+
+    No model file or no TensorFlow means the heuristic. Otherwise the
+    version is the model file's identity if `results` recorded that this
+    file loaded, "heuristic" if it recorded a failure; only a file the
+    store has not seen is loaded to find out.
+    """
+
+    if not model_path or not os.path.exists(model_path) or not _tensorflow_available():
+        return "heuristic"
+    classifier = _classifiers.get(model_path)
+    if classifier is not None:
+        return classifier.version
+    identity = classifier_version(model_path)
+    loaded = results.classifier_loaded(identity) if results is not None else None
+    if loaded is None:
+        return load_classifier(model_path, results).version
+    return identity if loaded else "heuristic"
+
+
+def read_gray(path: str) -> np.ndarray:
     img = cv2.imread(path, cv2.IMREAD_COLOR)
     if img is None:
         raise ValueError(f"Cannot read image: {path}")
 
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
 
-    aligned = cv2.resize(gray, (TEMPLATE_WIDTH, TEMPLATE_HEIGHT))
-    return aligned
+def align_gray(gray: np.ndarray, pool: BufferPool | None = None) -> np.ndarray:
+    dst = pool.get("aligned", (TEMPLATE_HEIGHT, TEMPLATE_WIDTH)) if pool is not None else None
+    return cv2.resize(gray, (TEMPLATE_WIDTH, TEMPLATE_HEIGHT), dst=dst)
+
+
+def load_and_align(path: str) -> np.ndarray:
+    return align_gray(read_gray(path))
+
+
+def normalize_background(
+    gray: np.ndarray,
+    scale: int = 8,
+    kernel: int = 15,
+    pool: BufferPool | None = None,
+) -> np.ndarray:
+    """Flatten uneven illumination by dividing out a local paper estimate.
+
+    The background is estimated on a downscaled copy with a grey-level
+    closing (which removes bubbles, marks and print smaller than `kernel`),
+    then upsampled; after division blank paper sits near 255 everywhere.
+    """
+
+    h, w = gray.shape[:2]
+    small = cv2.resize(
+        gray, (max(1, w // scale), max(1, h // scale)), interpolation=cv2.INTER_AREA
+    )
+    se = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (kernel, kernel))
+    background = cv2.morphologyEx(small, cv2.MORPH_CLOSE, se)
+    background = cv2.medianBlur(background, 5)
+    full_bg = pool.get("background", (h, w)) if pool is not None else None
+    background = cv2.resize(background, (w, h), dst=full_bg, interpolation=cv2.INTER_LINEAR)
+    dst = pool.get("normalized", (h, w)) if pool is not None else None
+    return cv2.divide(gray, background, dst=dst, scale=255)
 
 
 def crop_patch(img: np.ndarray, center: Tuple[int, int], size: int = 28) -> np.ndarray:
@@ -101,6 +259,63 @@ def crop_patch(img: np.ndarray, center: Tuple[int, int], size: int = 28) -> np.n
     return patch
 
 
+def patch_index(
+    centers_xy: np.ndarray,
+    image_shape: Tuple[int, int],
+    size: int = 28,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Flat pixel indices of every bubble patch for an image of `image_shape`.
+
+    Returns `(flat_idx, inside)`: (N, size, size) int64 indices into the
+    flattened image and an (N,) mask of patches fully inside the image.
+    Depends only on the bubble map, so it is computed once per template.
+    """
+
+    h, w = image_shape[:2]
+    half = size // 2
+    x1 = centers_xy[:, 0].astype(np.int64) - half
+    y1 = centers_xy[:, 1].astype(np.int64) - half
+    inside = (x1 >= 0) & (y1 >= 0) & (x1 + size <= w) & (y1 + size <= h)
+
+    offsets = np.arange(size, dtype=np.int64)
+    rows = np.clip(y1[:, None] + offsets, 0, h - 1)
+    cols = np.clip(x1[:, None] + offsets, 0, w - 1)
+    flat_idx = rows[:, :, None] * w + cols[:, None, :]
+    return flat_idx, inside
+
+
+def crop_patches(
+    img: np.ndarray,
+    centers_xy: np.ndarray,
+    size: int = 28,
+    pool: BufferPool | None = None,
+    index: Tuple[np.ndarray, np.ndarray] | None = None,
+) -> np.ndarray:
+    """Vectorized `crop_patch` for many centers at once.
+
+    centers_xy: (N, 2) int array. Returns (N, size, size, 1) float32,
+    identical to stacking `crop_patch` results. Patches that would cross the
+    image border go through `crop_patch` itself. `index` is a precomputed
+    `patch_index` for this image shape.
+    """
+
+    n = int(centers_xy.shape[0])
+    flat_idx, inside = index if index is not None else patch_index(centers_xy, img.shape, size)
+
+    if pool is not None:
+        raw = pool.get("patches_u8", (n, size, size))
+        out = pool.get("patches", (n, size, size, 1), np.float32)
+    else:
+        raw = np.empty((n, size, size), dtype=np.uint8)
+        out = np.empty((n, size, size, 1), dtype=np.float32)
+
+    np.take(np.ascontiguousarray(img).reshape(-1), flat_idx, out=raw)
+    np.divide(raw, np.float32(255.0), out=out[..., 0])
+    for i in np.flatnonzero(~inside):
+        out[i] = crop_patch(img, (int(centers_xy[i, 0]), int(centers_xy[i, 1])), size)
+    return out
+
+
 def _cluster_sorted_1d(values: List[float], tol: float) -> List[List[float]]:
     if not values:
         return []
@@ -159,17 +374,55 @@ def _normalize_bubble_centers(raw: object) -> Dict[int, Dict[str, Tuple[int, int
     return normalized
 
 
-def learn_bubble_centers_from_image(
-    aligned_gray: np.ndarray,
-) -> Dict[int, Dict[str, Tuple[int, int]]]:
-    blur = cv2.GaussianBlur(aligned_gray, (5, 5), 0)
-    _, thresh = cv2.threshold(blur, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+def _normalize_fields(raw: object) -> Dict[str, List[Dict[str, Tuple[int, int]]]]:
+    """Parse the optional `fields` block of a bubble map.
 
-    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
-    thresh = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel, iterations=1)
-    thresh = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel, iterations=1)
+    Each field (e.g. `rollNumber`, `bookletCode`) is a list of columns, one
+    per character, mapping a symbol to its bubble center:
+    `{"rollNumber": [{"0": [x, y], ..., "9": [x, y]}, ...]}`.
+    """
+
+    if raw is None:
+        return {}
+    if not isinstance(raw, dict):
+        raise ValueError("bubble-map fields must be an object")
+
+    fields: Dict[str, List[Dict[str, Tuple[int, int]]]] = {}
+    for name, columns in raw.items():
+        if not isinstance(columns, list):
+            raise ValueError(f"field {name!r} must be a list of columns")
+        parsed = []
+        for column in columns:
+            if not isinstance(column, dict):
+                raise ValueError(f"field {name!r} columns must be objects")
+            parsed.append(
+                {
+                    str(sym).upper(): (int(float(pt[0])), int(float(pt[1])))
+                    for sym, pt in column.items()
+                    if isinstance(pt, (list, tuple)) and len(pt) == 2
+                }
+            )
+        if parsed:
+            fields[str(name)] = parsed
+    return fields
+
+
+# Full-page learning can split the page into horizontal bands processed on
+# a thread pool (OpenCV releases the GIL). Neighbouring bands share this many
+# rows, so every bubble lies wholly inside the band that owns its center.
+LEARN_BAND_OVERLAP = 64
+# Rows at a band's cut edge that the 3x3 open + close can get wrong.
+_MORPH_HALO = 4
+_BLUR_HALO = 2
+
+
+def _contour_candidates(
+    contours: List[np.ndarray],
+    y_offset: int = 0,
+    rows: Tuple[int, int] | None = None,
+) -> List[Tuple[float, float, float, int, int]]:
+    """Roughly round contours as (cx, cy, area, w, h); `rows` keeps only centers in [top, bottom)."""
 
-    contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
     candidates: List[Tuple[float, float, float, int, int]] = []
     for c in contours:
         area = float(cv2.contourArea(c))
@@ -188,8 +441,154 @@ def learn_bubble_centers_from_image(
         if circ < 0.25:
             continue
         cx = float(x) + float(w) / 2.0
-        cy = float(y) + float(h) / 2.0
+        cy = float(y + y_offset) + float(h) / 2.0
+        if rows is not None and not rows[0] <= cy < rows[1]:
+            continue
         candidates.append((cx, cy, area, int(w), int(h)))
+    return candidates
+
+
+def _otsu_threshold(hist: np.ndarray) -> float:
+    """OpenCV's Otsu level for an 8-bit histogram, so bands can share one threshold."""
+
+    scale = 1.0 / float(hist.sum())
+    mu = sum(i * float(h) for i, h in enumerate(hist)) * scale
+    mu1 = q1 = 0.0
+    max_sigma = max_val = 0.0
+    eps = float(np.finfo(np.float32).eps)
+    for i, h in enumerate(hist):
+        p_i = float(h) * scale
+        mu1 *= q1
+        q1 += p_i
+        q2 = 1.0 - q1
+        if min(q1, q2) < eps or max(q1, q2) > 1.0 - eps:
+            continue
+        mu1 = (mu1 + i * p_i) / q1
+        mu2 = (mu - q1 * mu1) / q2
+        sigma = q1 * q2 * (mu1 - mu2) * (mu1 - mu2)
+        if sigma > max_sigma:
+            max_sigma = sigma
+            max_val = float(i)
+    return max_val
+
+
+def _band_rows(height: int, bands: int) -> List[Tuple[int, int]]:
+    step = -(-height // bands)
+    return [(top, min(height, top + step)) for top in range(0, height, step)]
+
+
+def _banded_candidates(
+    aligned_gray: np.ndarray,
+    bands: int,
+    overlap: int = LEARN_BAND_OVERLAP,
+    pool: BufferPool | None = None,
+) -> List[Tuple[float, float, float, int, int]]:
+    """Candidates of `learn_bubble_centers_from_image`, computed band by band.
+
+    Blur, threshold, morphology and `findContours` run per band on a
+    thread pool; the Otsu level is taken once from the summed band
+    histograms, i.e. over the whole blurred page. A band keeps
+    the contours whose center falls in its own rows, so overlaps are not
+    counted twice. If any shape is cut by a band edge (taller than the
+    overlap, or enclosing other shapes across bands) contours are found
+    once more on the whole page, so the result always equals the
+    single-threaded path.
+    """
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    height = aligned_gray.shape[0]
+    shape = aligned_gray.shape[:2]
+    overlap = max(int(overlap), 2 * _MORPH_HALO)
+
+    def buf(name: str) -> np.ndarray | None:
+        return pool.get(name, shape) if pool is not None else np.empty(shape, np.uint8)
+
+    blur, thresh, closed = buf("blur"), buf("thresh"), buf("opened")
+    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+    spans = _band_rows(height, bands)
+
+    def blur_band(span: Tuple[int, int]) -> np.ndarray:
+        top, bottom = span
+        y0, y1 = max(0, top - _BLUR_HALO), min(height, bottom + _BLUR_HALO)
+        band = cv2.GaussianBlur(aligned_gray[y0:y1], (5, 5), 0)
+        blur[top:bottom] = band[top - y0 : bottom - y0]
+        return cv2.calcHist([blur[top:bottom]], [0], None, [256], [0, 256]).ravel().astype(np.int64)
+
+    def threshold_band(span: Tuple[int, int]) -> None:
+        top, bottom = span
+        cv2.threshold(blur[top:bottom], level, 255, cv2.THRESH_BINARY_INV, dst=thresh[top:bottom])
+
+    def contour_band(span: Tuple[int, int]) -> Tuple[List, bool]:
+        top, bottom = span
+        y0, y1 = max(0, top - overlap), min(height, bottom + overlap)
+        band = cv2.morphologyEx(thresh[y0:y1], cv2.MORPH_OPEN, kernel, iterations=1)
+        band = cv2.morphologyEx(band, cv2.MORPH_CLOSE, kernel, iterations=1)
+        # Rows next to an inner cut are not trusted; the page edges are.
+        e0 = y0 + _MORPH_HALO if y0 > 0 else 0
+        e1 = y1 - _MORPH_HALO if y1 < height else height
+        closed[top:bottom] = band[top - y0 : bottom - y0]
+        exact = band[e0 - y0 : e1 - y0]
+        contours, _ = cv2.findContours(exact, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        cut = False
+        for c in contours:
+            _, y, _, h = cv2.boundingRect(c)
+            touches = (y == 0 and e0 > 0) or (y + h == e1 - e0 and e1 < height)
+            if touches and y + e0 < bottom and y + h + e0 > top:
+                cut = True
+                break
+        return _contour_candidates(contours, y_offset=e0, rows=(top, bottom)), cut
+
+    with ThreadPoolExecutor(max_workers=len(spans)) as executor:
+        level = _otsu_threshold(sum(executor.map(blur_band, spans)))
+        list(executor.map(threshold_band, spans))
+        results = list(executor.map(contour_band, spans))
+
+    if any(cut for _, cut in results):
+        contours, _ = cv2.findContours(closed, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        return _contour_candidates(contours)
+    return [c for found, _ in results for c in found]
+
+
+def learn_bubble_centers_from_image(
+    aligned_gray: np.ndarray,
+    pool: BufferPool | None = None,
+    roi: Tuple[int, int, int, int] | None = None,
+    bands: int = 1,
+) -> Dict[int, Dict[str, Tuple[int, int]]]:
+    """Detect the bubble grid; with `roi` (x0, y0, x1, y1) only that region is searched.
+
+    `bands` > 1 finds contours in that many horizontal bands in parallel
+    (`_banded_candidates`); the detected grid is the same.
+    """
+
+    if roi is not None:
+        x0, y0, x1, y1 = roi
+        found = learn_bubble_centers_from_image(aligned_gray[y0:y1, x0:x1], pool=pool, bands=bands)
+        return {
+            q: {opt: (x + x0, y + y0) for opt, (x, y) in opts.items()}
+            for q, opts in found.items()
+        }
+
+    if bands > 1 and aligned_gray.shape[0] >= bands * 2 * LEARN_BAND_OVERLAP:
+        candidates = _banded_candidates(aligned_gray, bands, pool=pool)
+    else:
+        shape = aligned_gray.shape[:2]
+
+        def buf(name: str) -> np.ndarray | None:
+            return pool.get(name, shape) if pool is not None else None
+
+        blur = cv2.GaussianBlur(aligned_gray, (5, 5), 0, dst=buf("blur"))
+        _, thresh = cv2.threshold(
+            blur, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU, dst=buf("thresh")
+        )
+
+        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+        opened = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel, dst=buf("opened"), iterations=1)
+        thresh = cv2.morphologyEx(opened, cv2.MORPH_CLOSE, kernel, dst=thresh, iterations=1)
+
+        contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        candidates = _contour_candidates(contours)
 
     if not candidates:
         return {}
@@ -300,34 +699,222 @@ def learn_bubble_centers_from_image(
     return bubble_centers
 
 
-def infer_bubbles(
+def resolve_bubble_centers(
+    aligned_gray: np.ndarray,
+    bubble_centers: Dict[int, Dict[str, Tuple[int, int]]] | None = None,
+    layouts: LayoutIndex | None = None,
+    remember: bool = False,
+    pool: BufferPool | None = None,
+    roi: Tuple[int, int, int, int] | None = None,
+    bands: int = 1,
+) -> Dict[int, Dict[str, Tuple[int, int]]]:
+    """Explicit centers, else a known layout from `layouts`, else learned ones.
+
+    Learning searches `roi` first and falls back to the whole page if
+    nothing is found there; without `roi`, the stored ROI of the closest
+    known layout is tried. `bands` is passed on to
+    `learn_bubble_centers_from_image`. With `remember`, freshly learned
+    centers are added to `layouts`.
+    """
+
+    if bubble_centers is not None:
+        return bubble_centers
+    if layouts is not None:
+        hit = layouts.match(aligned_gray)
+        if hit is not None:
+            return hit[1]
+        if roi is None:
+            roi = layouts.roi_hint(aligned_gray)
+    centers = learn_bubble_centers_from_image(aligned_gray, pool=pool, roi=roi, bands=bands)
+    if not centers and roi is not None:
+        centers = learn_bubble_centers_from_image(aligned_gray, pool=pool, bands=bands)
+    if layouts is not None and remember and centers:
+        layouts.add(aligned_gray, centers)
+    return centers
+
+
+def compile_centers(
+    bubble_centers: Dict[int, Dict[str, Tuple[int, int]]],
+) -> Tuple[BubbleMeta, np.ndarray]:
+    """Flatten a bubble map into per-bubble meta and an (N, 2) center array."""
+
+    meta: BubbleMeta = []
+    for q_num, options in bubble_centers.items():
+        for opt, (x, y) in options.items():
+            meta.append((int(q_num), str(opt), int(x), int(y)))
+    xy = np.array([(m[2], m[3]) for m in meta], dtype=np.int64).reshape(-1, 2)
+    return meta, xy
+
+
+def compile_fields(
+    fields: Dict[str, List[Dict[str, Tuple[int, int]]]],
+) -> Tuple[FieldMeta, np.ndarray]:
+    """Flatten field blocks into (field, column, symbol) meta and an (N, 2) center array."""
+
+    field_meta: FieldMeta = []
+    points: List[Tuple[int, int]] = []
+    for name, columns in fields.items():
+        for col_idx, column in enumerate(columns):
+            for sym, (x, y) in column.items():
+                field_meta.append((name, col_idx, sym))
+                points.append((int(x), int(y)))
+    return field_meta, np.array(points, dtype=np.int64).reshape(-1, 2)
+
+
+def compile_sheet(
+    bubble_centers: Dict[int, Dict[str, Tuple[int, int]]],
+    fields: Dict[str, List[Dict[str, Tuple[int, int]]]] | None = None,
+) -> Tuple[BubbleMeta, FieldMeta, np.ndarray]:
+    """Question bubbles followed by field bubbles, as one (N, 2) center array."""
+
+    meta, xy = compile_centers(bubble_centers)
+    if not fields:
+        return meta, [], xy
+    field_meta, field_xy = compile_fields(fields)
+    return meta, field_meta, np.concatenate([xy, field_xy])
+
+
+def score_sheet(
     classifier: BubbleClassifier,
     aligned_img: np.ndarray,
     bubble_centers: Dict[int, Dict[str, Tuple[int, int]]] | None = None,
-    prob_threshold: float = 0.0,
-) -> List[Dict]:
-    """Infer which bubbles are filled.
+    fields: Dict[str, List[Dict[str, Tuple[int, int]]]] | None = None,
+    pool: BufferPool | None = None,
+    refine: int = 0,
+    refine_radius: int = DEFAULT_RADIUS,
+) -> Tuple[BubbleMeta, np.ndarray, FieldMeta, np.ndarray]:
+    """Score question and field bubbles in a single classifier batch.
+
+    Returns `(meta, probs, field_meta, field_probs)`. With `refine` > 0 every
+    center is first snapped to the printed bubble ring of `refine_radius`
+    within that many pixels (`omr_refine`), and `meta` carries the refined
+    positions.
+    """
 
-    Returns a list of dicts with
-    {questionNumber, option, centerX, centerY, confidence}.
+    centers = BUBBLE_CENTERS if bubble_centers is None else bubble_centers
+    shape = aligned_img.shape[:2]
+    index = None
+    if pool is not None:
+        # The same bubble map is reused for every sheet of a batch; a pool
+        # worker may also have it preloaded from shared arrays.
+        cached = pool.cache.get("compiled_centers")
+        if (
+            cached is None
+            or cached[0] is not centers
+            or cached[1] is not fields
+            or cached[5] != shape
+        ):
+            meta, field_meta, xy = compile_sheet(centers, fields)
+            cached = (centers, fields, meta, field_meta, xy, shape, patch_index(xy, shape))
+            pool.cache["compiled_centers"] = cached
+        _, _, meta, field_meta, xy, _, index = cached
+    else:
+        meta, field_meta, xy = compile_sheet(centers, fields)
+
+    if xy.shape[0] == 0:
+        empty = np.zeros((0,), dtype=np.float32)
+        return [], empty, [], empty
+
+    if refine > 0:
+        xy, _ = refine_centers(aligned_img, xy, search=refine, radius=refine_radius)
+        meta = [(q, opt, int(x), int(y)) for (q, opt, _, _), (x, y) in zip(meta, xy)]
+        index = patch_index(xy, shape) if pool is not None else None
+
+    batch = crop_patches(aligned_img, xy, pool=pool, index=index)  # (N, H, W, 1)
+    probs = np.asarray(classifier.predict_probs(batch), dtype=np.float32).reshape(-1)
+    n = len(meta)
+    return meta, probs[:n], field_meta, probs[n:]
+
+
+def score_bubbles(
+    classifier: BubbleClassifier,
+    aligned_img: np.ndarray,
+    bubble_centers: Dict[int, Dict[str, Tuple[int, int]]] | None = None,
+    pool: BufferPool | None = None,
+    refine: int = 0,
+    refine_radius: int = DEFAULT_RADIUS,
+) -> Tuple[BubbleMeta, np.ndarray]:
+    """Score every bubble in one batch.
+
+    Returns `(meta, probs)` where meta holds (questionNumber, option, x, y)
+    per bubble and probs the matching fill probabilities.
     """
 
-    patches: List[np.ndarray] = []
-    meta: List[Tuple[int, str, int, int]] = []
+    meta, probs, _, _ = score_sheet(
+        classifier,
+        aligned_img,
+        bubble_centers,
+        pool=pool,
+        refine=refine,
+        refine_radius=refine_radius,
+    )
+    return meta, probs
 
-    centers = BUBBLE_CENTERS if bubble_centers is None else bubble_centers
-    for q_num, options in centers.items():
-        for opt, (x, y) in options.items():
-            patch = crop_patch(aligned_img, (x, y))
-            patches.append(patch)
-            meta.append((int(q_num), str(opt), int(x), int(y)))
 
-    if not patches:
-        return []
+def decode_fields(
+    field_meta: FieldMeta,
+    field_probs: np.ndarray,
+    threshold: float = DEFAULT_SELECTION_THRESHOLD,
+) -> Dict[str, Dict]:
+    """Read each field column as one character.
+
+    A column with no mark reads as "?" and one with several marks as "*";
+    `complete` is true only if every column has exactly one mark.
+    """
+
+    marks: Dict[str, Dict[int, List[str]]] = {}
+    for (name, col_idx, sym), p in zip(field_meta, field_probs):
+        column = marks.setdefault(name, {}).setdefault(col_idx, [])
+        if float(p) >= threshold:
+            column.append(sym)
+
+    decoded: Dict[str, Dict] = {}
+    for name, columns in marks.items():
+        chars = []
+        for col_idx in sorted(columns):
+            selected = columns[col_idx]
+            chars.append(selected[0] if len(selected) == 1 else ("?" if not selected else "*"))
+        value = "".join(chars)
+        decoded[name] = {"value": value, "complete": "?" not in value and "*" not in value}
+    return decoded
+
+
+def calibrate_threshold(
+    probs: np.ndarray,
+    fallback: float = DEFAULT_SELECTION_THRESHOLD,
+    min_separation: float = MIN_CLASS_SEPARATION,
+) -> float:
+    """Per-sheet filled/empty cutoff from the confidences of all its bubbles.
+
+    Splits the sorted confidences into two groups with Otsu's criterion
+    (equivalently 1-D 2-means) and returns the midpoint between them. If
+    the group means are closer than `min_separation` the sheet has no
+    clear filled population and `fallback` is returned.
+    """
 
-    batch = np.stack(patches, axis=0)  # (N, H, W, 1)
-    probs = classifier.predict_probs(batch)
+    values = np.sort(np.asarray(probs, dtype=np.float64).reshape(-1))
+    n = int(values.size)
+    if n < 2:
+        return float(fallback)
 
+    csum = np.cumsum(values)
+    k = np.arange(1, n, dtype=np.float64)  # size of the low group
+    mean_lo = csum[:-1] / k
+    mean_hi = (csum[-1] - csum[:-1]) / (n - k)
+    between = k * (n - k) * (mean_hi - mean_lo) ** 2
+    between[values[1:] <= values[:-1]] = -1.0  # only split between distinct values
+
+    i = int(np.argmax(between))
+    if between[i] < 0 or mean_hi[i] - mean_lo[i] < min_separation:
+        return float(fallback)
+    return float((values[i] + values[i + 1]) / 2.0)
+
+
+def bubbles_from_scores(
+    meta: BubbleMeta,
+    probs: np.ndarray,
+    prob_threshold: float = 0.0,
+) -> List[Dict]:
     results: List[Dict] = []
     for (q_num, opt, x, y), p in zip(meta, probs):
         if float(p) < prob_threshold:
@@ -345,7 +932,26 @@ def infer_bubbles(
     return results
 
 
-def build_answer_key_json(bubble_results: List[Dict]) -> List[Dict]:
+def infer_bubbles(
+    classifier: BubbleClassifier,
+    aligned_img: np.ndarray,
+    bubble_centers: Dict[int, Dict[str, Tuple[int, int]]] | None = None,
+    prob_threshold: float = 0.0,
+) -> List[Dict]:
+    """Infer which bubbles are filled.
+
+    Returns a list of dicts with
+    {questionNumber, option, centerX, centerY, confidence}.
+    """
+
+    meta, probs = score_bubbles(classifier, aligned_img, bubble_centers=bubble_centers)
+    return bubbles_from_scores(meta, probs, prob_threshold=prob_threshold)
+
+
+def build_answer_key_json(
+    bubble_results: List[Dict],
+    threshold: float = DEFAULT_SELECTION_THRESHOLD,
+) -> List[Dict]:
     by_q: Dict[int, List[Dict]] = {}
     for r in bubble_results:
         q = int(r["questionNumber"])
@@ -354,7 +960,7 @@ def build_answer_key_json(bubble_results: List[Dict]) -> List[Dict]:
     answer_key: List[Dict] = []
     for q, arr in by_q.items():
         best = max(arr, key=lambda x: x.get("confidence", 0.0))
-        if float(best.get("confidence", 0.0)) < 0.25:
+        if float(best.get("confidence", 0.0)) < threshold:
             continue
         answer_key.append(
             {
@@ -367,7 +973,7 @@ def build_answer_key_json(bubble_results: List[Dict]) -> List[Dict]:
 
 def build_student_answers_json(
     bubble_results: List[Dict],
-    selection_threshold: float = 0.25,
+    selection_threshold: float = DEFAULT_SELECTION_THRESHOLD,
 ) -> List[Dict]:
     by_q: Dict[int, List[Dict]] = {}
     for r in bubble_results:
@@ -394,67 +1000,870 @@ def build_student_answers_json(
     return student_answers
 
 
+def result_key(
+    image_hash: str,
+    kind: str,
+    classifier_ver: str,
+    bubble_centers: Dict[int, Dict[str, Tuple[int, int]]] | None = None,
+    **options: object,
+) -> str:
+    """`ResultStore` key of one sheet's `kind` output (answer_key, student, page).
+
+    Without `bubble_centers` the centers are learned from the image itself,
+    so the image hash already pins them. That does not hold with a
+    `LayoutIndex`, whose contents decide the centers: callers resolve them
+    first and pass the result here.
+    """
+
+    if bubble_centers is not None:
+        tmpl = template_hash(bubble_centers, classifier_ver)
+    else:
+        tmpl = f"learned:{classifier_ver}"
+    return ResultStore.key(image_hash, tmpl, kind=kind, **options)
+
+
+def batch_options_hash(classifier_ver: str, options: Dict) -> str:
+    """Hash of what decides a batch page's output besides its pixels.
+
+    Part of every `BatchJournal` key. With a layout index and no bubble
+    map the template is left out: each row records the layout its page
+    matched instead (`_journal_layouts`), so adding layouts to the index
+    does not invalidate finished pages.
+    """
+
+    graded = dict(
+        fields=options["fields"],
+        selection_threshold=options["selection_threshold"],
+        normalize_lighting=options["normalize_lighting"],
+        quality_gate=options["quality_gate"],
+        refine=options["refine"],
+        refine_radius=options["refine_radius"],
+    )
+    if options["bubble_centers"] is None and options["layouts"] is not None:
+        return ResultStore.key("", f"layouts:{classifier_ver}", kind="page", **graded)[:16]
+    return result_key("", "page", classifier_ver, options["bubble_centers"], **graded)[:16]
+
+
+def _journal_layouts(options: Dict) -> Set[str] | None:
+    """Ids in the batch's layout index; a journaled page whose layout left it is graded again."""
+
+    layouts = options["layouts"]
+    if options["bubble_centers"] is not None or layouts is None:
+        return None
+    return {str(e.get("id")) for e in layouts.entries}
+
+
 def process_answer_key(
     image_path: str,
     model_path: str | None = None,
     bubble_centers: Dict[int, Dict[str, Tuple[int, int]]] | None = None,
+    threshold: float | None = None,
+    normalize_lighting: bool = True,
+    layouts: LayoutIndex | None = None,
+    learn_bands: int = 1,
+    results: ResultStore | None = None,
+    refine: int = 0,
+    refine_radius: int = DEFAULT_RADIUS,
 ) -> List[Dict]:
-    aligned = load_and_align(image_path)
-    centers = bubble_centers
-    if centers is None:
-        centers = learn_bubble_centers_from_image(aligned)
+    """Build the answerKey JSON; `threshold=None` calibrates it per sheet.
+
+    With `results`, a sheet already graded with the same template,
+    classifier and options is answered from the store; with `layouts` the
+    template is resolved (and learned on a miss) first.
+    """
+
+    aligned = centers = None
+    if layouts is not None and bubble_centers is None:
+        # The index decides the centers (and learns this layout on a miss),
+        # so resolve them before the lookup.
+        aligned = load_and_align(image_path)
+        centers = resolve_bubble_centers(
+            aligned, None, layouts, remember=True, bands=learn_bands
+        )
+    key = None
+    if results is not None:
+        key = result_key(
+            file_sha256(image_path),
+            "answer_key",
+            classifier_stamp(model_path, results),
+            centers or bubble_centers,
+            threshold=threshold,
+            normalize_lighting=normalize_lighting,
+            refine=refine,
+            refine_radius=refine_radius,
+        )
+        cached = results.get(key)
+        if cached is not None:
+            return cached
+    if aligned is None:
+        aligned = load_and_align(image_path)
+        centers = resolve_bubble_centers(
+            aligned, bubble_centers, layouts, remember=True, bands=learn_bands
+        )
     if not centers:
         raise ValueError("Failed to detect bubble centers from the provided OMR template")
-    classifier = BubbleClassifier(model_path=model_path)
-    bubbles = infer_bubbles(classifier, aligned, bubble_centers=centers)
-    return build_answer_key_json(bubbles)
+    if normalize_lighting:
+        aligned = normalize_background(aligned)
+    meta, probs = score_bubbles(
+        load_classifier(model_path, results),
+        aligned,
+        bubble_centers=centers,
+        refine=refine,
+        refine_radius=refine_radius,
+    )
+    if threshold is None:
+        threshold = calibrate_threshold(probs)
+    answer_key = build_answer_key_json(bubbles_from_scores(meta, probs), threshold=threshold)
+    if key is not None:
+        results.put(key, answer_key)
+    return answer_key
 
 
 def process_student_omr(
     image_path: str,
     model_path: str | None = None,
     bubble_centers: Dict[int, Dict[str, Tuple[int, int]]] | None = None,
+    store: ConfidenceStore | None = None,
+    selection_threshold: float | None = None,
+    normalize_lighting: bool = True,
+    quality_gate: bool = True,
+    layouts: LayoutIndex | None = None,
+    results: ResultStore | None = None,
+    refine: int = 0,
+    refine_radius: int = DEFAULT_RADIUS,
+) -> List[Dict]:
+    """Build the studentAnswers JSON; `selection_threshold=None` calibrates it per sheet.
+
+    Raises SheetQualityError before any full-resolution work if the photo
+    fails the quality gate. With `results`, a repeated sheet is answered
+    from the store without decoding it (with `layouts`, once its layout
+    is resolved).
+    """
+
+    image_hash = None
+    if store is not None or results is not None:
+        image_hash = file_sha256(image_path)
+    aligned = centers = None
+    if results is not None and layouts is not None and bubble_centers is None:
+        # The layout the sheet matches is part of its result.
+        aligned, centers = prepare_sheet(read_gray(image_path), None, quality_gate, layouts)
+    key = None
+    if results is not None:
+        key = result_key(
+            image_hash,
+            "student",
+            classifier_stamp(model_path, results),
+            centers or bubble_centers,
+            selection_threshold=selection_threshold,
+            normalize_lighting=normalize_lighting,
+            quality_gate=quality_gate,
+            refine=refine,
+            refine_radius=refine_radius,
+        )
+        cached = results.get(key)
+        if cached is not None:
+            return cached
+    # Only a miss needs the model itself.
+    classifier = load_classifier(model_path, results)
+    if aligned is not None:
+        student_answers = grade_aligned(
+            aligned,
+            classifier,
+            centers,
+            store=store,
+            image_hash=image_hash,
+            selection_threshold=selection_threshold,
+            normalize_lighting=normalize_lighting,
+            refine=refine,
+            refine_radius=refine_radius,
+        )["studentAnswers"]
+    else:
+        student_answers = process_student_gray(
+            read_gray(image_path),
+            classifier=classifier,
+            bubble_centers=bubble_centers,
+            store=store,
+            image_hash=image_hash,
+            selection_threshold=selection_threshold,
+            normalize_lighting=normalize_lighting,
+            quality_gate=quality_gate,
+            layouts=layouts,
+            refine=refine,
+            refine_radius=refine_radius,
+        )
+    if key is not None:
+        results.put(key, student_answers)
+    return student_answers
+
+
+def process_student_gray(
+    gray: np.ndarray,
+    classifier: BubbleClassifier,
+    bubble_centers: Dict[int, Dict[str, Tuple[int, int]]] | None = None,
+    store: ConfidenceStore | None = None,
+    image_hash: str | None = None,
+    selection_threshold: float | None = None,
+    normalize_lighting: bool = True,
+    quality_gate: bool = True,
+    pool: BufferPool | None = None,
+    layouts: LayoutIndex | None = None,
+    refine: int = 0,
+    refine_radius: int = DEFAULT_RADIUS,
 ) -> List[Dict]:
-    aligned = load_and_align(image_path)
-    centers = bubble_centers
-    if centers is None:
-        centers = learn_bubble_centers_from_image(aligned)
+    """`process_student_omr` for an already decoded grayscale page.
+
+    `image_hash` is required when `store` is given. With a `pool`, all
+    full-page intermediates are written into its reusable buffers.
+    """
+
+    return grade_sheet_gray(
+        gray,
+        classifier,
+        bubble_centers=bubble_centers,
+        store=store,
+        image_hash=image_hash,
+        selection_threshold=selection_threshold,
+        normalize_lighting=normalize_lighting,
+        quality_gate=quality_gate,
+        pool=pool,
+        layouts=layouts,
+        refine=refine,
+        refine_radius=refine_radius,
+    )["studentAnswers"]
+
+
+def grade_sheet_gray(
+    gray: np.ndarray,
+    classifier: BubbleClassifier,
+    bubble_centers: Dict[int, Dict[str, Tuple[int, int]]] | None = None,
+    store: ConfidenceStore | None = None,
+    image_hash: str | None = None,
+    selection_threshold: float | None = None,
+    normalize_lighting: bool = True,
+    quality_gate: bool = True,
+    pool: BufferPool | None = None,
+    layouts: LayoutIndex | None = None,
+    fields: Dict[str, List[Dict[str, Tuple[int, int]]]] | None = None,
+    refine: int = 0,
+    refine_radius: int = DEFAULT_RADIUS,
+) -> Dict:
+    """Grade one page: `{"studentAnswers": [...]}`, plus decoded `fields` if given.
+
+    Field bubbles (roll number, booklet code) are scored in the same
+    classifier batch as the answers and read with the same cutoff.
+    """
+
+    aligned, centers = prepare_sheet(gray, bubble_centers, quality_gate, layouts, pool=pool)
+    return grade_aligned(
+        aligned,
+        classifier,
+        centers,
+        store=store,
+        image_hash=image_hash,
+        selection_threshold=selection_threshold,
+        normalize_lighting=normalize_lighting,
+        pool=pool,
+        fields=fields,
+        refine=refine,
+        refine_radius=refine_radius,
+    )
+
+
+def prepare_sheet(
+    gray: np.ndarray,
+    bubble_centers: Dict[int, Dict[str, Tuple[int, int]]] | None = None,
+    quality_gate: bool = True,
+    layouts: LayoutIndex | None = None,
+    pool: BufferPool | None = None,
+) -> Tuple[np.ndarray, Dict[int, Dict[str, Tuple[int, int]]]]:
+    """Quality gate, alignment and `locate_centers`: `(aligned, centers)`."""
+
+    if quality_gate:
+        report = assess_quality(
+            gray, bubble_centers, template_size=(TEMPLATE_WIDTH, TEMPLATE_HEIGHT)
+        )
+        if not report["ok"]:
+            raise SheetQualityError(report["reason"], report["metrics"])
+    aligned = align_gray(gray, pool=pool)
+    return aligned, locate_centers(aligned, bubble_centers, layouts, pool=pool)
+
+
+def locate_centers(
+    aligned: np.ndarray,
+    bubble_centers: Dict[int, Dict[str, Tuple[int, int]]] | None = None,
+    layouts: LayoutIndex | None = None,
+    pool: BufferPool | None = None,
+) -> Dict[int, Dict[str, Tuple[int, int]]]:
+    """`resolve_bubble_centers` plus per-pool answer-grid ROIs; raises if none are found."""
+
+    # A pool usually grades many sheets of a few designs. The answer-grid
+    # region of each design learned so far is kept under the page's phash,
+    # so the next sheet of the same design searches only that region and a
+    # sheet of another design does not inherit it.
+    roi = phash = None
+    known: List[Dict] = []
+    if pool is not None and bubble_centers is None:
+        known = pool.cache.setdefault("grid_rois", [])
+        phash = page_phash(aligned, (TEMPLATE_WIDTH, TEMPLATE_HEIGHT))
+        roi = nearest_roi(known, phash)
+    centers = resolve_bubble_centers(aligned, bubble_centers, layouts, pool=pool, roi=roi)
     if not centers:
         raise ValueError("Failed to detect bubble centers from the provided OMR template")
+    if phash is not None and roi is None:
+        known.append({"phash": phash, "roi": grid_roi(centers, (TEMPLATE_WIDTH, TEMPLATE_HEIGHT))})
+    return centers
+
+
+def grade_aligned(
+    aligned: np.ndarray,
+    classifier: BubbleClassifier,
+    centers: Dict[int, Dict[str, Tuple[int, int]]],
+    store: ConfidenceStore | None = None,
+    image_hash: str | None = None,
+    selection_threshold: float | None = None,
+    normalize_lighting: bool = True,
+    pool: BufferPool | None = None,
+    fields: Dict[str, List[Dict[str, Tuple[int, int]]]] | None = None,
+    refine: int = 0,
+    refine_radius: int = DEFAULT_RADIUS,
+) -> Dict:
+    """Shared scoring stage once the bubbles are located, whatever found them.
+
+    `refine` > 0 re-centers each bubble within that many pixels before
+    scoring, for fixed maps on pages that are slightly shifted or warped;
+    `refine_radius` is the printed bubble radius at template scale.
+    """
+
+    if normalize_lighting:
+        aligned = normalize_background(aligned, pool=pool)
+    meta, probs, field_meta, field_probs = score_sheet(
+        classifier,
+        aligned,
+        bubble_centers=centers,
+        fields=fields,
+        pool=pool,
+        refine=refine,
+        refine_radius=refine_radius,
+    )
+    if store is not None:
+        if image_hash is None:
+            raise ValueError("image_hash is required to store confidences")
+        store.save(image_hash, template_hash(centers, classifier.version), meta, probs)
+    if selection_threshold is None:
+        selection_threshold = calibrate_threshold(probs)
+    result: Dict = {
+        "studentAnswers": build_student_answers_json(
+            bubbles_from_scores(meta, probs), selection_threshold=selection_threshold
+        )
+    }
+    if fields:
+        result["fields"] = decode_fields(field_meta, field_probs, threshold=selection_threshold)
+    return result
+
+
+def _grade_page(
+    gray: np.ndarray,
+    source: str,
+    page_index: int,
+    file_hash: str | None,
+    classifier: BubbleClassifier,
+    pool: BufferPool,
+    options: Dict,
+) -> Dict:
+    entry: Dict = {"source": source, "page": page_index}
+    options = dict(options)
+    results = options.pop("results", None)
+    image_hash = page_hash(file_hash, page_index) if file_hash is not None else None
+    key = None
+    if results is not None:
+        # `_cached` feeds the batch summary's resultCache counts.
+        entry["_cached"] = False
+    try:
+        aligned = centers = None
+        layouts = options["layouts"]
+        if layouts is not None and options["bubble_centers"] is None:
+            # The layout the page matches is part of its result; `_layout`
+            # gives its id to the journal when it came from the index.
+            aligned, centers = prepare_sheet(
+                gray, None, options["quality_gate"], layouts, pool=pool
+            )
+            layout_id = template_hash(centers)
+            if any(e.get("id") == layout_id for e in layouts.entries):
+                entry["_layout"] = layout_id
+        if results is not None:
+            key = result_key(
+                image_hash,
+                "page",
+                classifier.version,
+                centers or options["bubble_centers"],
+                fields=options["fields"],
+                selection_threshold=options["selection_threshold"],
+                normalize_lighting=options["normalize_lighting"],
+                quality_gate=options["quality_gate"],
+                refine=options["refine"],
+                refine_radius=options["refine_radius"],
+            )
+            cached = results.get(key)
+            if cached is not None:
+                entry["_cached"] = True
+                entry.update(cached)
+                return entry
+        if aligned is not None:
+            graded = grade_aligned(
+                aligned,
+                classifier,
+                centers,
+                store=options["store"],
+                image_hash=image_hash,
+                selection_threshold=options["selection_threshold"],
+                normalize_lighting=options["normalize_lighting"],
+                pool=pool,
+                fields=options["fields"],
+                refine=options["refine"],
+                refine_radius=options["refine_radius"],
+            )
+        else:
+            graded = grade_sheet_gray(
+                gray,
+                classifier=classifier,
+                image_hash=image_hash,
+                pool=pool,
+                **options,
+            )
+        entry.update(graded)
+        if key is not None:
+            results.put(key, graded)
+    except SheetQualityError as e:
+        entry.update(e.to_json())
+    except Exception as e:
+        entry["error"] = str(e)
+    return entry
+
+
+def iter_batch_results(
+    sources: List[str],
+    model_path: str | None = None,
+    bubble_centers: Dict[int, Dict[str, Tuple[int, int]]] | None = None,
+    store: ConfidenceStore | None = None,
+    selection_threshold: float | None = None,
+    normalize_lighting: bool = True,
+    quality_gate: bool = True,
+    pool: BufferPool | None = None,
+    max_rss_mb: float | None = None,
+    layouts: LayoutIndex | None = None,
+    fields: Dict[str, List[Dict[str, Tuple[int, int]]]] | None = None,
+    results: ResultStore | None = None,
+    journal: BatchJournal | None = None,
+    refine: int = 0,
+    refine_radius: int = DEFAULT_RADIUS,
+) -> Iterator[Dict]:
+    """Grade every page of every source, yielding one result per page in order.
+
+    Pages are decoded lazily, so only one page is held in memory at a time.
+    A page that fails yields an `error` entry instead of stopping the batch.
+    If the worker's RSS stays above `max_rss_mb` after releasing its
+    buffers, MemoryBudgetExceeded ends the batch. Pages found in `results`
+    are not graded again; their entries carry `_cached`. With a `journal`
+    every graded page is recorded, and pages it already resolved are
+    re-emitted from it; a source whose pages are all resolved is not
+    decoded.
+    """
+
     classifier = BubbleClassifier(model_path=model_path)
-    bubbles = infer_bubbles(classifier, aligned, bubble_centers=centers)
-    return build_student_answers_json(bubbles)
+    pool = BufferPool() if pool is None else pool
+    budget = MemoryBudget(max_rss_mb)
+    options = dict(
+        bubble_centers=bubble_centers,
+        store=store,
+        selection_threshold=selection_threshold,
+        normalize_lighting=normalize_lighting,
+        quality_gate=quality_gate,
+        layouts=layouts,
+        fields=fields,
+        results=results,
+        refine=refine,
+        refine_radius=refine_radius,
+    )
+    grading = batch_options_hash(classifier.version, options) if journal is not None else ""
+    known = _journal_layouts(options) if journal is not None else None
+    for source in sources:
+        try:
+            hashed = store is not None or results is not None or journal is not None
+            file_hash = file_sha256(source) if hashed else None
+            resolved: List[Dict | None] = []
+            if journal is not None:
+                resolved = [
+                    journal.resolved((source, i, page_hash(file_hash, i), grading), known)
+                    for i in range(count_pages(source))
+                ]
+                if all(e is not None for e in resolved):
+                    yield from resolved
+                    continue
+            pages = iter_pages(source)
+            for page_index, gray in pages:
+                if page_index < len(resolved) and resolved[page_index] is not None:
+                    yield resolved[page_index]
+                    continue
+                started = time.perf_counter()
+                entry = _grade_page(gray, source, page_index, file_hash, classifier, pool, options)
+                layout = entry.pop("_layout", None)
+                del gray
+                if journal is not None:
+                    latency_ms = (time.perf_counter() - started) * 1000.0
+                    key = (source, page_index, page_hash(file_hash, page_index), grading)
+                    journal.record(key, entry, latency_ms, layout)
+                yield entry
+                budget.check(pool)
+        except MemoryBudgetExceeded:
+            raise
+        except Exception as e:
+            # The source itself could not be opened or decoded further.
+            yield {"source": source, "page": None, "error": str(e)}
+
+
+# Set in the parent right before the worker pool forks so workers inherit
+# the loaded model copy-on-write instead of each loading it again.
+_preloaded_classifier: BubbleClassifier | None = None
+_worker_state: Dict = {}
+
+
+def _init_batch_worker(
+    model_path: str | None,
+    options: Dict,
+    shared_dir: str | None,
+    max_rss_mb: float | None,
+) -> None:
+    classifier = _preloaded_classifier
+    if classifier is None:  # spawn start method: nothing was inherited
+        classifier = BubbleClassifier(model_path=model_path)
+
+    pool = BufferPool()
+    centers = options.get("bubble_centers")
+    fields = options.get("fields")
+    if shared_dir is not None and centers is not None:
+        arrays = SharedArrays(shared_dir).load()
+        meta, field_meta, _ = compile_sheet(centers, fields)
+        pool.cache["compiled_centers"] = (
+            centers,
+            fields,
+            meta,
+            field_meta,
+            arrays["xy"],
+            (TEMPLATE_HEIGHT, TEMPLATE_WIDTH),
+            (arrays["flat_idx"], arrays["inside"]),
+        )
+
+    _worker_state.update(
+        classifier=classifier,
+        pool=pool,
+        options=options,
+        budget=MemoryBudget(max_rss_mb),
+    )
+
+
+BatchTask = Tuple[str, int | None, str | None, str | None, Dict | None, str]
 
 
-def call_backend_evaluate(
-    submission_id: str,
+def _run_batch_task(task: BatchTask) -> Dict:
+    source, page_index, file_hash, error, resolved, grading = task
+    if page_index is None:
+        return {"source": source, "page": None, "error": error}
+    if resolved is not None:
+        return resolved
+
+    state = _worker_state
+    # `_journal` ([journal key, latency ms, layout id]) lets the parent record the page.
+    stamp = None
+    if file_hash is not None:
+        stamp = (source, page_index, page_hash(file_hash, page_index), grading)
+    try:
+        gray = read_page(source, page_index)
+    except Exception as e:
+        return {"source": source, "page": page_index, "error": str(e), "_journal": [stamp, None, None]}
+    started = time.perf_counter()
+    entry = _grade_page(
+        gray, source, page_index, file_hash, state["classifier"], state["pool"], state["options"]
+    )
+    latency_ms = (time.perf_counter() - started) * 1000.0
+    entry["_journal"] = [stamp, latency_ms, entry.pop("_layout", None)]
+    del gray
+    state["budget"].check(state["pool"])
+    peak = peak_rss_mb()
+    entry["_worker"] = [os.getpid(), round(peak, 1) if peak is not None else None]
+    return entry
+
+
+def _batch_tasks(
+    sources: List[str],
+    hash_files: bool,
+    journal: BatchJournal | None = None,
+    grading: str = "",
+    layouts: Set[str] | None = None,
+) -> Iterator[BatchTask]:
+    for source in sources:
+        try:
+            count = count_pages(source)
+            file_hash = file_sha256(source) if hash_files or journal is not None else None
+        except Exception as e:
+            yield source, None, None, str(e), None, grading
+            continue
+        for page_index in range(count):
+            resolved = None
+            if journal is not None:
+                resolved = journal.resolved(
+                    (source, page_index, page_hash(file_hash, page_index), grading), layouts
+                )
+            yield source, page_index, file_hash, None, resolved, grading
+
+
+def iter_batch_results_parallel(
+    sources: List[str],
+    workers: int,
+    model_path: str | None = None,
+    bubble_centers: Dict[int, Dict[str, Tuple[int, int]]] | None = None,
+    store: ConfidenceStore | None = None,
+    selection_threshold: float | None = None,
+    normalize_lighting: bool = True,
+    quality_gate: bool = True,
+    max_rss_mb: float | None = None,
+    layouts: LayoutIndex | None = None,
+    fields: Dict[str, List[Dict[str, Tuple[int, int]]]] | None = None,
+    results: ResultStore | None = None,
+    journal: BatchJournal | None = None,
+    refine: int = 0,
+    refine_radius: int = DEFAULT_RADIUS,
+) -> Iterator[Dict]:
+    """Like `iter_batch_results`, but pages are graded by a pool of processes.
+
+    The parent only counts pages and hands out `(source, page)` tasks; each
+    worker decodes its own page, so no pixels are pickled. The classifier
+    is loaded once before the pool forks, and a given bubble map is
+    compiled once and mapped read-only by every worker (`omr_shared`).
+    Results are yielded in input order. Each entry carries a `_worker`
+    field `[pid, peakRssMb]` for the caller's memory summary. Pages are
+    journaled by the parent, so the journal has a single writer.
+    """
+
+    global _preloaded_classifier
+
+    import multiprocessing
+
+    methods = multiprocessing.get_all_start_methods()
+    ctx = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+    if ctx.get_start_method() == "fork":
+        _preloaded_classifier = load_classifier(model_path)
+
+    shared = None
+    if bubble_centers is not None:
+        _, _, xy = compile_sheet(bubble_centers, fields)
+        flat_idx, inside = patch_index(xy, (TEMPLATE_HEIGHT, TEMPLATE_WIDTH))
+        shared = SharedArrays.publish({"xy": xy, "flat_idx": flat_idx, "inside": inside})
+
+    options = dict(
+        bubble_centers=bubble_centers,
+        store=store,
+        selection_threshold=selection_threshold,
+        normalize_lighting=normalize_lighting,
+        quality_gate=quality_gate,
+        layouts=layouts,
+        fields=fields,
+        results=results,
+        refine=refine,
+        refine_radius=refine_radius,
+    )
+    grading = ""
+    if journal is not None:
+        grading = batch_options_hash(load_classifier(model_path).version, options)
+    try:
+        with ctx.Pool(
+            processes=workers,
+            initializer=_init_batch_worker,
+            initargs=(
+                model_path,
+                options,
+                str(shared.directory) if shared is not None else None,
+                max_rss_mb,
+            ),
+        ) as mp_pool:
+            tasks = _batch_tasks(
+                sources,
+                hash_files=store is not None or results is not None,
+                journal=journal,
+                grading=grading,
+                layouts=_journal_layouts(options) if journal is not None else None,
+            )
+            for entry in mp_pool.imap(_run_batch_task, tasks, chunksize=1):
+                stamp = entry.pop("_journal", None)
+                if journal is not None and stamp is not None:
+                    journal.record(tuple(stamp[0]), entry, stamp[1], stamp[2])
+                yield entry
+    finally:
+        _preloaded_classifier = None
+        if shared is not None:
+            shared.cleanup()
+
+
+def score_answers(
     answer_key: List[Dict],
     student_answers: List[Dict],
-    api_base: str,
-    token: str | None = None,
+    scoring_config: Dict | None = None,
+) -> Dict:
+    """Score studentAnswers against answerKey with the exam's sections and marking.
+
+    `scoring_config` is the exam's `scoringConfig`; missing parts fall back
+    to `neet_scoring.json`, shared with the Node evaluator.
+    """
+
+    return evaluate_omr(answer_key, student_answers, scoring_config)
+
+
+def regrade_student_omr(
+    image_path: str,
+    answer_key: List[Dict],
+    store: ConfidenceStore,
+    model_path: str | None = None,
+    bubble_centers: Dict[int, Dict[str, Tuple[int, int]]] | None = None,
+    selection_threshold: float | None = None,
+    scoring_config: Dict | None = None,
 ) -> Dict:
-    url = f"{api_base}/exam/evaluate/{submission_id}"
-    headers = {"Content-Type": "application/json"}
-    if token:
-        headers["Authorization"] = f"Bearer {token}"
-    payload = {"answerKey": answer_key, "studentAnswers": student_answers}
-    resp = requests.post(url, headers=headers, data=json.dumps(payload))
-    resp.raise_for_status()
-    return resp.json()
+    """Re-apply `answer_key` to a sheet using only its stored confidences.
+
+    The image is hashed but never decoded. Without `bubble_centers` the
+    single stored entry for the image is used.
+    """
+
+    image_hash = file_sha256(image_path)
+    if bubble_centers is not None:
+        tmpl = template_hash(bubble_centers, load_classifier(model_path).version)
+        stored = store.load(image_hash, tmpl)
+    else:
+        stored = store.load_any(image_hash)
+    if stored is None:
+        raise ValueError(
+            f"No stored confidences for {image_path}; process it once with --store first"
+        )
+
+    meta, probs = stored
+    if selection_threshold is None:
+        selection_threshold = calibrate_threshold(probs)
+    student_answers = build_student_answers_json(
+        bubbles_from_scores(meta, probs), selection_threshold=selection_threshold
+    )
+    return {
+        "image": image_path,
+        "studentAnswers": student_answers,
+        "evaluation": score_answers(answer_key, student_answers, scoring_config),
+    }
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="NEET OMR processing pipeline")
     parser.add_argument(
-        "--mode", choices=["answer_key", "student", "template"], required=True
+        "--mode",
+        choices=["answer_key", "student", "template", "regrade", "batch"],
+        required=True,
+    )
+    parser.add_argument(
+        "--image",
+        required=True,
+        nargs="+",
+        help="Path to scanned OMR image (regrade and batch accept several; "
+        "batch also takes multi-page TIFF/PDF)",
     )
-    parser.add_argument("--image", required=True, help="Path to scanned OMR image")
     parser.add_argument("--model", help="Optional Keras model .h5 path", default=None)
     parser.add_argument("--bubble-map", help="Optional bubble-map JSON file")
     parser.add_argument("--submission-id", help="If provided, call backend evaluate")
+    parser.add_argument(
+        "--store",
+        help="Directory of stored bubble confidences (written in student mode, read by regrade)",
+    )
+    parser.add_argument(
+        "--answer-key-json",
+        help="answerKey JSON file for regrade mode; in batch mode each page is also scored",
+    )
+    parser.add_argument(
+        "--scoring-config",
+        help="Exam scoringConfig JSON (sections and marks); default omr/neet_scoring.json",
+    )
+    parser.add_argument(
+        "--result-cache",
+        help="Directory of finished sheet results; repeated images are answered from it",
+    )
+    parser.add_argument(
+        "--result-cache-size",
+        type=int,
+        default=DEFAULT_MAX_RESULTS,
+        help="Approximate number of results kept in --result-cache",
+    )
+    parser.add_argument(
+        "--layout-index",
+        help="Directory of known sheet layouts; reused instead of relearning bubble centers",
+    )
+    parser.add_argument(
+        "--learn-bands",
+        type=int,
+        default=1,
+        help="Template/answer-key modes: learn bubble centers in this many parallel "
+        "page bands (default: 1). Only clean scans gain: when printed frames cross "
+        "a band edge, as on photos, the whole page is searched again",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=None,
+        help="Fixed filled/empty cutoff; default calibrates it per sheet",
+    )
+    parser.add_argument(
+        "--refine-centers",
+        type=int,
+        default=0,
+        metavar="PX",
+        help="Snap each bubble center to the printed bubble within PX pixels before "
+        "scoring (for fixed --bubble-map templates on shifted scans; 0 = off)",
+    )
+    parser.add_argument(
+        "--refine-radius",
+        type=int,
+        default=DEFAULT_RADIUS,
+        metavar="PX",
+        help="With --refine-centers: printed bubble radius on the 2480x3508 template "
+        f"(default {DEFAULT_RADIUS})",
+    )
+    parser.add_argument(
+        "--max-rss-mb",
+        type=float,
+        default=None,
+        help="Batch mode: stop if the worker's resident memory exceeds this cap",
+    )
+    parser.add_argument(
+        "--journal",
+        help="Batch mode: SQLite journal of per-page progress; rerunning resumes from it",
+    )
+    parser.add_argument(
+        "--max-attempts",
+        type=int,
+        default=DEFAULT_MAX_ATTEMPTS,
+        help="Batch mode with --journal: attempts per failed page across reruns",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Batch mode: grade pages in this many worker processes",
+    )
+    parser.add_argument(
+        "--no-quality-gate",
+        action="store_true",
+        help="Grade student sheets even if the photo fails the quality pre-check",
+    )
+    parser.add_argument(
+        "--no-normalize",
+        action="store_true",
+        help="Skip background (lighting) normalization before scoring",
+    )
     parser.add_argument(
         "--api-base",
-        default="http://localhost:8080/api/v1/examiner",
+        default=DEFAULT_API_BASE,
         help="Base URL for backend examiner API",
     )
     parser.add_argument(
@@ -463,19 +1872,113 @@ def main() -> None:
     )
 
     args = parser.parse_args()
+    if args.mode not in ("regrade", "batch") and len(args.image) != 1:
+        parser.error(f"--mode {args.mode} takes exactly one --image")
 
     try:
         bubble_centers: Dict[int, Dict[str, Tuple[int, int]]] | None = None
+        fields: Dict[str, List[Dict[str, Tuple[int, int]]]] | None = None
         if args.bubble_map:
             with open(args.bubble_map, "r", encoding="utf-8") as f:
                 raw = json.load(f)
             if isinstance(raw, dict) and "bubbleCenters" in raw:
+                fields = _normalize_fields(raw.get("fields")) or None
                 raw = raw.get("bubbleCenters")
             bubble_centers = _normalize_bubble_centers(raw)
+        layouts = LayoutIndex(args.layout_index) if args.layout_index else None
+        results = (
+            ResultStore(args.result_cache, args.result_cache_size) if args.result_cache else None
+        )
+        scoring_config = load_scoring_config(args.scoring_config)
+
+        if args.mode == "regrade":
+            if not args.store or not args.answer_key_json:
+                raise ValueError("regrade mode requires --store and --answer-key-json")
+            with open(args.answer_key_json, "r", encoding="utf-8") as f:
+                answer_key = json.load(f)
+            store = ConfidenceStore(args.store)
+            results = [
+                regrade_student_omr(
+                    path,
+                    answer_key,
+                    store,
+                    model_path=args.model,
+                    bubble_centers=bubble_centers,
+                    selection_threshold=args.threshold,
+                    scoring_config=scoring_config,
+                )
+                for path in args.image
+            ]
+            print(json.dumps(results, indent=2))
+            return
 
+        if args.mode == "batch":
+            answer_key = None
+            if args.answer_key_json:
+                with open(args.answer_key_json, "r", encoding="utf-8") as f:
+                    answer_key = json.load(f)
+            batch_options = dict(
+                model_path=args.model,
+                bubble_centers=bubble_centers,
+                store=ConfidenceStore(args.store) if args.store else None,
+                selection_threshold=args.threshold,
+                normalize_lighting=not args.no_normalize,
+                quality_gate=not args.no_quality_gate,
+                max_rss_mb=args.max_rss_mb,
+                layouts=layouts,
+                fields=fields,
+                results=results,
+                journal=BatchJournal(args.journal, args.max_attempts) if args.journal else None,
+                refine=args.refine_centers,
+                refine_radius=args.refine_radius,
+            )
+            journal = batch_options["journal"]
+            pool = BufferPool()
+            if args.workers > 1:
+                entries = iter_batch_results_parallel(args.image, args.workers, **batch_options)
+            else:
+                entries = iter_batch_results(args.image, pool=pool, **batch_options)
+            summary: Dict = {"pages": 0, "errors": 0}
+            if results is not None:
+                summary["resultCache"] = {"hits": 0, "misses": 0}
+            worker_peaks: Dict[int, float | None] = {}
+            try:
+                for entry in entries:
+                    worker = entry.pop("_worker", None)
+                    if worker is not None:
+                        worker_peaks[worker[0]] = worker[1]
+                    cached = entry.pop("_cached", None)
+                    if cached is not None:
+                        summary["resultCache"]["hits" if cached else "misses"] += 1
+                    summary["pages"] += 1
+                    summary["errors"] += 1 if "error" in entry else 0
+                    if answer_key is not None and "studentAnswers" in entry:
+                        entry["evaluation"] = score_answers(
+                            answer_key, entry["studentAnswers"], scoring_config
+                        )
+                    print(json.dumps(entry), flush=True)
+            finally:
+                if journal is not None:
+                    summary["resumed"] = journal.resumed
+                    journal.close()
+                peak = peak_rss_mb()
+                summary["peakRssMb"] = round(peak, 1) if peak is not None else None
+                if worker_peaks:
+                    summary["workers"] = len(worker_peaks)
+                    summary["workerPeakRssMb"] = max(
+                        (p for p in worker_peaks.values() if p is not None), default=None
+                    )
+                else:
+                    summary["bufferPoolMb"] = round(pool.nbytes / (1024.0 * 1024.0), 1)
+                print(json.dumps(summary), file=sys.stderr)
+            return
+
+        image_path = args.image[0]
         if args.mode == "template":
-            aligned = load_and_align(args.image)
-            detected = learn_bubble_centers_from_image(aligned)
+            aligned = load_and_align(image_path)
+            detected = resolve_bubble_centers(
+                aligned, layouts=layouts, remember=True, bands=args.learn_bands
+            )
             if not detected:
                 raise ValueError(
                     "Failed to detect bubble centers from the provided OMR template"
@@ -485,12 +1988,31 @@ def main() -> None:
 
         if args.mode == "answer_key":
             answer_key = process_answer_key(
-                args.image, model_path=args.model, bubble_centers=bubble_centers
+                image_path,
+                model_path=args.model,
+                bubble_centers=bubble_centers,
+                threshold=args.threshold,
+                normalize_lighting=not args.no_normalize,
+                layouts=layouts,
+                learn_bands=args.learn_bands,
+                results=results,
+                refine=args.refine_centers,
+                refine_radius=args.refine_radius,
             )
             print(json.dumps(answer_key, indent=2))
         else:
             student_answers = process_student_omr(
-                args.image, model_path=args.model, bubble_centers=bubble_centers
+                image_path,
+                model_path=args.model,
+                bubble_centers=bubble_centers,
+                store=ConfidenceStore(args.store) if args.store else None,
+                selection_threshold=args.threshold,
+                normalize_lighting=not args.no_normalize,
+                quality_gate=not args.no_quality_gate,
+                layouts=layouts,
+                results=results,
+                refine=args.refine_centers,
+                refine_radius=args.refine_radius,
             )
             print(json.dumps(student_answers, indent=2))
 
@@ -498,6 +2020,12 @@ def main() -> None:
                 raise SystemExit(
                     "submission-id provided but answerKey loading is not implemented in this CLI."
                 )
+        if results is not None:
+            print(json.dumps({"resultCache": results.stats()}), file=sys.stderr)
+    except SheetQualityError as e:
+        # Exit code 3 plus a JSON reason lets the server ask for a re-upload.
+        print(json.dumps(e.to_json()), file=sys.stderr)
+        raise SystemExit(3)
     except Exception as e:
         raise SystemExit(str(e))
 
@@ -0,0 +1,182 @@
+"""Shared implementation of the `AI/OmrPredict/*/predict.py` scripts.
+
+ForStudent and ForInstructor used to carry their own copies of YOLO
+loading, per-row contour thresholding and answer shaping. Both now import
+these functions, and the answers are read by `omr_engine.OmrEngine` with a
+`YoloColumnLocator`: the YOLO boxes only say where the answer columns are,
+the rows and options are located inside each box, and the bubbles are
+scored by the same stage as every other grading path. `final_answers`
+keeps the scripts' output: one option letter per question, "0" when none
+is marked.
+
+`load_model` serves the column model exported by `omr_detector` (`.onnx`
+/ `.xml`, also picked up next to a `.pt` of the same name) without
+PyTorch; only a bare `.pt` still goes through ultralytics.
+
+`read_answers` grades a sheet straight from the model. It keeps one
+locator per model for the life of the process, so the detector runs only
+when a sheet no longer registers against the column boxes already found
+(`YoloColumnLocator`): a batch of one exam's sheets costs one detection.
+"""
+
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, List
+
+import cv2
+
+from omr_detector import ColumnDetector
+from omr_engine import COLUMN_ROWS, OmrEngine, YoloColumnLocator, column_boxes
+from omr_pipeline import TEMPLATE_HEIGHT, TEMPLATE_WIDTH
+
+SCORING_CONFIG_PATH = Path(__file__).with_name("neet_scoring.json")
+YOLO_CONFIDENCE = 0.6
+
+
+def runtime_model_path(model_path: str) -> str:
+    """`model_path`, or the model `omr_detector` exported next to it (`<stem>_int8.onnx`, `<stem>.onnx`)."""
+
+    path = Path(model_path)
+    if path.suffix.lower() != ".pt":
+        return model_path
+    for name in (f"{path.stem}_int8.onnx", f"{path.stem}.onnx"):
+        exported = path.with_name(name)
+        if exported.exists():
+            return str(exported)
+    return model_path
+
+
+def load_model(model_path: str) -> object:
+    """Column detector for `model_path`, preferring an exported `.onnx` / `.xml` model.
+
+    Exported models run on onnxruntime / OpenVINO (`omr_detector`), so
+    PyTorch is never imported; only a bare `.pt` loads ultralytics.
+    """
+
+    model_path = runtime_model_path(model_path)
+    if model_path.lower().endswith((".onnx", ".xml")):
+        return ColumnDetector(model_path, conf=YOLO_CONFIDENCE)
+    # ultralytics (PyTorch) takes seconds to import; only load it here.
+    from ultralytics import YOLO  # type: ignore
+
+    return YOLO(model_path)
+
+
+def _write_label(image_path: str, model: ColumnDetector, output_folder: str) -> None:
+    # Same file ultralytics' save_txt writes: `class cx cy w h` per box.
+    bgr = cv2.imread(image_path, cv2.IMREAD_COLOR)
+    if bgr is None:
+        raise ValueError(f"Cannot read image: {image_path}")
+    label_dir = Path(output_folder) / "results" / "labels"
+    label_dir.mkdir(parents=True, exist_ok=True)
+    lines = [f"{int(c)} {x:g} {y:g} {w:g} {h:g}" for c, x, y, w, h in model.detect(bgr)]
+    (label_dir / f"{Path(image_path).stem}.txt").write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def get_label(image_path: str, model: object, output_folder: str) -> str | None:
+    """Run the column detector on one sheet and return the label text it saved (`class cx cy w h` lines)."""
+
+    folder_path = "predict"
+    if os.path.exists(folder_path):
+        try:
+            shutil.rmtree(folder_path)
+            print(f"Folder '{folder_path}' and all its contents have been deleted.")
+        except OSError as e:
+            print(f"Error: {e.strerror}")
+    else:
+        print(f"Folder '{folder_path}' does not exist.")
+
+    if isinstance(model, ColumnDetector):
+        _write_label(image_path, model, output_folder)
+    else:
+        model.predict(  # type: ignore[attr-defined]
+            image_path,
+            conf=YOLO_CONFIDENCE,
+            save=True,
+            save_txt=True,
+            project=output_folder,
+            name="results",
+            exist_ok=True,
+        )
+
+    saved_labels = list((Path(output_folder) / "results" / "labels").glob("*.txt"))
+    if not saved_labels:
+        print("No label files found.")
+        return None
+    with open(saved_labels[0], "r") as f:
+        return f.read()
+
+
+# One engine (and so one box cache) per column model path.
+_engines: Dict[str, OmrEngine] = {}
+
+
+def _answers(engine: OmrEngine, image_path: str, detections: List[Dict] | None) -> List[str]:
+    answers = sorted(engine.grade_path(image_path)["studentAnswers"], key=lambda a: a["questionNumber"])
+    if detections is not None:
+        boxes = column_boxes(engine.locator.boxes, (TEMPLATE_WIDTH, TEMPLATE_HEIGHT))
+        for c, box in enumerate(boxes):
+            column = answers[c * COLUMN_ROWS : (c + 1) * COLUMN_ROWS]
+            detections.append(
+                {
+                    "box": box,
+                    "answers": [
+                        (int(a["centerX"]), int(a["centerY"]), a["selectedOption"]) for a in column
+                    ],
+                }
+            )
+    return [a["selectedOption"] or "0" for a in answers]
+
+
+def final_answers(image_path: str, data_str: str, detections: List[Dict] | None = None) -> List[str]:
+    """Marked option of every question, column by column ("0" if none).
+
+    `data_str` is the YOLO label text from `get_label`. Pass a list as
+    `detections` to keep, per column, its box and the center and selection
+    of each question on the aligned page, for drawing an overlay.
+    """
+
+    engine = OmrEngine(YoloColumnLocator(labels=data_str), quality_gate=False)
+    return _answers(engine, image_path, detections)
+
+
+def read_answers(image_path: str, model_path: str, detections: List[Dict] | None = None) -> List[str]:
+    """`final_answers` with the columns found by the model at `model_path`, reusing its boxes across calls."""
+
+    engine = _engines.get(model_path)
+    if engine is None:
+        locator = YoloColumnLocator(model_path=runtime_model_path(model_path), conf=YOLO_CONFIDENCE)
+        engine = _engines[model_path] = OmrEngine(locator, quality_gate=False)
+    return _answers(engine, image_path, detections)
+
+
+def load_sections(path: str | Path = SCORING_CONFIG_PATH) -> List[Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["sections"]
+
+
+def show_score_for_each_subject(
+    result: List[str], sections: List[Dict] | None = None, echo: bool = True
+) -> Dict:
+    """Answers grouped by subject (`neet_scoring.json` ranges); `echo` prints each non-empty subject."""
+
+    if sections is None:
+        sections = load_sections()
+    subjects: Dict[str, Dict[int, str]] = {s["name"]: {} for s in sections}
+    subjects.setdefault("General", {})
+
+    for k, v in enumerate(result):
+        q = k + 1
+        name = next(
+            (sec["name"] for sec in sections if sec["startQuestion"] <= q <= sec["endQuestion"]),
+            "General",
+        )
+        subjects[name][q] = v
+
+    for name, answers in subjects.items():
+        if echo and answers:
+            print(f"{name} {answers}")
+
+    return subjects
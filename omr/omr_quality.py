@@ -0,0 +1,145 @@
+"""Cheap pre-check that rejects unusable sheet photos before grading.
+
+`assess_quality` works on a 1/4-scale copy of the page (620x877 for the
+default template), so it costs a few milliseconds, mostly the downscale.
+It measures:
+- sharpness: variance of the Laplacian (blurred photos score low);
+- exposure: mean brightness, clipped-white fraction and 1-99 percentile
+  contrast;
+- page coverage: share of the frame covered by the largest bright
+  (paper) region;
+- template match: when bubble centers are known, the share of bubbles
+  whose center is darker than the paper half an option-spacing to the
+  right. On an aligned sheet every printed bubble passes; on a shifted or
+  foreign layout about half or fewer do.
+
+The first failing check becomes the machine-readable `reason`.
+"""
+
+from typing import Dict, Tuple
+
+import cv2
+import numpy as np
+
+QUALITY_SCALE = 4
+
+MIN_SHARPNESS = 100.0
+MIN_MEAN_BRIGHTNESS = 50.0
+MAX_CLIPPED_FRACTION = 0.9
+MIN_CONTRAST = 50.0
+MIN_PAGE_COVERAGE = 0.5
+MIN_TEMPLATE_MATCH = 0.6
+
+REASON_MESSAGES = {
+    "blurry": "The photo is too blurry to read the bubbles. Retake it with the sheet in focus.",
+    "underexposed": "The photo is too dark. Retake it in better light.",
+    "overexposed": "The photo is washed out. Avoid direct light or flash on the sheet.",
+    "low_contrast": "The photo has almost no contrast. Make sure the whole sheet is visible.",
+    "page_not_found": "The OMR sheet does not fill the photo. Capture the whole sheet, edge to edge.",
+    "template_mismatch": "The sheet does not match the exam's OMR template.",
+}
+
+
+class SheetQualityError(ValueError):
+    """Raised when a sheet fails the quality gate; `reason` is machine-readable."""
+
+    def __init__(self, reason: str, metrics: Dict[str, float]) -> None:
+        super().__init__(REASON_MESSAGES.get(reason, reason))
+        self.reason = reason
+        self.metrics = metrics
+
+    def to_json(self) -> Dict:
+        return {
+            "error": "quality_gate",
+            "reason": self.reason,
+            "message": str(self),
+            "metrics": self.metrics,
+        }
+
+
+def template_match(
+    small: np.ndarray,
+    bubble_centers: Dict[int, Dict[str, Tuple[int, int]]],
+    scale: float,
+) -> float:
+    """Share of bubbles darker than the paper beside them in `small`.
+
+    `small` is the aligned page downscaled by `scale`; centers are in
+    template coordinates.
+    """
+
+    xs: list = []
+    ys: list = []
+    offsets: list = []
+    for options in bubble_centers.values():
+        opt_x = sorted(float(pt[0]) for pt in options.values())
+        half_step = float(np.median(np.diff(opt_x))) / 2.0 if len(opt_x) > 1 else 10.0
+        for x, y in options.values():
+            xs.append(float(x) / scale)
+            ys.append(float(y) / scale)
+            offsets.append(half_step / scale)
+    if not xs:
+        return 0.0
+
+    h, w = small.shape[:2]
+    # 3x3 box mean so a single noisy pixel does not decide a bubble.
+    smooth = cv2.blur(small, (3, 3))
+    px = np.asarray(xs)
+    py = np.clip(np.round(np.asarray(ys)).astype(np.int64), 0, h - 1)
+    on_x = np.clip(np.round(px).astype(np.int64), 0, w - 1)
+    off_x = np.clip(np.round(px + np.asarray(offsets)).astype(np.int64), 0, w - 1)
+    on = smooth[py, on_x].astype(np.float32)
+    off = smooth[py, off_x].astype(np.float32)
+    return float(np.mean(on < off))
+
+
+def assess_quality(
+    gray: np.ndarray,
+    bubble_centers: Dict[int, Dict[str, Tuple[int, int]]] | None = None,
+    template_size: Tuple[int, int] = (2480, 3508),
+) -> Dict:
+    """Score a full-resolution grayscale sheet.
+
+    Returns {"ok", "reason", "metrics"}; `bubble_centers` are in template
+    coordinates (`template_size` is the aligned width/height).
+    """
+
+    tw, th = template_size
+    small = cv2.resize(
+        gray, (tw // QUALITY_SCALE, th // QUALITY_SCALE), interpolation=cv2.INTER_AREA
+    )
+
+    sharpness = float(cv2.Laplacian(small, cv2.CV_64F).var())
+    mean = float(small.mean())
+    clipped = float(np.count_nonzero(small >= 250)) / float(small.size)
+    p1, p99 = np.percentile(small, (1, 99))
+    contrast = float(p99 - p1)
+
+    blur = cv2.GaussianBlur(small, (5, 5), 0)
+    _, paper = cv2.threshold(blur, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    contours, _ = cv2.findContours(paper, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    largest = max((cv2.contourArea(c) for c in contours), default=0.0)
+    coverage = float(largest) / float(small.size)
+
+    metrics: Dict[str, float] = {
+        "sharpness": round(sharpness, 2),
+        "meanBrightness": round(mean, 2),
+        "clippedFraction": round(clipped, 4),
+        "contrast": round(contrast, 2),
+        "pageCoverage": round(coverage, 4),
+    }
+
+    checks = [
+        ("blurry", sharpness < MIN_SHARPNESS),
+        ("underexposed", mean < MIN_MEAN_BRIGHTNESS),
+        ("overexposed", clipped > MAX_CLIPPED_FRACTION),
+        ("low_contrast", contrast < MIN_CONTRAST),
+        ("page_not_found", coverage < MIN_PAGE_COVERAGE),
+    ]
+    if bubble_centers:
+        match = template_match(small, bubble_centers, float(QUALITY_SCALE))
+        metrics["templateMatch"] = round(match, 4)
+        checks.append(("template_mismatch", match < MIN_TEMPLATE_MATCH))
+
+    reason = next((name for name, failed in checks if failed), None)
+    return {"ok": reason is None, "reason": reason, "metrics": metrics}
@@ -0,0 +1,103 @@
+"""Local re-centering of fixed bubble centers before scoring.
+
+`load_and_align` only resizes the page, so centers from `BUBBLE_CENTERS`,
+a `--bubble-map` or a stored layout drift by a few pixels on real scans.
+`refine_centers` moves every bubble to the best match of a printed
+bubble within `search` pixels of its template position, for all bubbles
+in one vectorized pass:
+
+- one (N, W, W) stack of windows is gathered around the centers, where
+  W = kernel size + 2 * search;
+- the stack is laid out as one tall (N * W, W) image and a single
+  `cv2.filter2D` with a zero-mean ring kernel scores every candidate
+  position of every bubble (a matched filter: dark ring, light surround;
+  the inside is ignored, so empty and filled bubbles respond alike).
+  Rows that straddle two windows fall outside the kept (2s+1, 2s+1)
+  block of each window;
+- each center snaps to its highest response.
+
+Bubbles without a clear ring (faint print, a neighbour's mark in the
+window) take the median shift of the sheet instead, since real drift is
+smooth across the page.
+"""
+
+from typing import Tuple
+
+import cv2
+import numpy as np
+
+DEFAULT_SEARCH = 6
+# Printed bubble radius on the 2480x3508 template (cf. `omr_synth.BUBBLE_RADIUS`).
+DEFAULT_RADIUS = 14
+# A bubble whose best response is below this fraction of the sheet's
+# median best response is treated as not found.
+MIN_RELATIVE_RESPONSE = 0.5
+
+
+def ring_kernel(radius: int = DEFAULT_RADIUS) -> np.ndarray:
+    """Zero-mean matched filter for a dark ring of `radius` on light paper.
+
+    +1 on the ring band (radius +- 2), balanced negative weight on the
+    surround just outside it (up to radius + 5), 0 inside.
+    """
+
+    outer = radius + 5
+    yy, xx = np.mgrid[-outer : outer + 1, -outer : outer + 1]
+    r = np.sqrt(xx * xx + yy * yy)
+    ring = np.abs(r - radius) <= 2.0
+    surround = (r > radius + 2.0) & (r <= outer)
+    kernel = np.zeros(r.shape, dtype=np.float32)
+    kernel[ring] = 1.0
+    kernel[surround] = -float(ring.sum()) / float(surround.sum())
+    return kernel
+
+
+def refine_centers(
+    gray: np.ndarray,
+    centers_xy: np.ndarray,
+    search: int = DEFAULT_SEARCH,
+    radius: int = DEFAULT_RADIUS,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Snap (N, 2) centers to the nearby bubble ring in `gray` (uint8).
+
+    Returns `(refined_xy, shifts)`, both (N, 2) int64. Windows crossing
+    the image border are clamped to it.
+    """
+
+    xy = np.asarray(centers_xy, dtype=np.int64).reshape(-1, 2)
+    n = int(xy.shape[0])
+    if n == 0 or search <= 0:
+        return xy.copy(), np.zeros_like(xy)
+
+    kernel = ring_kernel(radius)
+    k = kernel.shape[0]
+    half = k // 2 + search
+    size = 2 * half + 1
+    h, w = gray.shape[:2]
+
+    offsets = np.arange(-half, half + 1, dtype=np.int64)
+    rows = np.clip(xy[:, 1, None] + offsets, 0, h - 1)
+    cols = np.clip(xy[:, 0, None] + offsets, 0, w - 1)
+    # Ink is dark: invert so the ring scores high.
+    windows = 255.0 - gray[rows[:, :, None], cols[:, None, :]].astype(np.float32)  # (N, size, size)
+
+    # With anchor (0, 0), out[y, x] correlates the kernel with the window
+    # whose top-left corner is (y, x), i.e. a center shifted by (x, y) - search.
+    span = 2 * search + 1
+    response = cv2.filter2D(
+        windows.reshape(n * size, size), -1, kernel, anchor=(0, 0), borderType=cv2.BORDER_CONSTANT
+    ).reshape(n, size, size)[:, :span, :span]
+    flat = np.ascontiguousarray(response).reshape(n, span * span)
+    best = flat.argmax(axis=1)
+    best_response = flat[np.arange(n), best]
+    shifts = np.stack([best % span, best // span], axis=1).astype(np.int64) - search
+
+    found = best_response > 0
+    if found.any():
+        found &= best_response >= MIN_RELATIVE_RESPONSE * float(np.median(best_response[found]))
+    if found.any() and not found.all():
+        shifts[~found] = np.round(np.median(shifts[found], axis=0)).astype(np.int64)
+    elif not found.any():
+        shifts[:] = 0
+
+    return xy + shifts, shifts
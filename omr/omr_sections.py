@@ -0,0 +1,162 @@
+"""Section-aware NEET scoring, shared with the Node backend.
+
+The default marking scheme and subject ranges live in `neet_scoring.json`,
+which `server/utils/neetOmrEvaluator.js` loads too, so Python and Node
+report the same sections. `evaluate_omr` returns the same object as the
+backend's `evaluateOmr` (per-subject marks, `sectionMarks`,
+`wrongQuestions`, ...). Per-section counts come from a single `bincount`
+over (section, outcome) pairs rather than a branch per question.
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+DEFAULT_CONFIG_PATH = Path(__file__).with_name("neet_scoring.json")
+
+GENERAL = "General"
+CORRECT, INCORRECT, UNATTEMPTED = 0, 1, 2
+
+_default_config: Dict | None = None
+
+
+def default_scoring_config() -> Dict:
+    global _default_config
+    if _default_config is None:
+        with open(DEFAULT_CONFIG_PATH, "r", encoding="utf-8") as f:
+            _default_config = json.load(f)
+    return _default_config
+
+
+def _number(value: object, fallback: float) -> float:
+    try:
+        n = float(value)  # type: ignore[arg-type]
+    except (TypeError, ValueError):
+        return fallback
+    return n if np.isfinite(n) else fallback
+
+
+def normalize_scoring_config(scoring_config: Dict | None = None) -> Dict:
+    """Fill missing fields from the shared defaults, like `normalizeScoringConfig` in Node."""
+
+    defaults = default_scoring_config()
+    cfg = scoring_config if isinstance(scoring_config, dict) else {}
+    sections = cfg.get("sections")
+    if not isinstance(sections, list) or not sections:
+        sections = defaults["sections"]
+
+    normalized = {"sections": sections}
+    for key in ("marksPerCorrect", "marksPerWrong", "marksPerUnattempted", "totalQuestions", "totalMarks"):
+        value = _number(cfg.get(key), defaults[key])
+        normalized[key] = int(value) if float(value).is_integer() else value
+    return normalized
+
+
+def _section_name(section: Dict) -> str:
+    name = section.get("name")
+    return str(name) if name is not None and str(name) else GENERAL
+
+
+def section_indices(questions: np.ndarray, sections: List[Dict], names: List[str]) -> np.ndarray:
+    """Index into `names` of the first section containing each question (else General)."""
+
+    idx = np.full(questions.shape, names.index(GENERAL), dtype=np.int64)
+    assigned = np.zeros(questions.shape, dtype=bool)
+    for section in sections:
+        start = _number(section.get("startQuestion"), np.nan)
+        end = _number(section.get("endQuestion"), np.nan)
+        if not (np.isfinite(start) and np.isfinite(end)):
+            continue
+        hit = ~assigned & (questions >= start) & (questions <= end)
+        idx[hit] = names.index(_section_name(section))
+        assigned |= hit
+    return idx
+
+
+def evaluate_omr(
+    answer_key: List[Dict],
+    student_answers: List[Dict],
+    scoring_config: Dict | None = None,
+) -> Dict:
+    cfg = normalize_scoring_config(scoring_config)
+    sections = cfg["sections"]
+
+    key: Dict[int, str] = {}
+    for item in answer_key or []:
+        try:
+            q = int(item.get("questionNumber"))
+        except (TypeError, ValueError):
+            continue
+        if item.get("correctOption") is not None and str(item["correctOption"]):
+            key[q] = str(item["correctOption"]).upper()
+
+    selected: Dict[int, str] = {}
+    for item in student_answers or []:
+        try:
+            q = int(item.get("questionNumber"))
+        except (TypeError, ValueError):
+            continue
+        opt = item.get("selectedOption")
+        selected[q] = str(opt).upper() if opt is not None else ""
+
+    questions = np.fromiter(key.keys(), dtype=np.int64, count=len(key))
+    correct_opts = np.array(list(key.values()), dtype=np.str_)
+    chosen = np.array([selected.get(int(q), "") for q in questions], dtype=np.str_)
+
+    outcome = np.where(
+        chosen == "", UNATTEMPTED, np.where(chosen == correct_opts, CORRECT, INCORRECT)
+    )
+    names = list(dict.fromkeys([_section_name(s) for s in sections] + [GENERAL]))
+    sec = section_indices(questions, sections, names)
+
+    counts = np.bincount(sec * 3 + outcome, minlength=len(names) * 3).reshape(len(names), 3)
+    weights = np.array(
+        [cfg["marksPerCorrect"], cfg["marksPerWrong"], cfg["marksPerUnattempted"]]
+    )
+    marks = (counts * weights).sum(axis=1).tolist()
+    counts_list = counts.tolist()
+
+    def stats(name: str) -> Dict:
+        i = names.index(name)
+        return {
+            "marks": marks[i],
+            "correctCount": counts_list[i][CORRECT],
+            "incorrectCount": counts_list[i][INCORRECT],
+            "unattemptedCount": counts_list[i][UNATTEMPTED],
+        }
+
+    wrong = np.flatnonzero(outcome == INCORRECT)
+    totals = counts.sum(axis=0).tolist()
+    return {
+        "physicsMarks": stats("Physics")["marks"] if "Physics" in names else 0,
+        "chemistryMarks": stats("Chemistry")["marks"] if "Chemistry" in names else 0,
+        "biologyMarks": stats("Biology")["marks"] if "Biology" in names else 0,
+        "totalMarks": sum(marks),
+        "totalPossibleMarks": len(key) * cfg["marksPerCorrect"],
+        "correctCount": totals[CORRECT],
+        "incorrectCount": totals[INCORRECT],
+        "unattemptedCount": totals[UNATTEMPTED],
+        "wrongQuestions": [
+            {
+                "questionNumber": int(questions[i]),
+                "subject": names[sec[i]],
+                "selectedOption": str(chosen[i]),
+                "correctOption": str(correct_opts[i]),
+            }
+            for i in wrong
+        ],
+        "sectionMarks": [
+            dict(name=_section_name(s), **stats(_section_name(s))) for s in sections
+        ],
+    }
+
+
+def load_scoring_config(path: str | None) -> Dict | None:
+    """Read a per-exam `scoringConfig` JSON file (None keeps the shared default)."""
+
+    if not path:
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
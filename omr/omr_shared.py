@@ -0,0 +1,47 @@
+"""Read-only arrays shared between batch worker processes.
+
+The parent publishes the compiled template (bubble centers and patch
+indices) once as `.npy` files in a private temp directory; each worker
+maps them with `np.load(mmap_mode="r")`. All workers then read the same
+page-cache pages instead of holding their own copy, and the mapping works
+the same with the `fork` and `spawn` start methods. Only the directory
+path crosses the process boundary.
+"""
+
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+
+
+class SharedArrays:
+    def __init__(self, directory: str | Path, owner: bool = False) -> None:
+        self.directory = Path(directory)
+        self.owner = owner
+
+    @classmethod
+    def publish(cls, arrays: Dict[str, np.ndarray], prefix: str = "omr-shared-") -> "SharedArrays":
+        directory = tempfile.mkdtemp(prefix=prefix)
+        for name, arr in arrays.items():
+            np.save(Path(directory) / f"{name}.npy", np.ascontiguousarray(arr))
+        return cls(directory, owner=True)
+
+    def load(self) -> Dict[str, np.ndarray]:
+        """Map every published array read-only."""
+
+        return {
+            path.stem: np.load(path, mmap_mode="r")
+            for path in sorted(self.directory.glob("*.npy"))
+        }
+
+    def cleanup(self) -> None:
+        if self.owner:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __enter__(self) -> "SharedArrays":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.cleanup()
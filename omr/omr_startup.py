@@ -0,0 +1,147 @@
+"""Cold-start import benchmark for the OMR entry points.
+
+The server still launches a fresh interpreter per grading job, so import
+time is paid on every sheet. This runs each entry point's module body in
+a new interpreter under `python -X importtime` (the `__main__` block is
+not executed) and reports the cumulative import time of the modules it
+pulls in, median of `--repeat` runs:
+
+    python omr/omr_startup.py                  # exit 1 if over budget
+    python omr/omr_startup.py --budget-ms 200 --top 5
+
+An entry point fails if its median exceeds `--budget-ms` or if it
+imports any of `HEAVY_MODULES` at startup; those (ML frameworks,
+plotting, the HTTP client) must only be imported where they are used.
+Interpreter startup itself (`site`, encodings) is not counted.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+ENTRY_POINTS = {
+    "omr_pipeline": REPO_ROOT / "omr" / "omr_pipeline.py",
+    "omr_engine": REPO_ROOT / "omr" / "omr_engine.py",
+    "omr_call_backend": REPO_ROOT / "omr" / "omr_call_backend.py",
+    "predict_student": REPO_ROOT / "AI" / "OmrPredict" / "ForStudent" / "predict.py",
+    "predict_instructor": REPO_ROOT / "AI" / "OmrPredict" / "ForInstructor" / "predict.py",
+}
+HEAVY_MODULES = (
+    "tensorflow",
+    "torch",
+    "ultralytics",
+    "matplotlib",
+    "requests",
+    "onnxruntime",
+    "openvino",
+)
+DEFAULT_BUDGET_MS = 250.0
+MARKER = "--omr-startup--"
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """`(module, self_us, cumulative_us)` for top-level imports after the marker."""
+
+    lines = stderr.splitlines()
+    if MARKER in lines:
+        lines = lines[lines.index(MARKER) + 1 :]
+    imports: List[Tuple[str, int, int]] = []
+    for line in lines:
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:") :].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # header line
+        name = parts[2]
+        # Nested imports are indented two spaces per level after the bar.
+        if name.startswith("  "):
+            continue
+        imports.append((name.strip(), int(parts[0]), int(parts[1])))
+    return imports
+
+
+def _loaded_modules(stderr: str) -> List[str]:
+    names = []
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            name = line.rsplit("|", 1)[1].strip()
+            if name and name != "imported package":
+                names.append(name)
+    return names
+
+
+def measure(path: Path) -> Tuple[float, List[Tuple[str, int, int]], List[str]]:
+    """Import time (ms) of one fresh run, its top-level imports and all loaded module names."""
+
+    code = (
+        "import runpy, sys\n"
+        f"sys.path.insert(0, {str(path.parent)!r})\n"
+        f"sys.stderr.write({MARKER!r} + '\\n')\n"
+        f"runpy.run_path({str(path)!r}, run_name='__omr_startup__')\n"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=str(path.parent),
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        tail = proc.stderr.strip().splitlines()[-1:] or ["failed"]
+        raise ValueError(f"{path.name}: {tail[0]}")
+    imports = parse_importtime(proc.stderr)
+    return sum(c for _, _, c in imports) / 1000.0, imports, _loaded_modules(proc.stderr)
+
+
+def benchmark(
+    entry_points: Dict[str, Path],
+    repeat: int = 5,
+    budget_ms: float = DEFAULT_BUDGET_MS,
+    top: int = 5,
+) -> Dict:
+    results: Dict[str, Dict] = {}
+    for name, path in entry_points.items():
+        runs = [measure(path) for _ in range(max(1, repeat))]
+        totals = [r[0] for r in runs]
+        median = statistics.median(totals)
+        # Slowest imports of the run closest to the median.
+        _, imports, loaded = min(runs, key=lambda r: abs(r[0] - median))
+        roots = {m.split(".")[0] for m in loaded}
+        heavy = sorted(m for m in HEAVY_MODULES if m in roots)
+        results[name] = {
+            "importMs": round(median, 1),
+            "minMs": round(min(totals), 1),
+            "slowest": [
+                {"module": m, "ms": round(c / 1000.0, 1)}
+                for m, _, c in sorted(imports, key=lambda i: -i[2])[:top]
+            ],
+            "heavyImports": heavy,
+            "ok": median <= budget_ms and not heavy,
+        }
+    return {"budgetMs": budget_ms, "entryPoints": results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Cold-start import benchmark for OMR entry points")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5, help="Slowest imports to list per entry point")
+    parser.add_argument("--entry", nargs="+", choices=sorted(ENTRY_POINTS), help="Subset of entry points")
+    args = parser.parse_args()
+
+    try:
+        selected = {k: ENTRY_POINTS[k] for k in (args.entry or ENTRY_POINTS)}
+        report = benchmark(selected, args.repeat, args.budget_ms, args.top)
+        print(json.dumps(report, indent=2))
+        if not all(r["ok"] for r in report["entryPoints"].values()):
+            raise SystemExit(1)
+    except ValueError as e:
+        raise SystemExit(str(e))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
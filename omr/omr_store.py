@@ -0,0 +1,248 @@
+"""On-disk store of per-sheet bubble confidences.
+
+Bubble confidences depend only on the sheet image, the bubble template and
+the classifier, never on the answer key. `ConfidenceStore` keeps the raw
+arrays produced by `omr_pipeline.score_bubbles` so a corrected key can be
+re-applied (`omr_pipeline.py --mode regrade`) without decoding images again.
+
+Layout: `{root}/{image_hash[:2]}/{image_hash}-{template_hash}.npz` with
+arrays `question` (int32), `option` (unicode), `x`, `y` (int32) and
+`prob` (float32), one entry per bubble.
+
+`ResultStore` keeps the finished answer JSON of whole sheets, keyed by
+the image bytes, the template, the classifier and the grading options, so
+a re-uploaded or forwarded copy of a sheet is answered without grading.
+It is bounded: each of its 256 shards keeps only its most recently used
+entries.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+BubbleMeta = List[Tuple[int, str, int, int]]
+
+_CHUNK = 1 << 20
+DEFAULT_MAX_RESULTS = 4096
+# Per-store record of which classifier files loaded (see ResultStore).
+CLASSIFIERS_FILE = "classifiers.json"
+
+
+def file_sha256(path: str | Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_CHUNK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def page_hash(file_hash: str, page_index: int) -> str:
+    """Key for one page of a (possibly multi-page) source file.
+
+    Page 0 keeps the file hash so single-image sheets match `file_sha256`.
+    """
+
+    if page_index == 0:
+        return file_hash
+    return hashlib.sha256(f"{file_hash}:{page_index}".encode("ascii")).hexdigest()
+
+
+def template_hash(
+    bubble_centers: Dict[int, Dict[str, Tuple[int, int]]],
+    classifier_version: str = "",
+) -> str:
+    """Stable short hash of a bubble map plus the classifier that scored it."""
+
+    canonical = {
+        str(q): {str(opt): [int(pt[0]), int(pt[1])] for opt, pt in sorted(opts.items())}
+        for q, opts in sorted(bubble_centers.items(), key=lambda kv: int(kv[0]))
+    }
+    payload = json.dumps(
+        {"centers": canonical, "classifier": classifier_version},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class ConfidenceStore:
+    def __init__(self, root: str | Path) -> None:
+        self.root = Path(root)
+
+    def _path(self, image_hash: str, tmpl_hash: str) -> Path:
+        return self.root / image_hash[:2] / f"{image_hash}-{tmpl_hash}.npz"
+
+    def save(self, image_hash: str, tmpl_hash: str, meta: BubbleMeta, probs: np.ndarray) -> Path:
+        path = self._path(image_hash, tmpl_hash)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        arrays = {
+            "question": np.array([m[0] for m in meta], dtype=np.int32),
+            "option": np.array([m[1] for m in meta], dtype=np.str_),
+            "x": np.array([m[2] for m in meta], dtype=np.int32),
+            "y": np.array([m[3] for m in meta], dtype=np.int32),
+            "prob": np.asarray(probs, dtype=np.float32).reshape(-1),
+        }
+
+        # Write to a temp file and rename so readers never see a partial entry.
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, **arrays)
+            os.replace(tmp, path)
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        return path
+
+    def _read(self, path: Path) -> Tuple[BubbleMeta, np.ndarray]:
+        with np.load(path, allow_pickle=False) as data:
+            meta = [
+                (int(q), str(opt), int(x), int(y))
+                for q, opt, x, y in zip(data["question"], data["option"], data["x"], data["y"])
+            ]
+            probs = np.array(data["prob"], dtype=np.float32)
+        return meta, probs
+
+    def load(self, image_hash: str, tmpl_hash: str) -> Tuple[BubbleMeta, np.ndarray] | None:
+        path = self._path(image_hash, tmpl_hash)
+        if not path.exists():
+            return None
+        return self._read(path)
+
+    def load_any(self, image_hash: str) -> Tuple[BubbleMeta, np.ndarray] | None:
+        """Load the entry for `image_hash` when the template is not known.
+
+        Raises ValueError if the sheet was stored under more than one template.
+        """
+
+        matches = sorted((self.root / image_hash[:2]).glob(f"{image_hash}-*.npz"))
+        if not matches:
+            return None
+        if len(matches) > 1:
+            raise ValueError(
+                f"Sheet {image_hash[:12]} is stored under {len(matches)} templates; "
+                "pass --bubble-map to pick one"
+            )
+        return self._read(matches[0])
+
+
+class ResultStore:
+    """Bounded on-disk store of whole-sheet results.
+
+    Layout: `{root}/{key[:2]}/{key}.json`. A hit refreshes the entry's
+    mtime; writing to a full shard drops its least recently used entries,
+    so the store holds about `max_entries` results. `hits` and `misses`
+    count lookups made through this instance. `{root}/classifiers.json`
+    records whether each classifier file loaded, so a key can name the
+    classifier without loading it.
+    """
+
+    def __init__(self, root: str | Path, max_entries: int = DEFAULT_MAX_RESULTS) -> None:
+        self.root = Path(root)
+        self.max_entries = int(max_entries)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(image_hash: str, tmpl_hash: str, **options: object) -> str:
+        """Key for one sheet graded against `tmpl_hash` with the given options."""
+
+        payload = json.dumps(
+            {"image": image_hash, "template": tmpl_hash, "options": options},
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> object | None:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                result = json.load(f)["result"]
+        except (OSError, ValueError, KeyError):
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass  # evicted by another process in between
+        self.hits += 1
+        return result
+
+    def put(self, key: str, result: object) -> Path:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"result": result}, f)
+            os.replace(tmp, path)
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self._evict(path.parent)
+        return path
+
+    def classifier_loaded(self, identity: str) -> bool | None:
+        """Whether the classifier file `identity` loaded when it last graded into this store (None if unknown)."""
+
+        try:
+            with open(self.root / CLASSIFIERS_FILE, "r", encoding="utf-8") as f:
+                loaded = json.load(f).get(identity)
+        except (OSError, ValueError, AttributeError):
+            return None
+        return loaded if isinstance(loaded, bool) else None
+
+    def record_classifier(self, identity: str, loaded: bool) -> None:
+        """Remember whether the classifier file `identity` loaded (see `classifier_loaded`)."""
+
+        path = self.root / CLASSIFIERS_FILE
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                records = json.load(f)
+        except (OSError, ValueError):
+            records = {}
+        if not isinstance(records, dict):
+            records = {}
+        if records.get(identity) is loaded:
+            return
+        records[identity] = loaded
+        self.root.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(records, f)
+            os.replace(tmp, path)
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def _evict(self, shard: Path) -> None:
+        limit = max(1, -(-self.max_entries // 256))
+        entries = []
+        for entry in os.scandir(shard):
+            if entry.name.endswith(".json"):
+                try:
+                    entries.append((entry.stat().st_mtime_ns, entry.path))
+                except OSError:
+                    continue
+        for _, path in sorted(entries)[: max(0, len(entries) - limit)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
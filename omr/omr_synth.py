@@ -0,0 +1,394 @@
+"""Synthetic OMR sheets with known answers, for load and regression testing.
+
+The bundled sample photos are a few dozen, mostly duplicate images, which
+is too few to see how grading scales. This module renders any number of
+sheets from a bubble map, marks them randomly (or as given), optionally
+degrades them like a phone photo, and writes the ground truth next to
+them:
+
+    python omr/omr_synth.py --out synth --count 10000 --workers 8 \\
+        --noise 6 --blur 1.5 --rotate 1 --warp 0.01 --gradient 0.3
+
+    synth/bubble_map.json   `{"bubbleCenters", "fields"}` for --bubble-map
+    synth/truth.jsonl       one line per sheet: studentAnswers, fields and
+                            the distortion actually applied
+    synth/sheet_00000.png   ...
+
+Sheet `i` is drawn from a generator seeded with `(seed, i)`, so every sheet
+can be regenerated on its own. `--verify` grades the written sheets with
+`omr_pipeline` batch mode and reports accuracy against the truth and
+sheets/second, which is what the benchmark and regression runs consume.
+
+Degradations, applied in this order and each drawn uniformly up to the
+given strength: rotation (degrees), perspective warp (corner jitter as a
+fraction of the page size), lighting gradient (darkest edge at
+`1 - gradient` of full brightness), Gaussian blur (sigma) and sensor noise
+(standard deviation in grey levels).
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+import cv2
+import numpy as np
+
+from omr_pipeline import (
+    TEMPLATE_HEIGHT,
+    TEMPLATE_WIDTH,
+    _normalize_bubble_centers,
+    _normalize_fields,
+    iter_batch_results,
+    iter_batch_results_parallel,
+)
+
+BubbleCenters = Dict[int, Dict[str, Tuple[int, int]]]
+Fields = Dict[str, List[Dict[str, Tuple[int, int]]]]
+
+BUBBLE_RADIUS = 14
+PAPER = 245
+INK = 40
+
+# Default layout: 180 questions in 4 columns of 45, a roll-number block of
+# 8 digit columns and a one-column booklet code above the answer grid.
+DEFAULT_QUESTIONS = 180
+DEFAULT_COLUMNS = 4
+GRID_ORIGIN = (370, 1800)
+COLUMN_PITCH = 560
+OPTION_PITCH = 80
+ROW_PITCH = 36
+FIELD_ORIGIN = (300, 1100)
+FIELD_PITCH = 60
+
+
+def default_layout(
+    questions: int = DEFAULT_QUESTIONS,
+    columns: int = DEFAULT_COLUMNS,
+    options: str = "ABCD",
+    roll_digits: int = 8,
+) -> Tuple[BubbleCenters, Fields]:
+    """Bubble centers and roll-number / booklet-code fields on the template."""
+
+    rows = -(-questions // columns)
+    x0, y0 = GRID_ORIGIN
+    centers: BubbleCenters = {}
+    for q in range(1, questions + 1):
+        col, row = divmod(q - 1, rows)
+        y = y0 + row * ROW_PITCH
+        centers[q] = {
+            opt: (x0 + col * COLUMN_PITCH + i * OPTION_PITCH, y) for i, opt in enumerate(options)
+        }
+
+    fx, fy = FIELD_ORIGIN
+    fields: Fields = {
+        "rollNumber": [
+            {str(d): (fx + c * FIELD_PITCH, fy + d * FIELD_PITCH) for d in range(10)}
+            for c in range(roll_digits)
+        ],
+        "bookletCode": [
+            {opt: (fx + (roll_digits + 7) * FIELD_PITCH, fy + i * FIELD_PITCH) for i, opt in enumerate(options)}
+        ],
+    }
+    return centers, fields
+
+
+def random_marks(
+    bubble_centers: BubbleCenters,
+    rng: np.random.Generator,
+    blank_rate: float = 0.05,
+) -> Dict[int, str | None]:
+    """One option per question, or None for a left-blank question."""
+
+    marks: Dict[int, str | None] = {}
+    for q, opts in bubble_centers.items():
+        letters = sorted(opts)
+        marks[q] = None if rng.random() < blank_rate else letters[int(rng.integers(len(letters)))]
+    return marks
+
+
+def random_field_values(fields: Fields, rng: np.random.Generator) -> Dict[str, str]:
+    return {
+        name: "".join(sorted(col)[int(rng.integers(len(col)))] for col in columns)
+        for name, columns in fields.items()
+    }
+
+
+def _draw_bubble(img: np.ndarray, center: Tuple[int, int], label: str, filled: bool, ink: int) -> None:
+    cv2.circle(img, center, BUBBLE_RADIUS, INK, 2, lineType=cv2.LINE_AA)
+    if filled:
+        cv2.circle(img, center, BUBBLE_RADIUS - 2, ink, -1, lineType=cv2.LINE_AA)
+        return
+    # Printed option letter, as on real sheets.
+    (tw, th), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
+    origin = (center[0] - tw // 2, center[1] + th // 2)
+    cv2.putText(img, label, origin, cv2.FONT_HERSHEY_SIMPLEX, 0.5, INK, 1, cv2.LINE_AA)
+
+
+def render_sheet(
+    bubble_centers: BubbleCenters,
+    marks: Dict[int, str | None],
+    fields: Fields | None = None,
+    field_values: Dict[str, str] | None = None,
+    rng: np.random.Generator | None = None,
+    size: Tuple[int, int] = (TEMPLATE_WIDTH, TEMPLATE_HEIGHT),
+) -> np.ndarray:
+    """Clean grayscale sheet; filled bubbles vary in pencil darkness if `rng` is given."""
+
+    w, h = size
+    img = np.full((h, w), PAPER, dtype=np.uint8)
+
+    def ink() -> int:
+        return int(rng.integers(20, 90)) if rng is not None else INK
+
+    for q, opts in bubble_centers.items():
+        for opt, center in opts.items():
+            _draw_bubble(img, center, opt, marks.get(q) == opt, ink())
+    for name, columns in (fields or {}).items():
+        value = (field_values or {}).get(name, "")
+        for c, column in enumerate(columns):
+            for sym, center in column.items():
+                _draw_bubble(img, center, sym, c < len(value) and value[c] == sym, ink())
+    return img
+
+
+def distort(
+    img: np.ndarray,
+    rng: np.random.Generator,
+    noise: float = 0.0,
+    blur: float = 0.0,
+    rotate: float = 0.0,
+    warp: float = 0.0,
+    gradient: float = 0.0,
+) -> Tuple[np.ndarray, Dict[str, float]]:
+    """Degrade a clean sheet; returns the image and the parameters drawn."""
+
+    h, w = img.shape[:2]
+    applied: Dict[str, float] = {}
+    out = img
+
+    if rotate > 0:
+        angle = float(rng.uniform(-rotate, rotate))
+        m = cv2.getRotationMatrix2D((w / 2.0, h / 2.0), angle, 1.0)
+        out = cv2.warpAffine(out, m, (w, h), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+        applied["rotate"] = round(angle, 4)
+    if warp > 0:
+        src = np.float32([[0, 0], [w, 0], [w, h], [0, h]])
+        jitter = rng.uniform(-warp, warp, size=(4, 2)) * np.float32([w, h])
+        m = cv2.getPerspectiveTransform(src, (src + jitter).astype(np.float32))
+        out = cv2.warpPerspective(out, m, (w, h), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+        applied["warp"] = round(float(np.abs(jitter).max() / max(w, h)), 5)
+    if gradient > 0:
+        strength = float(rng.uniform(0.0, gradient))
+        theta = float(rng.uniform(0.0, 2.0 * np.pi))
+        # A linear ramp is a row term plus a column term; broadcast them
+        # instead of building full-page coordinate grids.
+        cols = np.linspace(0.0, np.cos(theta), w, dtype=np.float32)
+        rows = np.linspace(0.0, np.sin(theta), h, dtype=np.float32)
+        ramp = rows[:, None] + cols[None, :]
+        lo, hi = float(ramp.min()), float(ramp.max())
+        gain = 1.0 - strength * (ramp - lo) / max(hi - lo, 1e-6)
+        out = cv2.multiply(out, gain, dtype=cv2.CV_8U)
+        applied["gradient"] = round(strength, 4)
+    if blur > 0:
+        sigma = float(rng.uniform(0.0, blur))
+        if sigma > 0.1:
+            out = cv2.GaussianBlur(out, (0, 0), sigma)
+        applied["blur"] = round(sigma, 4)
+    if noise > 0:
+        std = float(rng.uniform(0.0, noise))
+        noisy = rng.standard_normal(size=out.shape, dtype=np.float32)
+        noisy *= std
+        out = cv2.add(out, noisy, dtype=cv2.CV_8U)
+        applied["noise"] = round(std, 4)
+    return out, applied
+
+
+def _sheet_rng(seed: int, index: int) -> np.random.Generator:
+    return np.random.default_rng([seed, index])
+
+
+def make_sheet(
+    index: int,
+    bubble_centers: BubbleCenters,
+    fields: Fields | None,
+    seed: int = 0,
+    blank_rate: float = 0.05,
+    distortion: Dict[str, float] | None = None,
+) -> Tuple[np.ndarray, Dict]:
+    """Render sheet `index` and its truth record."""
+
+    rng = _sheet_rng(seed, index)
+    marks = random_marks(bubble_centers, rng, blank_rate=blank_rate)
+    values = random_field_values(fields, rng) if fields else {}
+    img = render_sheet(bubble_centers, marks, fields, values, rng=rng)
+    img, applied = distort(img, rng, **(distortion or {}))
+    truth = {
+        "studentAnswers": [{"questionNumber": q, "selectedOption": opt} for q, opt in marks.items()],
+        "fields": values,
+        "distortion": applied,
+    }
+    return img, truth
+
+
+_worker_job: Dict = {}
+
+
+def _init_worker(job: Dict) -> None:
+    _worker_job.update(job)
+
+
+def _write_sheet(index: int) -> Dict:
+    job = _worker_job
+    img, truth = make_sheet(
+        index, job["centers"], job["fields"], job["seed"], job["blank_rate"], job["distortion"]
+    )
+    name = f"sheet_{index:05d}{job['ext']}"
+    if not cv2.imwrite(str(Path(job["out"]) / name), img):
+        raise ValueError(f"Cannot write {name}")
+    return dict(file=name, **truth)
+
+
+def generate(
+    out_dir: str | Path,
+    count: int,
+    bubble_centers: BubbleCenters | None = None,
+    fields: Fields | None = None,
+    seed: int = 0,
+    blank_rate: float = 0.05,
+    distortion: Dict[str, float] | None = None,
+    ext: str = ".png",
+    workers: int = 1,
+) -> Iterator[Dict]:
+    """Write `count` sheets, the bubble map and `truth.jsonl`; yields each truth record."""
+
+    if bubble_centers is None:
+        bubble_centers, default_fields = default_layout()
+        fields = default_fields if fields is None else fields
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    with open(out / "bubble_map.json", "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "bubbleCenters": {
+                    str(q): {o: list(pt) for o, pt in opts.items()} for q, opts in bubble_centers.items()
+                },
+                "fields": {
+                    name: [{s: list(pt) for s, pt in col.items()} for col in cols]
+                    for name, cols in (fields or {}).items()
+                },
+            },
+            f,
+        )
+
+    job = dict(
+        out=str(out), centers=bubble_centers, fields=fields, seed=seed,
+        blank_rate=blank_rate, distortion=distortion, ext=ext,
+    )
+    with open(out / "truth.jsonl", "w", encoding="utf-8") as truth_file:
+        if workers > 1:
+            with mp.Pool(workers, initializer=_init_worker, initargs=(job,)) as pool:
+                for record in pool.imap(_write_sheet, range(count), chunksize=4):
+                    truth_file.write(json.dumps(record) + "\n")
+                    yield record
+        else:
+            _init_worker(job)
+            for index in range(count):
+                record = _write_sheet(index)
+                truth_file.write(json.dumps(record) + "\n")
+                yield record
+
+
+def verify(out_dir: str | Path, workers: int = 1, quality_gate: bool = False) -> Dict:
+    """Grade generated sheets with their bubble map; accuracy and sheets/second."""
+
+    out = Path(out_dir)
+    with open(out / "bubble_map.json", "r", encoding="utf-8") as f:
+        raw = json.load(f)
+    options = dict(
+        bubble_centers=_normalize_bubble_centers(raw["bubbleCenters"]),
+        fields=_normalize_fields(raw.get("fields")) or None,
+        quality_gate=quality_gate,
+    )
+    with open(out / "truth.jsonl", "r", encoding="utf-8") as f:
+        truth = [json.loads(line) for line in f if line.strip()]
+    sources = [str(out / t["file"]) for t in truth]
+
+    start = time.perf_counter()
+    if workers > 1:
+        entries = list(iter_batch_results_parallel(sources, workers, **options))
+    else:
+        entries = list(iter_batch_results(sources, **options))
+    elapsed = time.perf_counter() - start
+
+    questions = correct = errors = fields_ok = 0
+    for entry, expected in zip(entries, truth):
+        if "error" in entry:
+            errors += 1
+            continue
+        got = {a["questionNumber"]: a["selectedOption"] for a in entry["studentAnswers"]}
+        for a in expected["studentAnswers"]:
+            questions += 1
+            correct += got.get(a["questionNumber"]) == a["selectedOption"]
+        decoded = {k: v["value"] for k, v in (entry.get("fields") or {}).items()}
+        fields_ok += decoded == expected["fields"]
+    graded = len(entries) - errors
+    return {
+        "sheets": len(entries),
+        "errors": errors,
+        "answerAccuracy": round(correct / questions, 5) if questions else None,
+        "fieldAccuracy": round(fields_ok / graded, 5) if graded else None,
+        "sheetsPerSecond": round(len(entries) / elapsed, 2) if elapsed > 0 else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate synthetic OMR sheets with ground truth")
+    parser.add_argument("--out", required=True, help="Output directory")
+    parser.add_argument("--count", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--bubble-map", help="Bubble-map JSON to render (default: built-in 180-question layout)")
+    parser.add_argument("--blank-rate", type=float, default=0.05, help="Share of questions left blank")
+    parser.add_argument("--noise", type=float, default=0.0, help="Max noise std (grey levels)")
+    parser.add_argument("--blur", type=float, default=0.0, help="Max Gaussian blur sigma")
+    parser.add_argument("--rotate", type=float, default=0.0, help="Max rotation (degrees)")
+    parser.add_argument("--warp", type=float, default=0.0, help="Max perspective corner jitter (fraction)")
+    parser.add_argument("--gradient", type=float, default=0.0, help="Max lighting falloff (0-1)")
+    parser.add_argument("--ext", default=".png", choices=[".png", ".jpg", ".tif"])
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--verify", action="store_true", help="Grade the sheets and report accuracy")
+    args = parser.parse_args()
+
+    try:
+        bubble_centers = fields = None
+        if args.bubble_map:
+            with open(args.bubble_map, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+            if isinstance(raw, dict) and "bubbleCenters" in raw:
+                fields = _normalize_fields(raw.get("fields")) or {}
+                raw = raw["bubbleCenters"]
+            bubble_centers = _normalize_bubble_centers(raw)
+
+        distortion = dict(
+            noise=args.noise, blur=args.blur, rotate=args.rotate, warp=args.warp, gradient=args.gradient
+        )
+        start = time.perf_counter()
+        written = sum(
+            1
+            for _ in generate(
+                args.out, args.count, bubble_centers, fields, args.seed, args.blank_rate,
+                distortion, args.ext, args.workers,
+            )
+        )
+        report: Dict = {"written": written, "seconds": round(time.perf_counter() - start, 2)}
+        if args.verify:
+            report["verify"] = verify(args.out, workers=args.workers)
+        print(json.dumps(report, indent=2))
+    except ValueError as e:
+        raise SystemExit(str(e))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
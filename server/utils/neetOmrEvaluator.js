@@ -1,15 +1,8 @@
-const DEFAULT_NEET_SCORING_CONFIG = {
-  marksPerCorrect: 4,
-  marksPerWrong: -1,
-  marksPerUnattempted: 0,
-  totalQuestions: 180,
-  totalMarks: 720,
-  sections: [
-    { name: "Physics", startQuestion: 1, endQuestion: 50 },
-    { name: "Chemistry", startQuestion: 51, endQuestion: 100 },
-    { name: "Biology", startQuestion: 101, endQuestion: 180 },
-  ],
-};
+import { createRequire } from "module";
+
+// Shared with omr/omr_sections.py so Node and Python report the same sections.
+const require = createRequire(import.meta.url);
+const DEFAULT_NEET_SCORING_CONFIG = require("../../omr/neet_scoring.json");
 
 const normalizeNumber = (value, fallback) => {
   const n = Number(value);
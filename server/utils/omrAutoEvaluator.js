@@ -35,7 +35,20 @@ const runPython = async (command, args) => {
       if (code === 0) {
         resolve({ stdout, stderr });
       } else {
-        reject(new Error(stderr || `python exited with code ${code}`));
+        const err = new Error(stderr || `python exited with code ${code}`);
+        // Exit code 3: the sheet failed the quality gate; stderr is JSON
+        // with a machine-readable reason so the client can ask for a re-upload.
+        if (code === 3) {
+          try {
+            const parsed = JSON.parse(stderr);
+            err.message = parsed.message || err.message;
+            err.reason = parsed.reason;
+            err.qualityMetrics = parsed.metrics;
+          } catch (e) {
+            // keep the raw stderr message
+          }
+        }
+        reject(err);
       }
     });
   });
@@ -110,12 +123,17 @@ export const extractOmrJsonFromUrls = async ({
         if (!bubbleCentersUsed) {
           try {
             const templateSourcePath = templatePath || answerPath;
+            // A shared layout index lets known sheet designs skip relearning.
+            const layoutIndexArgs = process.env.OMR_LAYOUT_INDEX
+              ? ["--layout-index", process.env.OMR_LAYOUT_INDEX]
+              : [];
             const templateRun = await runPython(cmd, [
               scriptPath,
               "--mode",
               "template",
               "--image",
               templateSourcePath,
+              ...layoutIndexArgs,
             ]);
             const parsed = JSON.parse(templateRun.stdout);
             if (
@@ -153,6 +171,22 @@ export const extractOmrJsonFromUrls = async ({
         const bubbleMapArgs = bubbleMapPath
           ? ["--bubble-map", bubbleMapPath]
           : [];
+        // Re-uploaded or forwarded copies of a sheet are answered from the
+        // shared result cache instead of being graded again.
+        const resultCacheArgs = process.env.OMR_RESULT_CACHE
+          ? ["--result-cache", process.env.OMR_RESULT_CACHE]
+          : [];
+        // Fixed bubble maps drift by a few pixels on shifted or warped
+        // scans; snap each center to the printed bubble before scoring.
+        const refineArgs = process.env.OMR_REFINE_CENTERS
+          ? [
+              "--refine-centers",
+              process.env.OMR_REFINE_CENTERS,
+              ...(process.env.OMR_REFINE_RADIUS
+                ? ["--refine-radius", process.env.OMR_REFINE_RADIUS]
+                : []),
+            ]
+          : [];
         keyRun = await runPython(cmd, [
           scriptPath,
           "--mode",
@@ -160,6 +194,8 @@ export const extractOmrJsonFromUrls = async ({
           "--image",
           answerPath,
           ...bubbleMapArgs,
+          ...resultCacheArgs,
+          ...refineArgs,
         ]);
         studentRun = await runPython(cmd, [
           scriptPath,
@@ -168,6 +204,8 @@ export const extractOmrJsonFromUrls = async ({
           "--image",
           studentPath,
           ...bubbleMapArgs,
+          ...resultCacheArgs,
+          ...refineArgs,
         ]);
 
         bubbleCentersResult = bubbleCentersUsed;